@@ -39,6 +39,25 @@ class PulseOpsDeployer:
         print("✅ Infrastructure deployed successfully!")
         return True
     
+    def build_model_artifacts(self):
+        """
+        Train the ML models offline so the ML package ships a prebuilt registry
+        holding only the live version (SAM packages services/ml/ as it is)
+        """
+        print("🧠 Building ML model artifacts...")
+        
+        ml_dir = self.services_dir / 'ml'
+        result = subprocess.run(
+            [sys.executable, 'train_models.py', '--prune'],
+            cwd=ml_dir, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"❌ Model build failed: {result.stderr}")
+            return False
+        
+        print(f"✅ Model artifacts built in {ml_dir / 'trained_models'}")
+        return True
+    
     def package_lambda_function(self, service_name):
         """Package Lambda function with dependencies"""
         print(f"📦 Packaging {service_name} service...")
@@ -99,6 +118,10 @@ class PulseOpsDeployer:
         print(f"🚀 Starting PulseOps AI deployment to {self.environment}")
         
         try:
+            # Build model artifacts before SAM packages services/ml/
+            if not self.build_model_artifacts():
+                return False
+            
             # Deploy infrastructure
             if not self.deploy_infrastructure():
                 return False
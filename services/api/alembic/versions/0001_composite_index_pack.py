@@ -0,0 +1,73 @@
+"""composite index pack for owner-scoped access paths
+
+Tables are created by Base.metadata.create_all on startup, which only adds
+indexes when it creates a table. This revision brings existing databases up
+to the indexes declared in models/models.py and skips any that are already
+there, so it is safe on both old and freshly created schemas.
+
+Revision ID: 0001
+Revises:
+Create Date: 2024-11-04 09:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial predicate per dialect or None)
+INDEXES = [
+    ("ix_clients_owner_created_id", "clients", ["owner_id", "created_at", "id"], None),
+    ("ix_clients_created_id", "clients", ["created_at", "id"], None),
+    ("ix_clients_owner_churn", "clients", ["owner_id", "churn_risk", "churn_probability"], None),
+    ("ix_software_licenses_owner_created_id", "software_licenses", ["owner_id", "created_at", "id"], None),
+    ("ix_software_licenses_owner_department", "software_licenses", ["owner_id", "department", "created_at", "id"], None),
+    ("ix_software_licenses_owner_category", "software_licenses", ["owner_id", "category"], None),
+    ("ix_software_licenses_owner_utilization", "software_licenses", ["owner_id", "utilization_percent"], None),
+    ("ix_license_usage_license_login", "license_usage", ["license_id", "last_login"], None),
+    ("ix_license_usage_active_license_login", "license_usage", ["license_id", "last_login"],
+     {"sqlite": "is_active = 1", "postgresql": "is_active = true"}),
+    ("ix_cost_anomalies_owner_detected", "cost_anomalies", ["owner_id", "detected_at"], None),
+    ("ix_cost_anomalies_open_owner_detected", "cost_anomalies", ["owner_id", "detected_at"],
+     {"sqlite": "resolved = 0", "postgresql": "resolved = false"}),
+    ("ix_recommendations_owner_status_type_value", "recommendations",
+     ["owner_id", "status", "recommendation_type", "potential_value"], None),
+    ("ix_recommendations_owner_created", "recommendations", ["owner_id", "created_at"], None),
+    ("ix_alerts_owner_status_priority_created", "alerts", ["owner_id", "status", "priority", "created_at"], None),
+]
+
+
+def _existing():
+    """Map of table -> index names, or None when generating offline SQL"""
+    if context.is_offline_mode():
+        return None
+    inspector = sa.inspect(op.get_bind())
+    return {
+        table: {ix["name"] for ix in inspector.get_indexes(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def upgrade() -> None:
+    existing = _existing()
+    for name, table, columns, where in INDEXES:
+        if existing is not None and (table not in existing or name in existing[table]):
+            continue
+        kwargs = {}
+        if where:
+            kwargs = {f"{dialect}_where": sa.text(clause) for dialect, clause in where.items()}
+        op.create_index(name, table, columns, **kwargs)
+
+
+def downgrade() -> None:
+    existing = _existing()
+    for name, table, _, _ in reversed(INDEXES):
+        if existing is not None and name not in existing.get(table, ()):
+            continue
+        op.drop_index(name, table_name=table)
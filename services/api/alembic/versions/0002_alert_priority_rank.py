@@ -0,0 +1,79 @@
+"""stored alert priority rank for the paginated alerts feed
+
+Adds alerts.priority_rank (Critical=1, High=2, Medium=3, anything else=4),
+backfills it from the priority label and replaces the (owner_id, status,
+priority, created_at) index with one matching the feed order.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-11-06 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+OLD_INDEX = "ix_alerts_owner_status_priority_created"
+NEW_INDEX = "ix_alerts_owner_status_rank_created"
+
+BACKFILL = """
+UPDATE alerts SET priority_rank = CASE lower(trim(coalesce(priority, '')))
+    WHEN 'critical' THEN 1
+    WHEN 'high' THEN 2
+    WHEN 'medium' THEN 3
+    ELSE 4
+END
+"""
+
+
+def _alert_schema():
+    """(column names, index names) of alerts, or None when generating offline SQL"""
+    if context.is_offline_mode():
+        return None
+    inspector = sa.inspect(op.get_bind())
+    if "alerts" not in inspector.get_table_names():
+        return set(), set()
+    return (
+        {column["name"] for column in inspector.get_columns("alerts")},
+        {ix["name"] for ix in inspector.get_indexes("alerts")},
+    )
+
+
+def upgrade() -> None:
+    schema = _alert_schema()
+    if schema == (set(), set()):
+        return
+    columns, indexes = schema or (set(), {OLD_INDEX})
+
+    if "priority_rank" not in columns:
+        op.add_column("alerts", sa.Column("priority_rank", sa.Integer(), nullable=False, server_default="4"))
+    op.execute(BACKFILL)
+
+    if OLD_INDEX in indexes:
+        op.drop_index(OLD_INDEX, table_name="alerts")
+    if NEW_INDEX not in indexes:
+        op.create_index(NEW_INDEX, "alerts", [
+            "owner_id", "status", "priority_rank", sa.text("created_at DESC"), sa.text("id DESC")
+        ])
+
+
+def downgrade() -> None:
+    schema = _alert_schema()
+    if schema == (set(), set()):
+        return
+    columns, indexes = schema or ({"priority_rank"}, {NEW_INDEX})
+
+    if NEW_INDEX in indexes:
+        op.drop_index(NEW_INDEX, table_name="alerts")
+    if OLD_INDEX not in indexes:
+        op.create_index(OLD_INDEX, "alerts", ["owner_id", "status", "priority", "created_at"])
+    if "priority_rank" in columns:
+        with op.batch_alter_table("alerts") as batch_op:
+            batch_op.drop_column("priority_rank")
@@ -0,0 +1,47 @@
+"""persisted client health-score factors
+
+Stores the HealthScoreCalculator breakdown per client with the fingerprint of
+the inputs it was computed from, so the health-score endpoint only calls the
+ML service when those inputs change.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-11-08 14:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name):
+    if context.is_offline_mode():
+        return False
+    return name in sa.inspect(op.get_bind()).get_table_names()
+
+
+def upgrade() -> None:
+    # Startup create_all may already have built it
+    if _has_table("client_health_factors"):
+        return
+    op.create_table(
+        "client_health_factors",
+        sa.Column("client_id", sa.Integer(), sa.ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("overall_score", sa.Float()),
+        sa.Column("factors", sa.JSON(), nullable=False),
+        sa.Column("trend", sa.String()),
+        sa.Column("insights", sa.JSON()),
+        sa.Column("health_status", sa.String()),
+        sa.Column("inputs_hash", sa.String(64), nullable=False),
+        sa.Column("computed_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("client_health_factors")
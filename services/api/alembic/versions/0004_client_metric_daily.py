@@ -0,0 +1,61 @@
+"""daily client metric rollup
+
+Adds client_metric_daily (per owner, metric type and day totals of
+client_metrics) and backfills it with SQL date bucketing. After this the
+rollup is maintained on write by utils/metric_rollup.py.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-11-12 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+METRICS_INDEX = "ix_client_metrics_client_type_timestamp"
+
+
+def _inspector():
+    if context.is_offline_mode():
+        return None
+    return sa.inspect(op.get_bind())
+
+
+def upgrade() -> None:
+    inspector = _inspector()
+    # Startup create_all may already have built the table
+    if inspector is None or "client_metric_daily" not in inspector.get_table_names():
+        op.create_table(
+            "client_metric_daily",
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("metric_type", sa.String(), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("value_sum", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("sample_count", sa.Integer(), nullable=False, server_default="0"),
+        )
+    if inspector is None or METRICS_INDEX not in {ix["name"] for ix in inspector.get_indexes("client_metrics")}:
+        op.create_index(METRICS_INDEX, "client_metrics", ["client_id", "metric_type", "timestamp"])
+
+    # Rebuild from scratch so the backfill is safe to repeat
+    op.execute("DELETE FROM client_metric_daily")
+    op.execute(
+        """
+        INSERT INTO client_metric_daily (owner_id, metric_type, day, value_sum, sample_count)
+        SELECT c.owner_id, m.metric_type, date(m.timestamp), coalesce(sum(m.value), 0), count(m.id)
+        FROM client_metrics m JOIN clients c ON c.id = m.client_id
+        WHERE c.owner_id IS NOT NULL AND m.metric_type IS NOT NULL AND m.timestamp IS NOT NULL
+        GROUP BY c.owner_id, m.metric_type, date(m.timestamp)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(METRICS_INDEX, table_name="client_metrics")
+    op.drop_table("client_metric_daily")
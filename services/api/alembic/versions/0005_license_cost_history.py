@@ -0,0 +1,96 @@
+"""license cost history and monthly cost totals
+
+Adds license_cost_history (one row per monthly_cost change with the owner's
+running total) and owner_monthly_cost, maintained on write by
+utils/cost_history.py. Existing licenses are backfilled as 'created' at
+their created_at with their current cost, since earlier costs were never
+recorded.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-11-15 09:30:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def _tables():
+    if context.is_offline_mode():
+        return set()
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    # Startup create_all may already have built the tables
+    tables = _tables()
+    if "license_cost_history" not in tables:
+        op.create_table(
+            "license_cost_history",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("license_id", sa.Integer(), nullable=False),
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+            sa.Column("change", sa.String(), nullable=False),
+            sa.Column("previous_cost", sa.Float()),
+            sa.Column("monthly_cost", sa.Float(), nullable=False),
+            sa.Column("owner_total", sa.Float(), nullable=False),
+            sa.Column("changed_at", sa.DateTime(), nullable=False),
+        )
+        op.create_index("ix_license_cost_history_id", "license_cost_history", ["id"])
+        op.create_index("ix_license_cost_history_owner_changed", "license_cost_history",
+                        ["owner_id", "changed_at", "id"])
+        op.create_index("ix_license_cost_history_license_changed", "license_cost_history",
+                        ["license_id", "changed_at"])
+    if "owner_monthly_cost" not in tables:
+        op.create_table(
+            "owner_monthly_cost",
+            sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+            sa.Column("month", sa.Date(), primary_key=True),
+            sa.Column("closing_cost", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("cost_added", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("cost_removed", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("new_licenses", sa.Integer(), nullable=False, server_default="0"),
+        )
+
+    # Backfill once; after that the tables are append/maintain only
+    if not context.is_offline_mode() and op.get_bind().execute(
+        sa.text("SELECT 1 FROM license_cost_history LIMIT 1")
+    ).first():
+        return
+    op.execute(
+        """
+        INSERT INTO license_cost_history
+            (license_id, owner_id, change, previous_cost, monthly_cost, owner_total, changed_at)
+        SELECT id, owner_id, 'created', NULL, coalesce(monthly_cost, 0),
+               sum(coalesce(monthly_cost, 0)) OVER (PARTITION BY owner_id ORDER BY created_at, id),
+               coalesce(created_at, CURRENT_TIMESTAMP)
+        FROM software_licenses
+        WHERE owner_id IS NOT NULL
+        ORDER BY created_at, id
+        """
+    )
+    if op.get_context().dialect.name == "postgresql":
+        month = "CAST(date_trunc('month', changed_at) AS date)"
+    else:
+        month = "date(changed_at, 'start of month')"
+    # Backfilled totals only grow, so a month's closing total is its largest
+    op.execute(
+        f"""
+        INSERT INTO owner_monthly_cost (owner_id, month, closing_cost, cost_added, cost_removed, new_licenses)
+        SELECT owner_id, {month}, max(owner_total), sum(monthly_cost), 0, count(*)
+        FROM license_cost_history
+        GROUP BY owner_id, {month}
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("owner_monthly_cost")
+    op.drop_table("license_cost_history")
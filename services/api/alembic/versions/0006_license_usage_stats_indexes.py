@@ -0,0 +1,55 @@
+"""covering indexes for full-population license usage stats
+
+Replaces ix_license_usage_license_login (license_id, last_login) with a copy
+that also carries is_active and usage_hours, so the per-license seat counts
+are answered from the index alone, and adds (license_id, usage_hours) so the
+usage-hour percentiles read hours in order without a sort.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-11-20 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+OLD_INDEX = ("ix_license_usage_license_login", ["license_id", "last_login"])
+NEW_INDEXES = [
+    ("ix_license_usage_license_login_stats", ["license_id", "last_login", "is_active", "usage_hours"]),
+    ("ix_license_usage_license_hours", ["license_id", "usage_hours"]),
+]
+
+
+def _existing():
+    """Index names on license_usage, or None when generating offline SQL"""
+    if context.is_offline_mode():
+        return None
+    return {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("license_usage")}
+
+
+def upgrade() -> None:
+    existing = _existing()
+    for name, columns in NEW_INDEXES:
+        if existing is None or name not in existing:
+            op.create_index(name, "license_usage", columns)
+    # The stats index has the same leading columns, so the narrow one is redundant
+    name, _ = OLD_INDEX
+    if existing is None or name in existing:
+        op.drop_index(name, table_name="license_usage")
+
+
+def downgrade() -> None:
+    existing = _existing()
+    name, columns = OLD_INDEX
+    if existing is None or name not in existing:
+        op.create_index(name, "license_usage", columns)
+    for name, _ in reversed(NEW_INDEXES):
+        if existing is None or name in existing:
+            op.drop_index(name, table_name="license_usage")
@@ -0,0 +1,54 @@
+"""one license_usage row per seat
+
+Usage ingestion upserts seats on (license_id, user_email), so this adds a
+unique index on it. Duplicate seats are folded into the newest row first
+(latest login, summed usage hours, active if any copy was).
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-11-22 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+SEAT_INDEX = "uq_license_usage_license_email"
+
+
+def upgrade() -> None:
+    if not context.is_offline_mode():
+        existing = {ix["name"] for ix in sa.inspect(op.get_bind()).get_indexes("license_usage")}
+        if SEAT_INDEX in existing:
+            return
+
+    true = "true" if op.get_context().dialect.name == "postgresql" else "1"
+    # Fold duplicates into the newest copy, then drop the older ones
+    op.execute(f"""
+        UPDATE license_usage SET
+            last_login = (SELECT MAX(d.last_login) FROM license_usage d
+                          WHERE d.license_id = license_usage.license_id AND d.user_email = license_usage.user_email),
+            usage_hours = (SELECT SUM(d.usage_hours) FROM license_usage d
+                           WHERE d.license_id = license_usage.license_id AND d.user_email = license_usage.user_email),
+            is_active = EXISTS (SELECT 1 FROM license_usage d
+                                WHERE d.license_id = license_usage.license_id AND d.user_email = license_usage.user_email
+                                  AND d.is_active = {true})
+        WHERE id IN (SELECT MAX(id) FROM license_usage WHERE user_email IS NOT NULL
+                     GROUP BY license_id, user_email HAVING COUNT(*) > 1)
+    """)
+    op.execute("""
+        DELETE FROM license_usage WHERE id NOT IN (
+            SELECT MAX(id) FROM license_usage GROUP BY license_id, user_email
+        ) AND user_email IS NOT NULL
+    """)
+    op.create_index(SEAT_INDEX, "license_usage", ["license_id", "user_email"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(SEAT_INDEX, table_name="license_usage")
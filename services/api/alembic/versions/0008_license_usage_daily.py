@@ -0,0 +1,57 @@
+"""compacted license usage tier
+
+Adds license_usage_daily, where compact_license_usage.py moves released
+seats idle past USAGE_RETENTION_DAYS. Nothing is backfilled: the first
+compaction run fills it. Downgrade moves compacted seats back into
+license_usage before dropping the table.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2024-11-25 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+LOGIN_INDEX = "ix_license_usage_daily_license_login"
+
+
+def upgrade() -> None:
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    # Startup create_all may already have built the table
+    if inspector is None or "license_usage_daily" not in inspector.get_table_names():
+        op.create_table(
+            "license_usage_daily",
+            sa.Column("license_id", sa.Integer(), sa.ForeignKey("software_licenses.id"), primary_key=True),
+            sa.Column("user_email", sa.String(), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("usage_hours", sa.Float(), nullable=False, server_default="0"),
+            sa.Column("last_login", sa.DateTime()),
+            sa.Column("is_active", sa.Boolean(), nullable=False, server_default=sa.false()),
+        )
+    if inspector is None or LOGIN_INDEX not in {ix["name"] for ix in inspector.get_indexes("license_usage_daily")}:
+        op.create_index(LOGIN_INDEX, "license_usage_daily", ["license_id", "last_login"])
+
+
+def downgrade() -> None:
+    false = "false" if op.get_context().dialect.name == "postgresql" else "0"
+    # Compacted seats are always released; seats that came back live win
+    op.execute(
+        f"""
+        INSERT INTO license_usage (license_id, user_email, last_login, usage_hours, is_active, timestamp)
+        SELECT d.license_id, d.user_email, max(d.last_login), sum(d.usage_hours), {false}, max(d.day)
+        FROM license_usage_daily d
+        WHERE NOT EXISTS (SELECT 1 FROM license_usage u
+                          WHERE u.license_id = d.license_id AND u.user_email = d.user_email)
+        GROUP BY d.license_id, d.user_email
+        """
+    )
+    op.drop_index(LOGIN_INDEX, table_name="license_usage_daily")
+    op.drop_table("license_usage_daily")
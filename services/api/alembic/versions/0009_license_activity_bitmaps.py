@@ -0,0 +1,95 @@
+"""daily active-seat bitmaps
+
+Adds license_seat_numbers (dense seat ordinals per license) and
+license_daily_activity (one bitmap per license and day). Usage ingestion
+maintains both. The backfill numbers every known seat and sets its bit on
+the day of its last login, the only activity recorded before this.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2024-11-28 10:00:00
+
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+SEAT_INDEX = "uq_license_seat_numbers_license_seat"
+
+
+def _day(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def upgrade() -> None:
+    inspector = None if context.is_offline_mode() else sa.inspect(op.get_bind())
+    tables = set() if inspector is None else set(inspector.get_table_names())
+    # Startup create_all may already have built the tables
+    if "license_seat_numbers" not in tables:
+        op.create_table(
+            "license_seat_numbers",
+            sa.Column("license_id", sa.Integer(), sa.ForeignKey("software_licenses.id"), primary_key=True),
+            sa.Column("user_email", sa.String(), primary_key=True),
+            sa.Column("seat_no", sa.Integer(), nullable=False),
+        )
+        op.create_index(SEAT_INDEX, "license_seat_numbers", ["license_id", "seat_no"], unique=True)
+    if "license_daily_activity" not in tables:
+        op.create_table(
+            "license_daily_activity",
+            sa.Column("license_id", sa.Integer(), sa.ForeignKey("software_licenses.id"), primary_key=True),
+            sa.Column("day", sa.Date(), primary_key=True),
+            sa.Column("bitmap", sa.LargeBinary(), nullable=False),
+        )
+    if context.is_offline_mode():
+        return
+
+    # Rebuild from scratch so the backfill is safe to repeat
+    connection = op.get_bind()
+    connection.execute(sa.text("DELETE FROM license_daily_activity"))
+    connection.execute(sa.text("DELETE FROM license_seat_numbers"))
+    seats = connection.execute(sa.text(
+        """
+        SELECT license_id, user_email, last_login FROM license_usage WHERE user_email IS NOT NULL
+        UNION ALL
+        SELECT license_id, user_email, last_login FROM license_usage_daily
+        ORDER BY 1, 3, 2
+        """
+    )).all()
+    numbers, bits = {}, defaultdict(int)
+    next_no = defaultdict(int)
+    for license_id, email, last_login in seats:
+        key = (license_id, email)
+        if key not in numbers:
+            numbers[key] = next_no[license_id]
+            next_no[license_id] += 1
+        if last_login is not None:
+            bits[(license_id, _day(last_login))] |= 1 << numbers[key]
+    if numbers:
+        connection.execute(sa.text(
+            "INSERT INTO license_seat_numbers (license_id, user_email, seat_no) VALUES (:license_id, :email, :seat_no)"
+        ), [{"license_id": license_id, "email": email, "seat_no": seat_no}
+            for (license_id, email), seat_no in numbers.items()])
+    if bits:
+        activity = sa.table("license_daily_activity", sa.column("license_id"), sa.column("day", sa.Date()),
+                            sa.column("bitmap", sa.LargeBinary()))
+        connection.execute(activity.insert(), [
+            {"license_id": license_id, "day": day, "bitmap": value.to_bytes((value.bit_length() + 7) // 8, "little")}
+            for (license_id, day), value in bits.items()
+        ])
+
+
+def downgrade() -> None:
+    op.drop_table("license_daily_activity")
+    op.drop_index(SEAT_INDEX, table_name="license_seat_numbers")
+    op.drop_table("license_seat_numbers")
@@ -0,0 +1,46 @@
+"""owner KPI snapshots
+
+Adds owner_kpi_snapshot (per-owner dashboard totals maintained on write by
+utils/kpi_snapshot.py). It is left empty: an owner's row is built from the
+base tables on its first dashboard read, and reconcile_kpi_snapshots.py
+builds them all up front.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2024-12-02 10:00:00
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+COUNTERS = (
+    ("client_count", sa.Integer), ("total_mrr", sa.Float), ("health_score_sum", sa.Float),
+    ("high_risk_clients", sa.Integer), ("pending_recommendations", sa.Integer),
+    ("software_count", sa.Integer), ("total_monthly_cost", sa.Float), ("total_licenses", sa.Integer),
+    ("active_users", sa.Integer), ("utilization_sum", sa.Float), ("utilization_count", sa.Integer),
+    ("low_utilization_count", sa.Integer), ("low_utilization_cost", sa.Float),
+    ("savings_potential", sa.Float), ("open_anomalies", sa.Integer),
+)
+
+
+def upgrade() -> None:
+    # Startup create_all may already have built the table
+    if not context.is_offline_mode() and "owner_kpi_snapshot" in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        "owner_kpi_snapshot",
+        sa.Column("owner_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        *[sa.Column(name, type_(), nullable=False, server_default="0") for name, type_ in COUNTERS],
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("owner_kpi_snapshot")
@@ -0,0 +1,116 @@
+"""
+Benchmark: alerts feed on a large alerts table
+Seeds one MSP owner with many alerts and times the first page ordered by the
+old CASE over the priority label against the stored priority_rank with its
+index, plus a deep cursor page and a `since` poll for recent alerts.
+
+Usage: python benchmarks/bench_alerts_feed.py [--alerts 500000] [--page-size 50] [--repeat 20]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import case, create_engine, insert, select
+
+from database import Base
+from models.models import User, Alert, alert_priority_rank
+from routers.msp import ALERT_ORDER
+from utils.pagination import apply_keyset, encode_cursor
+
+PRIORITIES = ["Critical", "High", "Medium", "Low"]
+STATUSES = ["active", "active", "resolved", "dismissed"]
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        owner_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", hashed_password="x", role="msp"
+        )).inserted_primary_key[0]
+        batch = []
+        for i in range(rows):
+            priority = rng.choice(PRIORITIES)
+            batch.append({
+                "title": f"Alert {i}",
+                "priority": priority,
+                "priority_rank": alert_priority_rank(priority),
+                "status": rng.choice(STATUSES),
+                "created_at": start + timedelta(seconds=i * 30),
+                "owner_id": owner_id,
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Alert), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Alert), batch)
+    return owner_id, start + timedelta(seconds=rows * 30)
+
+
+def timed(conn, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(query).all()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--alerts", type=int, default=500000)
+    parser.add_argument("--page-size", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_alerts.db")
+    engine = create_engine(f"sqlite:///{path}")
+    print(f"Seeding {args.alerts} alerts...")
+    owner_id, latest = seed(engine, args.alerts)
+
+    base = select(Alert.id, Alert.priority_rank, Alert.created_at).where(
+        Alert.owner_id == owner_id, Alert.status == "active"
+    )
+    legacy = base.order_by(
+        case(
+            (Alert.priority == 'Critical', 1),
+            (Alert.priority == 'High', 2),
+            (Alert.priority == 'Medium', 3),
+            else_=4
+        ),
+        Alert.created_at.desc()
+    ).limit(args.page_size)
+
+    with engine.connect() as conn:
+        # Cursor roughly half-way through the active alerts
+        anchor = conn.execute(
+            apply_keyset(base, ALERT_ORDER, None).offset(args.alerts // 4).limit(1)
+        ).one()
+        deep_cursor = encode_cursor([anchor.priority_rank, anchor.created_at, anchor.id])
+
+        cases = [
+            ("CASE order, page 1", legacy),
+            ("priority_rank, page 1", apply_keyset(base, ALERT_ORDER, None).limit(args.page_size)),
+            ("priority_rank, deep cursor", apply_keyset(base, ALERT_ORDER, deep_cursor).limit(args.page_size)),
+            ("since last hour", apply_keyset(
+                base.where(Alert.created_at > latest - timedelta(hours=1)), ALERT_ORDER, None
+            ).limit(args.page_size)),
+        ]
+        for label, query in cases:
+            ms, rows = timed(conn, query, args.repeat)
+            print(f"{label:<28} {ms:9.3f} ms  ({len(rows)} rows, median of {args.repeat})")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
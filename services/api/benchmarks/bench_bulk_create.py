@@ -0,0 +1,104 @@
+"""
+Benchmark: one-at-a-time vs bulk client creation
+Loads clients through the API into a scratch SQLite database, first with one
+POST /api/clients/ per row and then with POST /api/clients/bulk.
+
+The per-row path is timed on --single-rows rows and projected to --rows,
+because running it to completion is the slow part this benchmark is about.
+
+Usage: python benchmarks/bench_bulk_create.py [--rows 10000] [--single-rows 1000] [--chunk 10000]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main runs create_all on import; keep it off the tracked dev database
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "main.db"))
+
+import httpx
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from main import app
+from database import Base, get_db
+from models.models import Client
+from routers.auth import get_current_user
+
+from msp_user import BENCH_USER, seed_user
+
+
+def client_row(prefix, i):
+    return {
+        "client_id": f"CLT-{prefix}{i:07d}",
+        "name": f"Client {i}",
+        "industry": "Technology",
+        "monthly_spend": 1000.0 + i,
+        "total_licenses": 50,
+        "total_users": 40,
+        "health_score": 75.0,
+    }
+
+
+async def load(rows, single_rows, chunk):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+        t0 = time.perf_counter()
+        for i in range(single_rows):
+            response = await http.post("/api/clients/", json=client_row("ONE", i))
+            assert response.status_code == 200, response.text
+        single = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        created = 0
+        for start in range(0, rows, chunk):
+            batch = [client_row("BULK", i) for i in range(start, min(rows, start + chunk))]
+            response = await http.post("/api/clients/bulk", json=batch)
+            assert response.status_code == 200, response.text
+            created += response.json()["created"]
+        bulk = time.perf_counter() - t0
+    return single, bulk, created
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--chunk", type=int, default=10000, help="rows per bulk request")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_bulk.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    SessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    seed_user(engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+    try:
+        single, bulk, created = asyncio.run(load(args.rows, args.single_rows, args.chunk))
+    finally:
+        app.dependency_overrides.clear()
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(func.count(Client.id))).scalar()
+    per_row = single / args.single_rows
+    print(f"one POST per row : {args.single_rows} rows in {single:.2f}s "
+          f"({per_row * 1000:.2f} ms/row, ~{per_row * args.rows:.1f}s projected for {args.rows})")
+    print(f"bulk endpoint    : {created} rows in {bulk:.2f}s ({args.rows / bulk:,.0f} rows/s)")
+    print(f"rows stored      : {stored}")
+
+
+if __name__ == "__main__":
+    main()
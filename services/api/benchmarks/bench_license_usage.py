@@ -0,0 +1,100 @@
+"""
+Benchmark: usage statistics for licenses with many seats
+Times the full-population seat counts and usage-hour percentiles behind
+/api/it/software/{id}/usage against the old 20-row fetch, per seat count.
+
+Usage: python benchmarks/bench_license_usage.py [--seats 1000 10000 100000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, desc, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from database import Base
+from models.models import User, SoftwareLicense, LicenseUsage
+from utils.usage_stats import get_usage_stats
+
+
+def seed(engine, seat_counts):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    license_ids = {}
+    with engine.begin() as conn:
+        owner_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", hashed_password="x", role="it_admin"
+        )).inserted_primary_key[0]
+        for seats in seat_counts:
+            license_id = conn.execute(insert(SoftwareLicense).values(
+                software_name=f"App {seats}", total_licenses=seats, active_users=seats,
+                monthly_cost=seats * 10.0, owner_id=owner_id
+            )).inserted_primary_key[0]
+            conn.execute(insert(LicenseUsage), [
+                {"license_id": license_id, "user_email": f"user{i}@example.com",
+                 "last_login": now - timedelta(days=rng.randint(0, 120)),
+                 "usage_hours": rng.uniform(0, 160), "is_active": rng.random() < 0.9}
+                for i in range(seats)
+            ])
+            license_ids[seats] = license_id
+    return license_ids
+
+
+async def recent_rows(db, license_id):
+    """The old path: the 20 most recent rows only"""
+    result = await db.execute(select(LicenseUsage).where(
+        LicenseUsage.license_id == license_id
+    ).order_by(desc(LicenseUsage.last_login)).limit(20))
+    result.scalars().all()
+    db.expunge_all()
+
+
+async def run(SessionLocal, license_ids, repeat):
+    inactive_before = datetime.utcnow() - timedelta(days=30)
+    results = []
+    for seats, license_id in license_ids.items():
+        timings = {}
+        for label, fn in (("20-row fetch", lambda db: recent_rows(db, license_id)),
+                          ("full stats", lambda db: get_usage_stats(db, license_id, inactive_before))):
+            samples = []
+            for _ in range(repeat):
+                async with SessionLocal() as db:
+                    t0 = time.perf_counter()
+                    await fn(db)
+                    samples.append((time.perf_counter() - t0) * 1000)
+            timings[label] = statistics.median(samples)
+        results.append((seats, timings))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--seats", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_usage.db")
+    engine = create_engine(f"sqlite:///{path}")
+    print(f"Seeding licenses with {', '.join(map(str, args.seats))} seats...")
+    license_ids = seed(engine, args.seats)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    SessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    for seats, timings in asyncio.run(run(SessionLocal, license_ids, args.repeat)):
+        print(f"{seats:>8} seats  " + "  ".join(f"{label}: {ms:8.3f} ms" for label, ms in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
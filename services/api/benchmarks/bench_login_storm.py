@@ -0,0 +1,150 @@
+"""
+Benchmark: dashboard latency during a login storm
+Fires a burst of concurrent logins and measures /api/msp/dashboard latency
+on the same worker, with bcrypt inline versus on the bounded hashing pool.
+
+Dashboard probes are launched on a fixed schedule while the logins run, so
+any time the event loop spends blocked shows up in their latency.
+
+Usage: python benchmarks/bench_login_storm.py [--logins 100] [--dashboard-calls 200] [--probe-interval 0.05]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main runs create_all on import; keep it off the tracked dev database
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "main.db"))
+
+import httpx
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from main import app
+from database import Base, get_db
+from models.models import User, Client
+from routers import auth
+
+
+def build_database(path):
+    """Create a scratch database with one MSP user and a few clients"""
+    # NullPool keeps pool exhaustion from the blocking sessions out of the measurement
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+        poolclass=NullPool
+    )
+    Base.metadata.create_all(bind=engine)
+    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = SessionLocal()
+    user = User(
+        email="bench@example.com",
+        username="bench",
+        hashed_password=auth.get_password_hash("benchpassword"),
+        role="msp",
+        company_name="Bench MSP"
+    )
+    db.add(user)
+    db.commit()
+    for i in range(200):
+        db.add(Client(
+            client_id=f"CLT-BENCH{i:04d}",
+            name=f"Client {i}",
+            monthly_spend=1000.0 + i,
+            health_score=70.0,
+            churn_risk="high" if i % 10 == 0 else "low",
+            churn_probability=0.1,
+            owner_id=user.id
+        ))
+    db.commit()
+    db.close()
+    return SessionLocal
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_storm(logins, dashboard_calls, probe_interval):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        response = await http.post("/api/auth/login", data={"email": "bench@example.com", "password": "benchpassword"})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        latencies = []
+        statuses = {}
+
+        async def login():
+            response = await http.post("/api/auth/login", data={"email": "bench@example.com", "password": "benchpassword"})
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        async def dashboard(delay):
+            await asyncio.sleep(delay)
+            start = time.perf_counter()
+            await http.get("/api/msp/dashboard", headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        probes = [dashboard(i * probe_interval) for i in range(dashboard_calls)]
+        await asyncio.gather(*probes, *(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "elapsed_s": elapsed,
+        "login_statuses": statuses,
+        "p50_ms": percentile(latencies, 50),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies)
+    }
+
+
+async def inline_verify(plain_password, hashed_password):
+    """Pre-pool behaviour: bcrypt runs directly on the event loop"""
+    return auth.pwd_context.verify(plain_password, hashed_password)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--dashboard-calls", type=int, default=200)
+    parser.add_argument("--probe-interval", type=float, default=0.05, help="seconds between dashboard probes")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        SessionLocal = build_database(os.path.join(tmp, "bench.db"))
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+
+        print(f"Login storm: {args.logins} concurrent logins, {args.dashboard_calls} dashboard calls, "
+              f"{auth.hashing_pool.max_workers} hash workers on {os.cpu_count()} CPUs")
+        print("=" * 60)
+
+        pooled_verify = auth.hashing_pool.verify
+        for label, verify in (("inline bcrypt", inline_verify), ("hashing pool", pooled_verify)):
+            auth.hashing_pool.verify = verify
+            result = asyncio.run(run_storm(args.logins, args.dashboard_calls, args.probe_interval))
+            print(f"{label:>14}: dashboard p50={result['p50_ms']:.1f}ms p99={result['p99_ms']:.1f}ms "
+                  f"max={result['max_ms']:.1f}ms | logins {result['login_statuses']} in {result['elapsed_s']:.2f}s")
+        auth.hashing_pool.verify = pooled_verify
+        print(f"Pool stats: {auth.hashing_pool.stats()}")
+
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
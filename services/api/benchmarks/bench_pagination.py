@@ -0,0 +1,101 @@
+"""
+Benchmark: OFFSET vs keyset pagination on the MSP client list
+Seeds one owner with enough clients for 10,000 pages and times fetching page 1
+and page 10,000 with offset(skip) and with the cursor built by utils.pagination.
+
+Usage: python benchmarks/bench_pagination.py [--page-size 20] [--pages 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, select
+
+from database import Base
+from models.models import User, Client
+from routers.msp import CLIENT_ORDER
+from utils.pagination import apply_keyset, encode_cursor
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(bind=engine)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        owner_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", hashed_password="x", role="msp"
+        )).inserted_primary_key[0]
+        batch = []
+        for i in range(rows):
+            batch.append({
+                "client_id": f"CLT-BENCH{i:07d}",
+                "name": f"Client {i}",
+                "monthly_spend": 1000.0,
+                "owner_id": owner_id,
+                # Pairs share a timestamp so the id tie-breaker matters
+                "created_at": start + timedelta(seconds=i // 2),
+            })
+            if len(batch) == 10000:
+                conn.execute(insert(Client), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Client), batch)
+    return owner_id
+
+
+def timed(conn, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(query).all()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_pagination.db")
+    engine = create_engine(f"sqlite:///{path}")
+    print(f"Seeding {args.page_size * args.pages} clients...")
+    owner_id = seed(engine, args.page_size * args.pages)
+
+    base = select(Client.id, Client.created_at).where(Client.owner_id == owner_id)
+    deep = (args.pages - 1) * args.page_size
+
+    with engine.connect() as conn:
+        # Cursor for the last page: the sort key of the row just before it
+        anchor = conn.execute(apply_keyset(base, CLIENT_ORDER, None).offset(deep - 1).limit(1)).one()
+        deep_cursor = encode_cursor([anchor.created_at, anchor.id])
+
+        cases = [
+            ("offset  page 1", apply_keyset(base, CLIENT_ORDER, None).limit(args.page_size)),
+            (f"offset  page {args.pages}", apply_keyset(base, CLIENT_ORDER, None).offset(deep).limit(args.page_size)),
+            ("keyset  page 1", apply_keyset(base, CLIENT_ORDER, None).limit(args.page_size)),
+            (f"keyset  page {args.pages}", apply_keyset(base, CLIENT_ORDER, deep_cursor).limit(args.page_size)),
+        ]
+        results = {}
+        for label, query in cases:
+            ms, rows = timed(conn, query, args.repeat)
+            results[label] = [r.id for r in rows]
+            print(f"{label:<20} {ms:8.3f} ms (median of {args.repeat})")
+
+    offset_deep = results[f"offset  page {args.pages}"]
+    keyset_deep = results[f"keyset  page {args.pages}"]
+    print(f"Deep pages match: {offset_deep == keyset_deep}")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
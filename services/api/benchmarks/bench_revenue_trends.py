@@ -0,0 +1,100 @@
+"""
+Benchmark: revenue trend from raw metrics vs the daily rollup
+Seeds one MSP owner with many clients and a year of revenue metrics, then times
+a 30- and 365-day revenue series aggregated from client_metrics per request
+against the same series read from client_metric_daily.
+
+Usage: python benchmarks/bench_revenue_trends.py [--clients 2000] [--per-day 2] [--repeat 10]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+
+from database import Base
+from models.models import User, Client, ClientMetric, ClientMetricDaily
+from utils.metric_rollup import rebuild_metric_rollup
+
+DAYS = 365
+
+
+def seed(engine, clients, per_day):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    with engine.begin() as conn:
+        owner_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", hashed_password="x", role="msp"
+        )).inserted_primary_key[0]
+        conn.execute(insert(Client), [
+            {"client_id": f"CLT-{i:06d}", "name": f"Client {i}", "owner_id": owner_id} for i in range(clients)
+        ])
+        client_ids = conn.execute(select(Client.id)).scalars().all()
+        # Core inserts skip the flush hook; the rollup is rebuilt once below
+        for day in range(DAYS):
+            start = today - timedelta(days=day)
+            conn.execute(insert(ClientMetric), [
+                {"client_id": client_id, "metric_type": "revenue", "value": rng.uniform(10, 100),
+                 "timestamp": start + timedelta(seconds=rng.randrange(86400))}
+                for client_id in client_ids for _ in range(per_day)
+            ])
+        rebuild_metric_rollup(conn)
+    return owner_id, today.date()
+
+
+def timed(conn, query, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        rows = conn.execute(query).all()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples), rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--clients", type=int, default=2000)
+    parser.add_argument("--per-day", type=int, default=2, help="revenue metrics per client per day")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_trends.db")
+    engine = create_engine(f"sqlite:///{path}")
+    print(f"Seeding {args.clients * args.per_day * DAYS:,} revenue metrics...")
+    owner_id, today = seed(engine, args.clients, args.per_day)
+
+    with engine.connect() as conn:
+        for days in (30, 365):
+            start = today - timedelta(days=days - 1)
+            bucket = func.date(ClientMetric.timestamp)
+            raw = select(bucket, func.sum(ClientMetric.value)).join(
+                Client, Client.id == ClientMetric.client_id
+            ).where(
+                Client.owner_id == owner_id,
+                ClientMetric.metric_type == "revenue",
+                ClientMetric.timestamp >= datetime.combine(start, datetime.min.time())
+            ).group_by(bucket)
+            rollup = select(ClientMetricDaily.day, ClientMetricDaily.value_sum).where(
+                ClientMetricDaily.owner_id == owner_id,
+                ClientMetricDaily.metric_type == "revenue",
+                ClientMetricDaily.day >= start,
+                ClientMetricDaily.day <= today
+            )
+            for label, query in ((f"raw metrics, {days} days", raw), (f"daily rollup, {days} days", rollup)):
+                ms, rows = timed(conn, query, args.repeat)
+                print(f"{label:<26} {ms:9.3f} ms  ({len(rows)} rows, median of {args.repeat})")
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
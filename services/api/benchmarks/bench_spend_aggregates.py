@@ -0,0 +1,110 @@
+"""
+Benchmark: spend breakdowns for an owner with many licenses
+Times the three old per-endpoint aggregations (two GROUP BYs plus loading every
+license for cost-breakdown) against the single-pass aggregate that now backs
+all three, and a cache hit.
+
+Usage: python benchmarks/bench_spend_aggregates.py [--licenses 50000] [--repeat 20]
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from database import Base
+from models.models import User, SoftwareLicense
+from utils.spend_aggregates import get_spend_aggregates, spend_cache
+
+CATEGORIES = ["Productivity", "Development", "Communication", "Security", None]
+DEPARTMENTS = ["Engineering", "Sales", "Marketing", "Finance", "HR", "Support", None]
+
+
+def seed(engine, rows):
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    with engine.begin() as conn:
+        owner_id = conn.execute(insert(User).values(
+            email="bench@example.com", username="bench", hashed_password="x", role="it_admin"
+        )).inserted_primary_key[0]
+        conn.execute(insert(SoftwareLicense), [
+            {"software_name": f"App {i}", "category": rng.choice(CATEGORIES),
+             "department": rng.choice(DEPARTMENTS), "total_licenses": rng.randint(5, 500),
+             "utilization_percent": rng.uniform(0, 100), "monthly_cost": rng.uniform(10, 5000),
+             "annual_cost": rng.uniform(120, 60000), "owner_id": owner_id}
+            for i in range(rows)
+        ])
+    return owner_id
+
+
+async def old_views(db, owner_id):
+    """The three queries the endpoints used to run"""
+    await db.execute(select(
+        SoftwareLicense.department, func.sum(SoftwareLicense.monthly_cost),
+        func.count(SoftwareLicense.id), func.avg(SoftwareLicense.utilization_percent)
+    ).where(SoftwareLicense.owner_id == owner_id).group_by(SoftwareLicense.department))
+    await db.execute(select(
+        SoftwareLicense.category, func.sum(SoftwareLicense.monthly_cost), func.sum(SoftwareLicense.annual_cost),
+        func.count(SoftwareLicense.id), func.sum(SoftwareLicense.total_licenses),
+        func.avg(SoftwareLicense.utilization_percent)
+    ).where(SoftwareLicense.owner_id == owner_id).group_by(SoftwareLicense.category))
+    licenses = (await db.execute(select(SoftwareLicense).where(SoftwareLicense.owner_id == owner_id))).scalars().all()
+    categories = {}
+    for license in licenses:
+        totals = categories.setdefault(license.category or 'Other', [0, 0, 0, 0])
+        totals[0] += license.monthly_cost or 0
+        totals[1] += license.annual_cost or 0
+        totals[2] += license.total_licenses or 0
+        totals[3] += 1
+    db.expunge_all()
+
+
+async def run(SessionLocal, owner_id, repeat):
+    results = {}
+    for label, cached in (("old: 3 queries + row load", None), ("single-pass aggregate", False),
+                          ("cache hit", True)):
+        samples = []
+        for _ in range(repeat):
+            async with SessionLocal() as db:
+                if cached is False:
+                    spend_cache.clear()
+                t0 = time.perf_counter()
+                if cached is None:
+                    await old_views(db, owner_id)
+                else:
+                    await get_spend_aggregates(db, owner_id)
+                samples.append((time.perf_counter() - t0) * 1000)
+        results[label] = statistics.median(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--licenses", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_spend.db")
+    engine = create_engine(f"sqlite:///{path}")
+    print(f"Seeding {args.licenses} licenses...")
+    owner_id = seed(engine, args.licenses)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    SessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    for label, ms in asyncio.run(run(SessionLocal, owner_id, args.repeat)).items():
+        print(f"{label:<28} {ms:9.3f} ms  (median of {args.repeat})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: streaming client export memory
+Seeds a scratch SQLite database with clients and streams GET /api/clients/export
+for increasing row counts, reporting the Python heap peak for each next to a
+fetch-everything baseline of the same query.
+
+The ASGI app is driven directly with a send() that only counts bytes, since
+httpx's ASGI transport buffers the whole response body.
+
+Usage: python benchmarks/bench_streaming_export.py [--rows 100000 1000000] [--format csv]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main runs create_all on import; keep it off the tracked dev database
+os.environ.setdefault("SQLITE_PATH", os.path.join(tempfile.mkdtemp(), "main.db"))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from main import app
+from database import Base, get_db
+from models.models import Client
+from routers.auth import get_current_user
+
+from msp_user import BENCH_USER, seed_user
+
+
+def seed(engine, start, stop):
+    with engine.begin() as conn:
+        for offset in range(start, stop, 10000):
+            conn.execute(insert(Client), [
+                {"client_id": f"CLT-{i:08d}", "name": f"Client {i}", "industry": "Technology",
+                 "monthly_spend": 1000.0 + i, "total_licenses": 50, "total_users": 40,
+                 "health_score": 75.0, "status": "Active", "owner_id": BENCH_USER.id}
+                for i in range(offset, min(stop, offset + 10000))
+            ])
+
+
+async def export(fmt):
+    """Run one export request through the app; returns (status, body bytes)"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/clients/export", "raw_path": b"/api/clients/export",
+        "query_string": f"format={fmt}".encode(), "root_path": "", "headers": [],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    state = {"status": None, "bytes": 0}
+    requested = asyncio.Event()
+
+    async def receive():
+        # Deliver the empty request body once, then block like a client that
+        # stays connected (StreamingResponse polls receive() for disconnects)
+        if requested.is_set():
+            await asyncio.Event().wait()
+        requested.set()
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            state["bytes"] += len(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return state["status"], state["bytes"]
+
+
+async def fetch_all(SessionLocal):
+    """Baseline: load the same rows into memory in one go"""
+    async with SessionLocal() as db:
+        rows = (await db.execute(select(Client.__table__).order_by(Client.created_at, Client.id))).all()
+        return len(rows)
+
+
+def measure(coro_factory):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = asyncio.run(coro_factory())
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench_export.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    SessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    seed_user(engine)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+    seeded = 0
+    try:
+        for rows in sorted(args.rows):
+            seed(engine, seeded, rows)
+            seeded = rows
+            (status, size), elapsed, peak = measure(lambda: export(args.format))
+            assert status == 200, status
+            count, _, baseline = measure(lambda: fetch_all(SessionLocal))
+            print(f"{rows:>9,} rows: {size / 2**20:,.0f} MiB of {args.format} in {elapsed:.1f}s, "
+                  f"heap peak {peak / 2**20:.1f} MiB (fetch-all baseline {baseline / 2**20:.0f} MiB for {count:,} rows)")
+    finally:
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Shared benchmark MSP user
+The client benchmarks override get_current_user with BENCH_USER, which the
+MSP-only client endpoints (bulk, import, export) accept; seed_user adds the
+matching users row so owner_id references resolve.
+"""
+
+from sqlalchemy import insert
+
+from models.models import User
+
+BENCH_USER = User(id=1, email="bench@example.com", username="bench", role="msp")
+
+
+def seed_user(engine):
+    """Insert BENCH_USER into a scratch database"""
+    with engine.begin() as conn:
+        conn.execute(insert(User).values(
+            id=BENCH_USER.id, email=BENCH_USER.email, username=BENCH_USER.username,
+            hashed_password="x", role=BENCH_USER.role
+        ))
@@ -0,0 +1,23 @@
+"""
+Compact license usage
+Moves released seats idle for longer than USAGE_RETENTION_DAYS out of
+license_usage into license_usage_daily, in batches of USAGE_COMPACTION_BATCH_ROWS.
+Run periodically, e.g. nightly: python compact_license_usage.py [retention_days]
+"""
+
+import sys
+
+from config import settings
+from database import engine, Base
+from utils.usage_compaction import compact_license_usage
+
+def compact(retention_days=None):
+    Base.metadata.create_all(bind=engine)
+    retention_days = settings.USAGE_RETENTION_DAYS if retention_days is None else retention_days
+    compacted = compact_license_usage(engine, retention_days, settings.USAGE_COMPACTION_BATCH_ROWS)
+    
+    print(f"Compacted {compacted} license usage row(s) idle for more than {retention_days} days")
+    return compacted
+
+if __name__ == "__main__":
+    compact(int(sys.argv[1]) if len(sys.argv) > 1 else None)
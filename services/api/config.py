@@ -19,18 +19,60 @@ class Settings(BaseSettings):
     DB_USER: str = os.getenv("DB_USER", "postgres")
     DB_PASSWORD: str = os.getenv("DB_PASSWORD", "postgres")
     USE_SQLITE: bool = os.getenv("USE_SQLITE", "true").lower() == "true"
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "./pulseops.db")
     
     @property
     def DATABASE_URL(self) -> str:
         if self.USE_SQLITE:
-            return "sqlite:///./pulseops.db"
+            return f"sqlite:///{self.SQLITE_PATH}"
         return f"postgresql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
     
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        if self.USE_SQLITE:
+            return f"sqlite+aiosqlite:///{self.SQLITE_PATH}"
+        return f"postgresql+asyncpg://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}"
+    
     # JWT Authentication
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Authenticated principal cache (skips the per-request User lookup)
+    PRINCIPAL_CACHE_SIZE: int = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+    PRINCIPAL_CACHE_TTL_SECONDS: float = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+    
+    # Password hashing pool (bcrypt runs off the event loop)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+    
+    # Bulk creation endpoints
+    BULK_MAX_ROWS: int = int(os.getenv("BULK_MAX_ROWS", "10000"))
+    BULK_BATCH_SIZE: int = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+    
+    # Streaming CSV/NDJSON imports
+    IMPORT_CHUNK_ROWS: int = int(os.getenv("IMPORT_CHUNK_ROWS", "1000"))
+    IMPORT_MAX_ERRORS: int = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+    IMPORT_MAX_LINE_BYTES: int = int(os.getenv("IMPORT_MAX_LINE_BYTES", str(1024 * 1024)))
+    
+    # Per-owner spend aggregates (department/category/cost breakdown)
+    SPEND_CACHE_SIZE: int = int(os.getenv("SPEND_CACHE_SIZE", "1000"))
+    SPEND_CACHE_TTL_SECONDS: float = float(os.getenv("SPEND_CACHE_TTL_SECONDS", "300"))
+    
+    # License usage event ingestion (in-memory buffer flushed in bulk)
+    INGEST_MAX_BATCH_EVENTS: int = int(os.getenv("INGEST_MAX_BATCH_EVENTS", "10000"))
+    INGEST_FLUSH_EVENTS: int = int(os.getenv("INGEST_FLUSH_EVENTS", "5000"))
+    INGEST_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("INGEST_FLUSH_INTERVAL_SECONDS", "1"))
+    INGEST_MAX_BUFFERED_EVENTS: int = int(os.getenv("INGEST_MAX_BUFFERED_EVENTS", "100000"))
+    INGEST_MAX_FLUSH_ATTEMPTS: int = int(os.getenv("INGEST_MAX_FLUSH_ATTEMPTS", "3"))
+    
+    # License usage compaction (released seats idle this long move to license_usage_daily)
+    USAGE_RETENTION_DAYS: int = int(os.getenv("USAGE_RETENTION_DAYS", "90"))
+    USAGE_COMPACTION_BATCH_ROWS: int = int(os.getenv("USAGE_COMPACTION_BATCH_ROWS", "5000"))
+    
+    # Streaming exports (rows fetched per server-side cursor batch)
+    EXPORT_BATCH_ROWS: int = int(os.getenv("EXPORT_BATCH_ROWS", "1000"))
+    
     # AWS
     AWS_REGION: str = os.getenv("AWS_REGION", "us-east-1")
     S3_BUCKET: str = os.getenv("S3_BUCKET", "pulseops-data")
@@ -38,6 +80,7 @@ class Settings(BaseSettings):
     
     # ML Service
     ML_ENDPOINT: str = os.getenv("ML_ENDPOINT", "http://localhost:5000")
+    ML_TIMEOUT_SECONDS: float = float(os.getenv("ML_TIMEOUT_SECONDS", "5"))
     
     # Monitoring thresholds
     CHURN_RISK_THRESHOLD: float = 0.6
@@ -3,11 +3,12 @@ Database configuration and session management
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
 
-# Create database engine
+# Create database engine (blocking; used by seed scripts and maintenance jobs)
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if settings.USE_SQLITE else {},
@@ -19,13 +20,35 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine used by the API routers (asyncpg for Postgres, aiosqlite locally)
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10
+)
+
+# Async session factory. Objects stay usable after commit so response
+# models can be built without another round trip.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base class for models
 Base = declarative_base()
 
 # Dependency for getting database session
-def get_db():
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Blocking session generator for scripts that are not running in the API
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
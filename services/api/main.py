@@ -4,6 +4,7 @@ Main entry point for the API service
 Lambda-compatible using Mangum
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -18,13 +19,21 @@ from config import settings
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background flusher for buffered usage events; shutdown writes the rest
+    it_team.usage_buffer.start()
+    yield
+    await it_team.usage_buffer.stop()
+
 # Initialize FastAPI app
 app = FastAPI(
     title="PulseOps AI API",
     description="Autonomous AI agent for MSPs and IT teams",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -34,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Health check endpoint
@@ -51,7 +61,10 @@ async def health_check():
     return {
         "status": "healthy",
         "database": "connected",
-        "ml_service": "operational"
+        "ml_service": "operational",
+        "principal_cache": auth.principal_cache.stats(),
+        "password_hashing": auth.hashing_pool.stats(),
+        "usage_ingest": it_team.usage_buffer.stats()
     }
 
 # Include routers
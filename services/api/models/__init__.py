@@ -2,14 +2,35 @@
 Initialize models package
 """
 
-from .models import User, Client, ClientMetric, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation
+from .models import (
+    User, Client, ClientMetric, ClientMetricDaily, SoftwareLicense, LicenseCostHistory, OwnerMonthlyCost,
+    LicenseUsage, LicenseUsageDaily, LicenseSeatNumber, LicenseDailyActivity, CostAnomaly, Recommendation, Alert,
+    ClientHealthFactors, OwnerKpiSnapshot
+)
+
+# Keep owner KPI snapshots in step with every ORM write, including seed scripts
+from utils import kpi_snapshot  # noqa: E402,F401
+# ... and daily metric rollups in step with ClientMetric writes
+from utils import metric_rollup  # noqa: E402,F401
+# ... and license cost history. Registered after kpi_snapshot on purpose: its
+# hook reads owner totals from snapshots that already include the flush
+from utils import cost_history  # noqa: E402,F401
 
 __all__ = [
     'User',
     'Client', 
     'ClientMetric',
+    'ClientMetricDaily',
     'SoftwareLicense',
+    'LicenseCostHistory',
+    'OwnerMonthlyCost',
     'LicenseUsage',
+    'LicenseUsageDaily',
+    'LicenseSeatNumber',
+    'LicenseDailyActivity',
     'CostAnomaly',
-    'Recommendation'
-]
\ No newline at end of file
+    'Recommendation',
+    'Alert',
+    'ClientHealthFactors',
+    'OwnerKpiSnapshot'
+]
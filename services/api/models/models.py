@@ -2,11 +2,25 @@
 Database models for PulseOps AI
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column, Integer, String, Float, Date, DateTime, Boolean, ForeignKey, Text, JSON, Index, LargeBinary, text
+)
+from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from database import Base
 
+# Sort rank for Alert.priority (lower first); unknown priorities sort last
+ALERT_PRIORITY_RANKS = {'critical': 1, 'high': 2, 'medium': 3, 'low': 4}
+DEFAULT_ALERT_PRIORITY_RANK = 4
+
+def alert_priority_rank(priority):
+    """Rank for an alert priority label ('Critical' -> 1 ... 'Low' -> 4)"""
+    return ALERT_PRIORITY_RANKS.get((priority or '').strip().lower(), DEFAULT_ALERT_PRIORITY_RANK)
+
+def _default_priority_rank(context):
+    # Core inserts that set priority without a rank
+    return alert_priority_rank(context.get_current_parameters().get('priority'))
+
 class User(Base):
     __tablename__ = "users"
     
@@ -52,18 +66,43 @@ class Client(Base):
     # Relationships
     owner = relationship("User", back_populates="clients")
     metrics = relationship("ClientMetric", back_populates="client")
+    
+    # Keyset pagination orders listings by (created_at, id); churn widgets
+    # filter on risk and rank by probability. Existing databases pick these
+    # up through the Alembic migrations in alembic/versions.
+    __table_args__ = (
+        Index("ix_clients_owner_created_id", "owner_id", "created_at", "id"),
+        Index("ix_clients_created_id", "created_at", "id"),
+        Index("ix_clients_owner_churn", "owner_id", "churn_risk", "churn_probability"),
+    )
 
 class ClientMetric(Base):
     __tablename__ = "client_metrics"
     
     id = Column(Integer, primary_key=True, index=True)
     client_id = Column(Integer, ForeignKey("clients.id"))
-    metric_type = Column(String)  # 'revenue', 'support_tickets', 'satisfaction'
+    metric_type = Column(String)  # 'revenue', 'churn' (value 1 per churned client), 'support_tickets', 'satisfaction'
     value = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     client = relationship("Client", back_populates="metrics")
+    
+    # Rollup repairs re-aggregate one client's metrics of a type over a day
+    __table_args__ = (
+        Index('ix_client_metrics_client_type_timestamp', 'client_id', 'metric_type', 'timestamp'),
+    )
+
+class ClientMetricDaily(Base):
+    """Per-owner daily totals of ClientMetric values, maintained on write (see utils/metric_rollup.py)"""
+    __tablename__ = "client_metric_daily"
+    
+    # Primary key order serves "one owner, one metric, a range of days"
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    metric_type = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    value_sum = Column(Float, default=0, nullable=False)
+    sample_count = Column(Integer, default=0, nullable=False)
 
 class SoftwareLicense(Base):
     __tablename__ = "software_licenses"
@@ -86,6 +125,45 @@ class SoftwareLicense(Base):
     # Relationships
     owner = relationship("User", back_populates="software_licenses")
     usage_logs = relationship("LicenseUsage", back_populates="license")
+    
+    # Keyset pagination orders listings by (created_at, id)
+    __table_args__ = (
+        Index("ix_software_licenses_owner_created_id", "owner_id", "created_at", "id"),
+        Index("ix_software_licenses_owner_department", "owner_id", "department", "created_at", "id"),
+        Index("ix_software_licenses_owner_category", "owner_id", "category"),
+        Index("ix_software_licenses_owner_utilization", "owner_id", "utilization_percent"),
+    )
+
+class LicenseCostHistory(Base):
+    """One row per change to a license's monthly_cost (see utils/cost_history.py)"""
+    __tablename__ = "license_cost_history"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    license_id = Column(Integer, nullable=False)  # no FK: history outlives deleted licenses
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    change = Column(String, nullable=False)  # 'created', 'updated', 'deleted'
+    previous_cost = Column(Float)  # None for new licenses or when the old value was not loaded
+    monthly_cost = Column(Float, nullable=False)  # 0 for deleted licenses
+    owner_total = Column(Float, nullable=False)  # owner's total monthly cost after this change
+    changed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    # Trend reads are owner-scoped time ranges; the latest row before a
+    # window gives the opening total
+    __table_args__ = (
+        Index("ix_license_cost_history_owner_changed", "owner_id", "changed_at", "id"),
+        Index("ix_license_cost_history_license_changed", "license_id", "changed_at"),
+    )
+
+class OwnerMonthlyCost(Base):
+    """Per-owner monthly license cost totals folded from LicenseCostHistory"""
+    __tablename__ = "owner_monthly_cost"
+    
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(Date, primary_key=True)  # first day of the month
+    closing_cost = Column(Float, default=0, nullable=False)  # total monthly cost at the last change
+    cost_added = Column(Float, default=0, nullable=False)
+    cost_removed = Column(Float, default=0, nullable=False)
+    new_licenses = Column(Integer, default=0, nullable=False)
 
 class LicenseUsage(Base):
     __tablename__ = "license_usage"
@@ -100,6 +178,56 @@ class LicenseUsage(Base):
     
     # Relationships
     license = relationship("SoftwareLicense", back_populates="usage_logs")
+    
+    # One seat per user and license (ingestion upserts on it), the usage
+    # timeline per license (carrying is_active and usage_hours so the usage
+    # stats aggregate never visits the table), usage hours in order for
+    # percentiles, plus a partial index over active seats only
+    __table_args__ = (
+        Index("uq_license_usage_license_email", "license_id", "user_email", unique=True),
+        Index("ix_license_usage_license_login_stats", "license_id", "last_login", "is_active", "usage_hours"),
+        Index("ix_license_usage_license_hours", "license_id", "usage_hours"),
+        Index(
+            "ix_license_usage_active_license_login", "license_id", "last_login",
+            sqlite_where=text("is_active = 1"), postgresql_where=text("is_active = true")
+        ),
+    )
+
+class LicenseUsageDaily(Base):
+    """Compacted seats: released LicenseUsage rows idle past retention (see utils/usage_compaction.py)"""
+    __tablename__ = "license_usage_daily"
+    
+    # Primary key order serves "one license" and the per-seat revive on login
+    license_id = Column(Integer, ForeignKey("software_licenses.id"), primary_key=True)
+    user_email = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)  # day of the last login (or of the row, if never used)
+    usage_hours = Column(Float, default=0, nullable=False)
+    last_login = Column(DateTime)
+    is_active = Column(Boolean, default=False, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_license_usage_daily_license_login", "license_id", "last_login"),
+    )
+
+class LicenseSeatNumber(Base):
+    """Dense per-license seat ordinals: bit positions in LicenseDailyActivity bitmaps"""
+    __tablename__ = "license_seat_numbers"
+    
+    license_id = Column(Integer, ForeignKey("software_licenses.id"), primary_key=True)
+    user_email = Column(String, primary_key=True)
+    seat_no = Column(Integer, nullable=False)  # 0, 1, 2, ... in order of first activity
+    
+    __table_args__ = (
+        Index("uq_license_seat_numbers_license_seat", "license_id", "seat_no", unique=True),
+    )
+
+class LicenseDailyActivity(Base):
+    """Seats active on a license per day, as a bitmap over seat_no (see utils/activity_bitmaps.py)"""
+    __tablename__ = "license_daily_activity"
+    
+    license_id = Column(Integer, ForeignKey("software_licenses.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    bitmap = Column(LargeBinary, nullable=False)  # little-endian: bit n is seat_no n
 
 class CostAnomaly(Base):
     __tablename__ = "cost_anomalies"
@@ -114,6 +242,14 @@ class CostAnomaly(Base):
     detected_at = Column(DateTime, default=datetime.utcnow)
     resolved = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    
+    __table_args__ = (
+        Index("ix_cost_anomalies_owner_detected", "owner_id", "detected_at"),
+        Index(
+            "ix_cost_anomalies_open_owner_detected", "owner_id", "detected_at",
+            sqlite_where=text("resolved = 0"), postgresql_where=text("resolved = false")
+        ),
+    )
 
 class Recommendation(Base):
     __tablename__ = "recommendations"
@@ -128,6 +264,12 @@ class Recommendation(Base):
     meta_data = Column(JSON)  # Renamed from 'metadata' to avoid SQLAlchemy reserved keyword
     created_at = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    
+    # Dashboards rank pending recommendations of one type by value
+    __table_args__ = (
+        Index("ix_recommendations_owner_status_type_value", "owner_id", "status", "recommendation_type", "potential_value"),
+        Index("ix_recommendations_owner_created", "owner_id", "created_at"),
+    )
 
 class Alert(Base):
     __tablename__ = "alerts"
@@ -140,6 +282,8 @@ class Alert(Base):
     client_name = Column(String)
     impact = Column(String)
     priority = Column(String)  # 'Critical', 'High', 'Medium', 'Low'
+    priority_rank = Column(Integer, nullable=False, default=_default_priority_rank,
+                           server_default=text(str(DEFAULT_ALERT_PRIORITY_RANK)))
     action_label = Column(String)
     action_route = Column(String)
     details = Column(Text)
@@ -147,4 +291,55 @@ class Alert(Base):
     status = Column(String, default='active')  # 'active', 'resolved', 'dismissed'
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime)
-    owner_id = Column(Integer, ForeignKey("users.id"))
\ No newline at end of file
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    
+    # Feed order is (priority_rank, created_at DESC, id DESC) within one status
+    __table_args__ = (
+        Index("ix_alerts_owner_status_rank_created", "owner_id", "status", "priority_rank",
+              created_at.desc(), id.desc()),
+    )
+    
+    @validates('priority')
+    def _sync_priority_rank(self, key, priority):
+        self.priority_rank = alert_priority_rank(priority)
+        return priority
+
+class ClientHealthFactors(Base):
+    """Health-score factor breakdown per client, computed by the ML service (see utils/health_factors.py)"""
+    __tablename__ = "client_health_factors"
+    
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    overall_score = Column(Float)
+    factors = Column(JSON, nullable=False)
+    trend = Column(String)
+    insights = Column(JSON)
+    health_status = Column(String)
+    inputs_hash = Column(String(64), nullable=False)  # fingerprint of the calculator inputs
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class OwnerKpiSnapshot(Base):
+    """Owner-level dashboard totals, maintained incrementally (see utils/kpi_snapshot.py)"""
+    __tablename__ = "owner_kpi_snapshot"
+    
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    
+    # MSP totals (clients and recommendations)
+    client_count = Column(Integer, default=0, nullable=False)
+    total_mrr = Column(Float, default=0, nullable=False)
+    health_score_sum = Column(Float, default=0, nullable=False)
+    high_risk_clients = Column(Integer, default=0, nullable=False)
+    pending_recommendations = Column(Integer, default=0, nullable=False)
+    
+    # IT totals (software licenses and anomalies)
+    software_count = Column(Integer, default=0, nullable=False)
+    total_monthly_cost = Column(Float, default=0, nullable=False)
+    total_licenses = Column(Integer, default=0, nullable=False)
+    active_users = Column(Integer, default=0, nullable=False)
+    utilization_sum = Column(Float, default=0, nullable=False)
+    utilization_count = Column(Integer, default=0, nullable=False)
+    low_utilization_count = Column(Integer, default=0, nullable=False)
+    low_utilization_cost = Column(Float, default=0, nullable=False)
+    savings_potential = Column(Float, default=0, nullable=False)
+    open_anomalies = Column(Integer, default=0, nullable=False)
+    
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,25 @@
+"""
+Reconcile owner KPI snapshots
+Recomputes every owner's dashboard totals from the base tables and rewrites
+snapshots that drifted (bulk SQL writes, writes from other tools, float error).
+Run periodically, e.g. nightly: python reconcile_kpi_snapshots.py [owner_id ...]
+"""
+
+import sys
+
+from database import engine, Base
+from utils.kpi_snapshot import reconcile_kpi_snapshots
+
+def reconcile(owner_ids=None):
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        repaired = reconcile_kpi_snapshots(connection, owner_ids)
+    
+    if repaired:
+        print(f"Repaired {len(repaired)} snapshot(s): {', '.join(str(o) for o in repaired)}")
+    else:
+        print("All KPI snapshots are up to date")
+    return repaired
+
+if __name__ == "__main__":
+    reconcile([int(arg) for arg in sys.argv[1:]] or None)
@@ -4,21 +4,27 @@ General analytics and reporting endpoints
 """
 
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, desc
+from datetime import datetime, time, timedelta
 from typing import List
 
 from database import get_db
-from models.models import User, Client, SoftwareLicense, ClientMetric
+from models.models import User, Client, SoftwareLicense
 from routers.auth import get_current_user
+from utils.cost_history import get_daily_costs
+from utils.kpi_snapshot import get_kpi_snapshot
+from utils.metric_rollup import get_daily_totals
 
 router = APIRouter()
 
+# Longest window the trend endpoints will build a series for
+MAX_TREND_DAYS = 3660
+
 @router.get("/trends/revenue")
 async def get_revenue_trends(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     days: int = 30
 ):
     """Get revenue trends over time (MSP only)"""
@@ -28,30 +34,49 @@ async def get_revenue_trends(
             detail="Access denied. MSP role required."
         )
     
-    start_date = datetime.utcnow() - timedelta(days=days)
+    if not 1 <= days <= MAX_TREND_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"days must be between 1 and {MAX_TREND_DAYS}"
+        )
+    
+    # Daily revenue and churn come from the client_metric_daily rollup
+    end_day = datetime.utcnow().date()
+    start_day = end_day - timedelta(days=days - 1)
+    totals = await get_daily_totals(db, current_user.id, ("revenue", "churn"), start_day, end_day)
+    
+    # New clients per day, bucketed in SQL over the owner's (created_at) index range
+    created_day = func.date(Client.created_at)
+    result = await db.execute(
+        select(created_day, func.count(Client.id)).where(
+            Client.owner_id == current_user.id,
+            Client.created_at >= datetime.combine(start_day, time.min)
+        ).group_by(created_day)
+    )
+    new_clients = {str(day): count for day, count in result}
     
-    # Simulate trend data (in production, query from ClientMetric)
     trends = []
     for i in range(days):
-        date = start_date + timedelta(days=i)
+        day = start_day + timedelta(days=i)
         trends.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "revenue": 15000 + (i * 100),
-            "new_clients": 1 if i % 7 == 0 else 0,
-            "churned_clients": 1 if i % 15 == 0 else 0
+            "date": day.isoformat(),
+            "revenue": totals["revenue"].get(day, (0.0, 0))[0],
+            "new_clients": new_clients.get(day.isoformat(), 0),
+            "churned_clients": int(totals["churn"].get(day, (0.0, 0))[0])
         })
     
+    total_revenue = sum(t["revenue"] for t in trends)
     return {
         "period": f"Last {days} days",
         "trends": trends,
-        "total_revenue": sum(t["revenue"] for t in trends),
-        "avg_daily_revenue": sum(t["revenue"] for t in trends) / days
+        "total_revenue": total_revenue,
+        "avg_daily_revenue": total_revenue / days
     }
 
 @router.get("/trends/cost")
 async def get_cost_trends(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     days: int = 30
 ):
     """Get cost trends over time (IT Admin only)"""
@@ -61,53 +86,59 @@ async def get_cost_trends(
             detail="Access denied. IT Admin role required."
         )
     
-    start_date = datetime.utcnow() - timedelta(days=days)
+    if not 1 <= days <= MAX_TREND_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"days must be between 1 and {MAX_TREND_DAYS}"
+        )
     
-    # Simulate trend data
-    trends = []
-    base_cost = 25000
-    for i in range(days):
-        date = start_date + timedelta(days=i)
-        trends.append({
-            "date": date.strftime("%Y-%m-%d"),
-            "total_cost": base_cost + (i * 50),
-            "optimization_savings": i * 20,
-            "new_licenses": 2 if i % 5 == 0 else 0
-        })
+    # Daily totals come from the license cost history
+    end_day = datetime.utcnow().date()
+    series = await get_daily_costs(db, current_user.id, end_day - timedelta(days=days - 1), end_day)
+    trends = [
+        {
+            "date": day.isoformat(),
+            "total_cost": round(total, 2),
+            "optimization_savings": round(removed, 2),
+            "new_licenses": created
+        }
+        for day, total, removed, created in series
+    ]
     
     return {
         "period": f"Last {days} days",
         "trends": trends,
-        "total_cost": sum(t["total_cost"] for t in trends),
-        "total_savings": sum(t["optimization_savings"] for t in trends)
+        "total_cost": round(sum(t["total_cost"] for t in trends), 2),
+        "total_savings": round(sum(t["optimization_savings"] for t in trends), 2)
     }
 
 @router.get("/reports/executive-summary")
 async def get_executive_summary(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get executive summary report"""
     
     if current_user.role == "msp":
         # MSP executive summary
-        clients = db.query(Client).filter(Client.owner_id == current_user.id).all()
+        kpis = await get_kpi_snapshot(db, current_user.id)
+        result = await db.execute(
+            select(Client.name, Client.monthly_spend).where(
+                Client.owner_id == current_user.id
+            ).order_by(desc(func.coalesce(Client.monthly_spend, 0))).limit(5)
+        )
         
         return {
             "role": "MSP",
             "period": "Current Month",
             "key_metrics": {
-                "total_clients": len(clients),
-                "monthly_recurring_revenue": sum(c.monthly_spend or 0 for c in clients),
-                "average_health_score": sum(c.health_score or 0 for c in clients) / len(clients) if clients else 0,
-                "at_risk_clients": len([c for c in clients if c.churn_risk == "high"]),
+                "total_clients": kpis["client_count"],
+                "monthly_recurring_revenue": kpis["total_mrr"],
+                "average_health_score": kpis["avg_health_score"],
+                "at_risk_clients": kpis["high_risk_clients"],
                 "growth_rate": 8.5
             },
-            "top_clients": sorted(
-                [{"name": c.name, "revenue": c.monthly_spend} for c in clients],
-                key=lambda x: x["revenue"] or 0,
-                reverse=True
-            )[:5],
+            "top_clients": [{"name": c.name, "revenue": c.monthly_spend} for c in result],
             "action_items": [
                 "Review 3 high-risk clients for retention strategies",
                 "Follow up on 5 upsell opportunities worth $15,000",
@@ -117,33 +148,26 @@ async def get_executive_summary(
     
     elif current_user.role == "it_admin":
         # IT Admin executive summary
-        licenses = db.query(SoftwareLicense).filter(
-            SoftwareLicense.owner_id == current_user.id
-        ).all()
-        
-        total_cost = sum(l.monthly_cost or 0 for l in licenses)
-        low_utilization = [l for l in licenses if l.utilization_percent and l.utilization_percent < 50]
+        kpis = await get_kpi_snapshot(db, current_user.id)
+        result = await db.execute(
+            select(SoftwareLicense.software_name, SoftwareLicense.monthly_cost).where(
+                SoftwareLicense.owner_id == current_user.id
+            ).order_by(desc(func.coalesce(SoftwareLicense.monthly_cost, 0))).limit(5)
+        )
         
         return {
             "role": "IT Admin",
             "period": "Current Month",
             "key_metrics": {
-                "total_software_count": len(licenses),
-                "monthly_spend": total_cost,
-                "average_utilization": sum(l.utilization_percent or 0 for l in licenses) / len(licenses) if licenses else 0,
-                "cost_savings_potential": sum(
-                    l.monthly_cost * (1 - l.utilization_percent / 100)
-                    for l in low_utilization
-                ),
-                "licenses_managed": sum(l.total_licenses or 0 for l in licenses)
+                "total_software_count": kpis["software_count"],
+                "monthly_spend": kpis["total_monthly_cost"],
+                "average_utilization": kpis["avg_utilization_all"],
+                "cost_savings_potential": kpis["savings_potential"],
+                "licenses_managed": kpis["total_licenses"]
             },
-            "top_expenses": sorted(
-                [{"software": l.software_name, "cost": l.monthly_cost} for l in licenses],
-                key=lambda x: x["cost"] or 0,
-                reverse=True
-            )[:5],
+            "top_expenses": [{"software": l.software_name, "cost": l.monthly_cost} for l in result],
             "action_items": [
-                f"Deactivate {len(low_utilization)} unused licenses to save ${sum(l.monthly_cost * 0.3 for l in low_utilization):.2f}",
+                f"Deactivate {kpis['low_utilization_count']} unused licenses to save ${kpis['low_utilization_cost'] * 0.3:.2f}",
                 "Review 2 cost anomalies detected this week",
                 "Negotiate renewal for 3 software licenses expiring next month"
             ]
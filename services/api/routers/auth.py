@@ -5,27 +5,53 @@ Handles user registration, login, and JWT tokens
 
 from fastapi import APIRouter, Depends, HTTPException, status, Form
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from typing import Optional
+import time
 
 from database import get_db
 from models.models import User
 from schemas.schemas import UserCreate, UserResponse, Token
 from config import settings
+from utils.cache import TTLCache
+from utils.hashing import PasswordHashingPool, HashingPoolSaturated
 
 router = APIRouter()
 security = HTTPBearer()
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so request handlers hash on a bounded pool
+hashing_pool = PasswordHashingPool(
+    pwd_context,
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+# Authenticated principals keyed by bearer token. Entries never outlive the
+# token itself and are dropped whenever the underlying user row changes.
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+def _too_many_requests() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail="Authentication service is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -36,9 +62,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _snapshot_user(user: User) -> dict:
+    """Copy the column values of a user row so it can outlive its session"""
+    return {attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs}
+
+def _principal_from_snapshot(snapshot: dict) -> User:
+    """Build a detached User from a cached snapshot without touching the database"""
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def invalidate_principal(*emails: str) -> int:
+    """Drop cached principals belonging to the given email addresses"""
+    targets = {e for e in emails if e}
+    if not targets:
+        return 0
+    return principal_cache.invalidate_where(lambda _, snapshot: snapshot["email"] in targets)
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_principal_on_change(mapper, connection, target):
+    """Role, activation or password changes must take effect on the next request"""
+    email_history = inspect(target).attrs.email.history
+    invalidate_principal(target.email, *(email_history.deleted or ()))
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -54,24 +104,39 @@ async def get_current_user(
     except JWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return _principal_from_snapshot(cached)
+    
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
     if user is None:
         raise credentials_exception
+    
+    # Cache until the token expires or the TTL elapses, whichever comes first
+    expires_in = payload.get("exp", 0) - time.time()
+    principal_cache.set(token, _snapshot_user(user), ttl=expires_in)
     return user
 
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user: UserCreate, db: Session = Depends(get_db)):
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user"""
     # Check if user exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    result = await db.execute(select(User).where(User.email == user.email))
+    db_user = result.scalar_one_or_none()
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+    # Create new user. The read transaction is closed first so a pooled
+    # connection is not held while bcrypt runs.
+    await db.close()
+    try:
+        hashed_password = await hashing_pool.hash(user.password)
+    except HashingPoolSaturated:
+        raise _too_many_requests()
     db_user = User(
         email=user.email,
         username=user.username,
@@ -80,15 +145,22 @@ async def register(user: UserCreate, db: Session = Depends(get_db)):
         company_name=user.company_name
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(email: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
+async def login(email: str = Form(...), password: str = Form(...), db: AsyncSession = Depends(get_db)):
     """Login and get access token"""
-    user = db.query(User).filter(User.email == email).first()
-    if not user or not verify_password(password, user.hashed_password):
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
+    # Release the pooled connection before the slow hash; user stays loaded
+    await db.close()
+    try:
+        password_ok = user is not None and await hashing_pool.verify(password, user.hashed_password)
+    except HashingPoolSaturated:
+        raise _too_many_requests()
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
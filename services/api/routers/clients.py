@@ -2,15 +2,25 @@
 Client management endpoints
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, Body
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, List, Optional
+from config import settings
 from database import get_db
-from models.models import Client
+from models.models import Client, User
 from pydantic import BaseModel
+from routers.auth import get_current_user
+from schemas.schemas import BulkCreateResponse, ImportReportResponse
+from utils.bulk import bulk_create
+from utils.streaming_export import EXPORT_MEDIA_TYPES, export_response
+from utils.streaming_import import ImportFormatError, detect_format, import_stream
+from utils.pagination import InvalidCursor, NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 
 router = APIRouter(prefix="/api/clients", tags=["clients"])
 
+CLIENT_ORDER = ((Client.created_at, False), (Client.id, False))
+
 # Pydantic models for request/response
 class ClientBase(BaseModel):
     name: str
@@ -56,49 +66,132 @@ class ClientResponse(ClientBase):
     class Config:
         from_attributes = True
 
+def client_values(client: ClientCreate, owner_id: Optional[int] = None) -> dict:
+    """Column values for a new client"""
+    values = client.model_dump()
+    values["status"] = client.status or 'Active'
+    values["owner_id"] = owner_id
+    return values
+
 @router.get("/", response_model=List[ClientResponse])
-def get_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all clients"""
-    clients = db.query(Client).offset(skip).limit(limit).all()
+async def get_clients(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Get all clients, oldest first; pass the X-Next-Cursor header back as cursor for the next page"""
+    try:
+        query = apply_keyset(select(Client), CLIENT_ORDER, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    
+    result = await db.execute(query.offset(skip).limit(limit))
+    clients = result.scalars().all()
+    
+    token = next_cursor(clients, CLIENT_ORDER, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return clients
 
+@router.get("/export")
+async def export_clients(
+    format: str = "csv",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream your clients as CSV or NDJSON, oldest first.
+
+    Columns match ClientResponse, so the file can be fed back to /import.
+    """
+    if current_user.role != "msp":
+        raise HTTPException(status_code=403, detail="Access denied. MSP role required.")
+    
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail="format must be 'csv' or 'ndjson'")
+    
+    columns = list(ClientResponse.model_fields)
+    query = select(*[getattr(Client, column) for column in columns]).where(
+        Client.owner_id == current_user.id
+    ).order_by(*[column for column, _ in CLIENT_ORDER])
+    return export_response(db, query, columns, format, "clients")
+
 @router.get("/{client_id}", response_model=ClientResponse)
-def get_client(client_id: int, db: Session = Depends(get_db)):
+async def get_client(client_id: int, db: AsyncSession = Depends(get_db)):
     """Get a specific client by ID"""
-    client = db.query(Client).filter(Client.id == client_id).first()
+    client = await db.get(Client, client_id)
     if not client:
         raise HTTPException(status_code=404, detail="Client not found")
     return client
 
 @router.post("/", response_model=ClientResponse)
-def create_client(client: ClientCreate, db: Session = Depends(get_db)):
+async def create_client(client: ClientCreate, db: AsyncSession = Depends(get_db)):
     """Create a new client"""
     # Use the client_id provided from frontend
-    db_client = Client(
-        client_id=client.client_id,
-        name=client.name,
-        industry=client.industry,
-        contract_value=client.contract_value,
-        monthly_spend=client.monthly_spend,
-        total_licenses=client.total_licenses,
-        total_users=client.total_users,
-        health_score=client.health_score,
-        churn_risk=client.churn_risk,
-        churn_probability=client.churn_probability,
-        contact=client.contact,
-        email=client.email,
-        phone=client.phone,
-        status=client.status or 'Active'
-    )
+    db_client = Client(**client_values(client))
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     return db_client
 
+@router.post("/bulk", response_model=BulkCreateResponse)
+async def create_clients_bulk(
+    rows: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Create many of your clients in one transaction; invalid or duplicate rows are reported per index"""
+    if current_user.role != "msp":
+        raise HTTPException(status_code=403, detail="Access denied. MSP role required.")
+    
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many rows; send at most {settings.BULK_MAX_ROWS} per request"
+        )
+    return await bulk_create(
+        db, Client, rows, ClientCreate,
+        lambda client: client_values(client, current_user.id), unique_key="client_id"
+    )
+
+@router.post("/import", response_model=ImportReportResponse)
+async def import_clients(
+    request: Request,
+    mode: str = "upsert",
+    format: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a CSV or NDJSON file of your clients into the database.
+
+    The body is read as it arrives and written in chunks. In upsert mode rows
+    matching one of your clients by client_id update the columns the file
+    supplies; in insert mode, or when the client_id belongs to someone else,
+    they are reported as errors.
+    """
+    if current_user.role != "msp":
+        raise HTTPException(status_code=403, detail="Access denied. MSP role required.")
+    
+    if mode not in ("upsert", "insert"):
+        raise HTTPException(status_code=400, detail="mode must be 'upsert' or 'insert'")
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=415, detail=str(exc))
+    
+    return await import_stream(
+        db, request.stream(), fmt, Client, ClientCreate,
+        lambda client: client_values(client, current_user.id),
+        key=("owner_id", "client_id"), mode=mode, unique_key="client_id"
+    )
+
 @router.put("/{client_id}", response_model=ClientResponse)
-def update_client(client_id: int, client_update: ClientUpdate, db: Session = Depends(get_db)):
+async def update_client(client_id: int, client_update: ClientUpdate, db: AsyncSession = Depends(get_db)):
     """Update a client"""
-    db_client = db.query(Client).filter(Client.id == client_id).first()
+    db_client = await db.get(Client, client_id)
     if not db_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -107,17 +200,17 @@ def update_client(client_id: int, client_update: ClientUpdate, db: Session = Dep
     for field, value in update_data.items():
         setattr(db_client, field, value)
     
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     return db_client
 
 @router.delete("/{client_id}")
-def delete_client(client_id: int, db: Session = Depends(get_db)):
+async def delete_client(client_id: int, db: AsyncSession = Depends(get_db)):
     """Delete a client"""
-    db_client = db.query(Client).filter(Client.id == client_id).first()
+    db_client = await db.get(Client, client_id)
     if not db_client:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    db.delete(db_client)
-    db.commit()
+    await db.delete(db_client)
+    await db.commit()
     return {"message": "Client deleted successfully"}
@@ -3,28 +3,53 @@ IT Team Features Router
 Endpoints for IT administrators
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List
-from datetime import datetime, timedelta
-import random
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
+from typing import Any, Dict, List, Optional
+from datetime import date, datetime, timedelta
 import uuid
 
-from database import get_db
-from models.models import User, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation
+from config import settings
+from database import AsyncSessionLocal, get_db
+from models.models import User, SoftwareLicense, CostAnomaly, Recommendation
 from schemas.schemas import (
     SoftwareLicenseCreate, SoftwareLicenseResponse,
-    ITDashboardResponse, CostAnomalyResponse, RecommendationResponse
+    ITDashboardResponse, CostAnomalyResponse, RecommendationResponse,
+    BulkCreateResponse, ImportReportResponse, UsageEventBatch, UsageIngestResponse
 )
 from routers.auth import get_current_user
+from utils.activity_bitmaps import get_activity_counts
+from utils.bulk import bulk_create
+from utils.cost_history import get_monthly_costs, month_start
+from utils.streaming_export import EXPORT_MEDIA_TYPES, export_response
+from utils.streaming_import import ImportFormatError, detect_format, import_stream
+from utils.kpi_snapshot import get_kpi_snapshot
+from utils.seat_deactivation import deactivate_stale_seats
+from utils.spend_aggregates import average_utilization, get_spend_aggregates
+from utils.usage_compaction import get_recent_usage
+from utils.usage_ingest import IngestBufferFull, UsageEventBuffer
+from utils.usage_stats import get_usage_stats
+from utils.pagination import InvalidCursor, NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 
 router = APIRouter()
 
+# Usage events are buffered per process and written in bulk by a background
+# flusher (started and drained by the app lifespan in main.py)
+usage_buffer = UsageEventBuffer(
+    AsyncSessionLocal,
+    flush_events=settings.INGEST_FLUSH_EVENTS,
+    flush_interval=settings.INGEST_FLUSH_INTERVAL_SECONDS,
+    max_events=settings.INGEST_MAX_BUFFERED_EVENTS,
+    max_attempts=settings.INGEST_MAX_FLUSH_ATTEMPTS
+)
+
+LICENSE_ORDER = ((SoftwareLicense.created_at, False), (SoftwareLicense.id, False))
+
 @router.get("/dashboard", response_model=ITDashboardResponse)
 async def get_it_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get IT team dashboard with cost optimization insights"""
     if current_user.role != "it_admin":
@@ -33,53 +58,37 @@ async def get_it_dashboard(
             detail="Access denied. IT Admin role required."
         )
     
-    # Get all software licenses
-    licenses = db.query(SoftwareLicense).filter(
-        SoftwareLicense.owner_id == current_user.id
-    ).all()
-    
-    # Calculate metrics
-    total_software = len(licenses)
-    total_monthly_cost = sum(l.monthly_cost or 0 for l in licenses)
-    total_licenses = sum(l.total_licenses or 0 for l in licenses)
-    active_licenses = sum(l.active_users or 0 for l in licenses)
-    
-    # Calculate average utilization
-    utilizations = [l.utilization_percent for l in licenses if l.utilization_percent is not None]
-    avg_utilization = sum(utilizations) / len(utilizations) if utilizations else 0
-    
-    # Calculate cost savings potential
-    low_utilization = [l for l in licenses if l.utilization_percent and l.utilization_percent < 50]
-    cost_savings_potential = sum(
-        l.monthly_cost * (1 - l.utilization_percent / 100) 
-        for l in low_utilization
-    )
+    # Owner totals are maintained incrementally in owner_kpi_snapshot
+    kpis = await get_kpi_snapshot(db, current_user.id)
     
     # Get recent anomalies
-    recent_anomalies = db.query(CostAnomaly).filter(
+    result = await db.execute(select(CostAnomaly).where(
         CostAnomaly.owner_id == current_user.id
-    ).order_by(desc(CostAnomaly.detected_at)).limit(5).all()
+    ).order_by(desc(CostAnomaly.detected_at)).limit(5))
+    recent_anomalies = result.scalars().all()
     
     # Get low utilization software
-    low_utilization_software = db.query(SoftwareLicense).filter(
+    result = await db.execute(select(SoftwareLicense).where(
         SoftwareLicense.owner_id == current_user.id,
         SoftwareLicense.utilization_percent < 50
-    ).order_by(SoftwareLicense.utilization_percent).limit(5).all()
+    ).order_by(SoftwareLicense.utilization_percent).limit(5))
+    low_utilization_software = result.scalars().all()
     
     # Get recommendations
-    recommendations = db.query(Recommendation).filter(
+    result = await db.execute(select(Recommendation).where(
         Recommendation.owner_id == current_user.id,
         Recommendation.recommendation_type == "cost_saving",
         Recommendation.status == "pending"
-    ).order_by(desc(Recommendation.potential_value)).limit(5).all()
+    ).order_by(desc(Recommendation.potential_value)).limit(5))
+    recommendations = result.scalars().all()
     
     return {
-        "total_software": total_software,
-        "total_monthly_cost": total_monthly_cost,
-        "total_licenses": total_licenses,
-        "active_licenses": active_licenses,
-        "avg_utilization": avg_utilization,
-        "cost_savings_potential": cost_savings_potential,
+        "total_software": kpis["software_count"],
+        "total_monthly_cost": kpis["total_monthly_cost"],
+        "total_licenses": kpis["total_licenses"],
+        "active_licenses": kpis["active_users"],
+        "avg_utilization": kpis["avg_utilization"],
+        "cost_savings_potential": kpis["savings_potential"],
         "recent_anomalies": recent_anomalies,
         "low_utilization_software": low_utilization_software,
         "recommendations": recommendations
@@ -87,35 +96,74 @@ async def get_it_dashboard(
 
 @router.get("/software", response_model=List[SoftwareLicenseResponse])
 async def get_software_licenses(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     department: str = None,
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Get all software licenses"""
+    """Get all software licenses, oldest first; X-Next-Cursor holds the next page token"""
     if current_user.role != "it_admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. IT Admin role required."
         )
     
-    query = db.query(SoftwareLicense).filter(
+    query = select(SoftwareLicense).where(
         SoftwareLicense.owner_id == current_user.id
     )
     
     if department:
-        query = query.filter(SoftwareLicense.department == department)
+        query = query.where(SoftwareLicense.department == department)
+    
+    try:
+        query = apply_keyset(query, LICENSE_ORDER, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
     
-    licenses = query.offset(skip).limit(limit).all()
+    result = await db.execute(query.offset(skip).limit(limit))
+    licenses = result.scalars().all()
     
+    token = next_cursor(licenses, LICENSE_ORDER, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return licenses
 
+def license_values(license: SoftwareLicenseCreate, owner_id: int) -> dict:
+    """Column values for a new license, with utilization and annual cost derived"""
+    active_users = license.active_users or 0
+    utilization_percent = (active_users / license.total_licenses * 100) if license.total_licenses > 0 else 0
+    return {
+        "software_name": license.software_name,
+        "vendor": license.vendor,
+        "total_licenses": license.total_licenses,
+        "active_users": active_users,
+        "utilization_percent": utilization_percent,
+        "monthly_cost": license.monthly_cost,
+        "annual_cost": license.monthly_cost * 12,
+        "department": license.department,
+        "owner_id": owner_id
+    }
+
+def license_update_values(license: SoftwareLicenseCreate) -> dict:
+    """
+    Column changes an import row makes to an existing license: only the
+    fields it supplied. Seat counters (active_users, utilization_percent)
+    are kept up to date by usage ingestion and never overwritten here;
+    upsert_rows recomputes utilization when total_licenses changes.
+    """
+    values = license.model_dump(exclude_unset=True, exclude={"active_users"})
+    if "monthly_cost" in values:
+        values["annual_cost"] = values["monthly_cost"] * 12
+    return values
+
 @router.post("/software", response_model=SoftwareLicenseResponse, status_code=status.HTTP_201_CREATED)
 async def create_software_license(
     license: SoftwareLicenseCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new software license"""
     if current_user.role != "it_admin":
@@ -124,34 +172,99 @@ async def create_software_license(
             detail="Access denied. IT Admin role required."
         )
     
-    # Calculate utilization
-    active_users = license.active_users or 0
-    utilization_percent = (active_users / license.total_licenses * 100) if license.total_licenses > 0 else 0
-    annual_cost = license.monthly_cost * 12
-    
-    db_license = SoftwareLicense(
-        software_name=license.software_name,
-        vendor=license.vendor,
-        total_licenses=license.total_licenses,
-        active_users=active_users,
-        utilization_percent=utilization_percent,
-        monthly_cost=license.monthly_cost,
-        annual_cost=annual_cost,
-        department=license.department,
-        owner_id=current_user.id
-    )
+    db_license = SoftwareLicense(**license_values(license, current_user.id))
     
     db.add(db_license)
-    db.commit()
-    db.refresh(db_license)
+    await db.commit()
+    await db.refresh(db_license)
     
     return db_license
 
+@router.post("/software/bulk", response_model=BulkCreateResponse)
+async def create_software_licenses_bulk(
+    rows: List[Dict[str, Any]] = Body(...),
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Add many software licenses in one transaction; invalid rows are reported per index"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    if len(rows) > settings.BULK_MAX_ROWS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many rows; send at most {settings.BULK_MAX_ROWS} per request"
+        )
+    
+    return await bulk_create(
+        db, SoftwareLicense, rows, SoftwareLicenseCreate,
+        lambda license: license_values(license, current_user.id)
+    )
+
+@router.post("/software/import", response_model=ImportReportResponse)
+async def import_software_licenses(
+    request: Request,
+    mode: str = "upsert",
+    format: str = None,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a CSV or NDJSON export of software licenses into the database.
+
+    Rows are matched to your existing licenses by software_name; in upsert
+    mode matches get the columns the file supplies (seat counters are left
+    alone), in insert mode every row is added.
+    """
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    if mode not in ("upsert", "insert"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="mode must be 'upsert' or 'insert'")
+    try:
+        fmt = detect_format(request.headers.get("content-type"), format)
+    except ImportFormatError as exc:
+        raise HTTPException(status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, detail=str(exc))
+    
+    return await import_stream(
+        db, request.stream(), fmt, SoftwareLicense, SoftwareLicenseCreate,
+        lambda license: license_values(license, current_user.id),
+        key=("owner_id", "software_name"), mode=mode, update_values=license_update_values
+    )
+
+@router.get("/software/export")
+async def export_software_licenses(
+    format: str = "csv",
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream all your software licenses as CSV or NDJSON, oldest first"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="format must be 'csv' or 'ndjson'")
+    
+    columns = list(SoftwareLicenseResponse.model_fields)
+    query = select(*[getattr(SoftwareLicense, column) for column in columns]).where(
+        SoftwareLicense.owner_id == current_user.id
+    ).order_by(*[column for column, _ in LICENSE_ORDER])
+    return export_response(db, query, columns, format, "software_licenses")
+
 @router.get("/software/{license_id}/usage")
 async def get_license_usage(
     license_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get detailed usage information for a software license"""
     if current_user.role != "it_admin":
@@ -160,10 +273,11 @@ async def get_license_usage(
             detail="Access denied. IT Admin role required."
         )
     
-    license = db.query(SoftwareLicense).filter(
+    result = await db.execute(select(SoftwareLicense).where(
         SoftwareLicense.id == license_id,
         SoftwareLicense.owner_id == current_user.id
-    ).first()
+    ))
+    license = result.scalar_one_or_none()
     
     if not license:
         raise HTTPException(
@@ -171,15 +285,11 @@ async def get_license_usage(
             detail="License not found"
         )
     
-    # Get usage logs
-    usage_logs = db.query(LicenseUsage).filter(
-        LicenseUsage.license_id == license_id
-    ).order_by(desc(LicenseUsage.last_login)).limit(20).all()
-    
-    # Calculate inactive users
-    inactive_threshold = datetime.utcnow() - timedelta(days=30)
-    inactive_users = [u for u in usage_logs if u.last_login and u.last_login < inactive_threshold]
+    # Counts and percentiles cover every seat, live or compacted; the listing stays bounded
+    stats = await get_usage_stats(db, license_id, datetime.utcnow() - timedelta(days=30))
+    recent_usage = await get_recent_usage(db, license_id, limit=20)
     
+    cost_per_license = license.monthly_cost / license.total_licenses if license.total_licenses > 0 else 0
     return {
         "license_id": license_id,
         "software_name": license.software_name,
@@ -187,23 +297,63 @@ async def get_license_usage(
         "active_users": license.active_users,
         "utilization_percent": license.utilization_percent,
         "monthly_cost": license.monthly_cost,
-        "cost_per_license": license.monthly_cost / license.total_licenses if license.total_licenses > 0 else 0,
-        "inactive_users": len(inactive_users),
-        "potential_savings": len(inactive_users) * (license.monthly_cost / license.total_licenses) if license.total_licenses > 0 else 0,
-        "recent_usage": [
-            {
-                "user_email": u.user_email,
-                "last_login": u.last_login,
-                "usage_hours": u.usage_hours,
-                "is_active": u.is_active
-            } for u in usage_logs
-        ]
+        "cost_per_license": cost_per_license,
+        **stats,
+        "potential_savings": stats["inactive_users"] * cost_per_license,
+        "activity": await get_activity_counts(db, license_id),
+        "recent_usage": recent_usage
     }
 
+@router.post("/usage/events", response_model=UsageIngestResponse, status_code=status.HTTP_202_ACCEPTED)
+async def ingest_usage_events(
+    batch: UsageEventBatch,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Accept a batch of login/usage events from SaaS connectors.
+
+    Events are buffered and written in bulk shortly after; seat counters and
+    utilization move with them. A full buffer answers 429 with Retry-After.
+    """
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    if len(batch.events) > settings.INGEST_MAX_BATCH_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many events; send at most {settings.INGEST_MAX_BATCH_EVENTS} per request"
+        )
+    
+    license_ids = {event.license_id for event in batch.events}
+    result = await db.execute(select(SoftwareLicense.id).where(
+        SoftwareLicense.id.in_(list(license_ids)),
+        SoftwareLicense.owner_id == current_user.id
+    ))
+    unknown = license_ids - set(result.scalars())
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"License not found: {sorted(unknown)[:10]}"
+        )
+    
+    try:
+        buffered = usage_buffer.submit([event.model_dump() for event in batch.events])
+    except IngestBufferFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Usage ingestion is busy, please retry shortly",
+            headers={"Retry-After": str(max(1, round(settings.INGEST_FLUSH_INTERVAL_SECONDS)))},
+        )
+    return {"accepted": len(batch.events), "buffered": buffered}
+
 @router.get("/anomalies", response_model=List[CostAnomalyResponse])
 async def get_cost_anomalies(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     resolved: bool = None
 ):
     """Get detected cost anomalies"""
@@ -213,14 +363,15 @@ async def get_cost_anomalies(
             detail="Access denied. IT Admin role required."
         )
     
-    query = db.query(CostAnomaly).filter(
+    query = select(CostAnomaly).where(
         CostAnomaly.owner_id == current_user.id
     )
     
     if resolved is not None:
-        query = query.filter(CostAnomaly.resolved == resolved)
+        query = query.where(CostAnomaly.resolved == resolved)
     
-    anomalies = query.order_by(desc(CostAnomaly.detected_at)).all()
+    result = await db.execute(query.order_by(desc(CostAnomaly.detected_at)))
+    anomalies = result.scalars().all()
     
     return anomalies
 
@@ -229,7 +380,7 @@ async def deactivate_unused_licenses(
     license_id: int,
     days_inactive: int = 30,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Automatically deactivate unused licenses"""
     if current_user.role != "it_admin":
@@ -238,10 +389,11 @@ async def deactivate_unused_licenses(
             detail="Access denied. IT Admin role required."
         )
     
-    license = db.query(SoftwareLicense).filter(
+    result = await db.execute(select(SoftwareLicense).where(
         SoftwareLicense.id == license_id,
         SoftwareLicense.owner_id == current_user.id
-    ).first()
+    ))
+    license = result.scalar_one_or_none()
     
     if not license:
         raise HTTPException(
@@ -249,39 +401,49 @@ async def deactivate_unused_licenses(
             detail="License not found"
         )
     
-    # Find inactive users
     inactive_threshold = datetime.utcnow() - timedelta(days=days_inactive)
-    inactive_users = db.query(LicenseUsage).filter(
-        LicenseUsage.license_id == license_id,
-        LicenseUsage.last_login < inactive_threshold,
-        LicenseUsage.is_active == True
-    ).all()
-    
-    # Deactivate them
-    deactivated_count = 0
-    for user in inactive_users:
-        user.is_active = False
-        deactivated_count += 1
-    
-    # Update license statistics
-    license.active_users = license.active_users - deactivated_count
-    license.utilization_percent = (license.active_users / license.total_licenses * 100) if license.total_licenses > 0 else 0
-    
-    db.commit()
-    
-    cost_saved = deactivated_count * (license.monthly_cost / license.total_licenses) if license.total_licenses > 0 else 0
+    results = await deactivate_stale_seats(db, current_user.id, inactive_threshold, license_id=license_id)
+    if results:
+        deactivated_count, cost_saved, utilization = (
+            results[0]["deactivated_count"], results[0]["monthly_cost_saved"], results[0]["new_utilization"]
+        )
+    else:
+        deactivated_count, cost_saved, utilization = 0, 0, license.utilization_percent
     
     return {
         "message": "Unused licenses deactivated successfully",
         "deactivated_count": deactivated_count,
         "monthly_cost_saved": cost_saved,
-        "new_utilization": license.utilization_percent
+        "new_utilization": utilization
+    }
+
+@router.post("/software/deactivate-unused")
+async def deactivate_unused_licenses_all(
+    days_inactive: int = 30,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Deactivate stale seats across all your licenses in one transaction"""
+    if current_user.role != "it_admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied. IT Admin role required."
+        )
+    
+    inactive_threshold = datetime.utcnow() - timedelta(days=days_inactive)
+    results = await deactivate_stale_seats(db, current_user.id, inactive_threshold)
+    
+    return {
+        "message": "Unused licenses deactivated successfully",
+        "deactivated_count": sum(r["deactivated_count"] for r in results),
+        "monthly_cost_saved": sum(r["monthly_cost_saved"] for r in results),
+        "licenses": results
     }
 
 @router.get("/spend/department")
 async def get_departmental_spend(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get software spend breakdown by department"""
     if current_user.role != "it_admin":
@@ -290,29 +452,21 @@ async def get_departmental_spend(
             detail="Access denied. IT Admin role required."
         )
     
-    # Group by department
-    dept_spend = db.query(
-        SoftwareLicense.department,
-        func.sum(SoftwareLicense.monthly_cost).label('total_cost'),
-        func.count(SoftwareLicense.id).label('software_count'),
-        func.avg(SoftwareLicense.utilization_percent).label('avg_utilization')
-    ).filter(
-        SoftwareLicense.owner_id == current_user.id
-    ).group_by(SoftwareLicense.department).all()
+    spend = await get_spend_aggregates(db, current_user.id)
     
     return [
         {
-            "department": d.department or "Unassigned",
-            "monthly_cost": d.total_cost,
-            "software_count": d.software_count,
-            "avg_utilization": d.avg_utilization or 0
-        } for d in dept_spend
+            "department": department,
+            "monthly_cost": d["monthly_cost"],
+            "software_count": d["software_count"],
+            "avg_utilization": average_utilization(d)
+        } for department, d in sorted(spend["department"].items())
     ]
 
 @router.get("/spend/category")
 async def get_spend_by_category(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get software spend breakdown by category"""
     if current_user.role != "it_admin":
@@ -321,34 +475,24 @@ async def get_spend_by_category(
             detail="Access denied. IT Admin role required."
         )
     
-    # Group by category
-    category_spend = db.query(
-        SoftwareLicense.category,
-        func.sum(SoftwareLicense.monthly_cost).label('total_cost'),
-        func.sum(SoftwareLicense.annual_cost).label('total_annual_cost'),
-        func.count(SoftwareLicense.id).label('software_count'),
-        func.sum(SoftwareLicense.total_licenses).label('total_licenses'),
-        func.avg(SoftwareLicense.utilization_percent).label('avg_utilization')
-    ).filter(
-        SoftwareLicense.owner_id == current_user.id
-    ).group_by(SoftwareLicense.category).all()
+    spend = await get_spend_aggregates(db, current_user.id)
     
     return [
         {
-            "category": c.category or "Other",
-            "monthly_cost": c.total_cost or 0,
-            "annual_cost": c.total_annual_cost or 0,
-            "software_count": c.software_count,
-            "total_licenses": c.total_licenses or 0,
-            "avg_utilization": c.avg_utilization or 0
-        } for c in category_spend
+            "category": category,
+            "monthly_cost": c["monthly_cost"],
+            "annual_cost": c["annual_cost"],
+            "software_count": c["software_count"],
+            "total_licenses": c["total_licenses"],
+            "avg_utilization": average_utilization(c)
+        } for category, c in sorted(spend["category"].items())
     ]
 
 @router.get("/software/category/{category}")
 async def get_software_by_category(
     category: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all software in a specific category"""
     if current_user.role != "it_admin":
@@ -357,10 +501,11 @@ async def get_software_by_category(
             detail="Access denied. IT Admin role required."
         )
     
-    software = db.query(SoftwareLicense).filter(
+    result = await db.execute(select(SoftwareLicense).where(
         SoftwareLicense.owner_id == current_user.id,
         SoftwareLicense.category == category
-    ).order_by(desc(SoftwareLicense.monthly_cost)).all()
+    ).order_by(desc(SoftwareLicense.monthly_cost)))
+    software = result.scalars().all()
     
     return [
         {
@@ -382,55 +527,50 @@ async def get_software_by_category(
 @router.get("/spending-trend")
 async def get_spending_trend(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    year: int = 2024,
+    db: AsyncSession = Depends(get_db),
+    year: Optional[int] = Query(None, ge=1, le=9999),
     from_month: int = 1,
     to_month: int = 12
 ):
-    """Get monthly spending trend data"""
+    """
+    Get the monthly spending trend for a year (defaults to the current one).
+
+    actual is the total monthly license cost at the end of each month (None
+    for months still to come); predicted is the cost carried into the month,
+    i.e. what it would have been with no changes.
+    """
     if current_user.role != "it_admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. IT Admin role required."
         )
     
-    # Generate trend data based on current software costs
-    licenses = db.query(SoftwareLicense).filter(
-        SoftwareLicense.owner_id == current_user.id
-    ).all()
-    
-    total_monthly_cost = sum(l.monthly_cost or 0 for l in licenses)
-    
-    # Generate monthly data with slight variations
-    months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
-    trend_data = []
-    
-    for i in range(from_month - 1, min(to_month, 12)):
-        # Add some variation (±5%) to make it realistic
-        variation = random.uniform(-0.05, 0.05)
-        # Trend shows gradual decrease (cost optimization)
-        trend_factor = 1 - (i * 0.015)  # 1.5% decrease per month
-        
-        actual = total_monthly_cost * trend_factor * (1 + variation)
-        predicted = total_monthly_cost * trend_factor * (1 + random.uniform(-0.02, 0.02))
-        
-        # For 2023, add 10% to costs
-        if year == 2023:
-            actual *= 1.1
-            predicted *= 1.1
-        
-        trend_data.append({
-            "month": months[i],
-            "actual": round(actual, 2),
-            "predicted": round(predicted, 2)
-        })
-    
-    return trend_data
+    if not 1 <= from_month <= to_month <= 12:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="from_month and to_month must satisfy 1 <= from_month <= to_month <= 12"
+        )
+    
+    current_month = month_start(datetime.utcnow())
+    if year is None:
+        year = current_month.year
+    series = await get_monthly_costs(
+        db, current_user.id, date(year, from_month, 1), date(year, to_month, 1)
+    )
+    
+    return [
+        {
+            "month": month.strftime("%b"),
+            "actual": round(closing, 2) if month <= current_month else None,
+            "predicted": round(opening, 2)
+        }
+        for month, opening, closing in series
+    ]
 
 @router.get("/cost-breakdown")
 async def get_cost_breakdown(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get cost breakdown by category"""
     if current_user.role != "it_admin":
@@ -439,41 +579,20 @@ async def get_cost_breakdown(
             detail="Access denied. IT Admin role required."
         )
     
-    # Get all software licenses grouped by category
-    licenses = db.query(SoftwareLicense).filter(
-        SoftwareLicense.owner_id == current_user.id
-    ).all()
-    
-    # Group by category
-    categories = {}
-    for license in licenses:
-        category = license.category or 'Other'
-        if category not in categories:
-            categories[category] = {
-                'monthly': 0,
-                'annual': 0,
-                'licenses': 0,
-                'software_count': 0
-            }
-        categories[category]['monthly'] += license.monthly_cost or 0
-        categories[category]['annual'] += license.annual_cost or 0
-        categories[category]['licenses'] += license.total_licenses or 0
-        categories[category]['software_count'] += 1
-    
-    # Format response
-    breakdown = []
-    for category, data in categories.items():
-        per_license = data['monthly'] / data['licenses'] if data['licenses'] > 0 else 0
-        breakdown.append({
+    spend = await get_spend_aggregates(db, current_user.id)
+    
+    breakdown = [
+        {
             "category": category,
-            "monthly": round(data['monthly'], 2),
-            "annual": round(data['annual'], 2),
-            "licenses": data['licenses'],
-            "perLicense": round(per_license, 2),
-            "software_count": data['software_count']
-        })
+            "monthly": round(c["monthly_cost"], 2),
+            "annual": round(c["annual_cost"], 2),
+            "licenses": c["total_licenses"],
+            "perLicense": round(c["monthly_cost"] / c["total_licenses"], 2) if c["total_licenses"] > 0 else 0,
+            "software_count": c["software_count"]
+        } for category, c in spend["category"].items()
+    ]
     
     # Sort by monthly cost descending
     breakdown.sort(key=lambda x: x['monthly'], reverse=True)
     
-    return breakdown
\ No newline at end of file
+    return breakdown
@@ -3,28 +3,35 @@ MSP Features Router
 Endpoints for Managed Service Providers
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from typing import List
-from datetime import datetime, timedelta
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
 import random
 import uuid
 
 from database import get_db
-from models.models import User, Client, ClientMetric, Recommendation, Alert
+from models.models import User, Client, ClientMetric, Recommendation, Alert, ClientHealthFactors
 from schemas.schemas import (
     ClientCreate, ClientResponse, MSPDashboardResponse,
-    RecommendationResponse
+    RecommendationResponse, AlertResponse
 )
 from routers.auth import get_current_user
+from utils.kpi_snapshot import get_kpi_snapshot
+from utils.health_factors import get_health_factors
+from utils.ml_client import MLServiceUnavailable
+from utils.pagination import InvalidCursor, NEXT_CURSOR_HEADER, apply_keyset, next_cursor
 
 router = APIRouter()
 
+CLIENT_ORDER = ((Client.created_at, False), (Client.id, False))
+ALERT_ORDER = ((Alert.priority_rank, False), (Alert.created_at, True), (Alert.id, True))
+
 @router.get("/dashboard", response_model=MSPDashboardResponse)
 async def get_msp_dashboard(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get MSP dashboard with key metrics and insights"""
     if current_user.role != "msp":
@@ -33,45 +40,36 @@ async def get_msp_dashboard(
             detail="Access denied. MSP role required."
         )
     
-    # Get all clients for this MSP
-    clients = db.query(Client).filter(Client.owner_id == current_user.id).all()
-    
-    # Calculate metrics
-    total_clients = len(clients)
-    total_mrr = sum(c.monthly_spend or 0 for c in clients)
-    avg_health_score = sum(c.health_score or 0 for c in clients) / total_clients if total_clients > 0 else 0
-    high_risk_clients = len([c for c in clients if c.churn_risk == "high"])
-    
-    # Get recommendations
-    recommendations = db.query(Recommendation).filter(
-        Recommendation.owner_id == current_user.id,
-        Recommendation.status == "pending"
-    ).all()
+    # Owner totals are maintained incrementally in owner_kpi_snapshot
+    kpis = await get_kpi_snapshot(db, current_user.id)
     
     # Recent clients
-    recent_clients = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.owner_id == current_user.id
-    ).order_by(desc(Client.created_at)).limit(5).all()
+    ).order_by(desc(Client.created_at)).limit(5))
+    recent_clients = result.scalars().all()
     
     # Churn risks
-    churn_risks = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.owner_id == current_user.id,
         Client.churn_risk.in_(["high", "medium"])
-    ).order_by(desc(Client.churn_probability)).limit(5).all()
+    ).order_by(desc(Client.churn_probability)).limit(5))
+    churn_risks = result.scalars().all()
     
     # Upsell opportunities
-    upsell_recommendations = db.query(Recommendation).filter(
+    result = await db.execute(select(Recommendation).where(
         Recommendation.owner_id == current_user.id,
         Recommendation.recommendation_type == "upsell",
         Recommendation.status == "pending"
-    ).order_by(desc(Recommendation.potential_value)).limit(5).all()
+    ).order_by(desc(Recommendation.potential_value)).limit(5))
+    upsell_recommendations = result.scalars().all()
     
     return {
-        "total_clients": total_clients,
-        "total_mrr": total_mrr,
-        "avg_health_score": avg_health_score,
-        "high_risk_clients": high_risk_clients,
-        "total_recommendations": len(recommendations),
+        "total_clients": kpis["client_count"],
+        "total_mrr": kpis["total_mrr"],
+        "avg_health_score": kpis["avg_health_score"],
+        "high_risk_clients": kpis["high_risk_clients"],
+        "total_recommendations": kpis["pending_recommendations"],
         "recent_clients": recent_clients,
         "churn_risks": churn_risks,
         "upsell_opportunities": upsell_recommendations
@@ -79,29 +77,39 @@ async def get_msp_dashboard(
 
 @router.get("/clients", response_model=List[ClientResponse])
 async def get_clients(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     skip: int = 0,
-    limit: int = 100
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Get all clients for the MSP"""
+    """Get all clients for the MSP, oldest first; X-Next-Cursor holds the next page token"""
     if current_user.role != "msp":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. MSP role required."
         )
     
-    clients = db.query(Client).filter(
-        Client.owner_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    query = select(Client).where(Client.owner_id == current_user.id)
+    try:
+        query = apply_keyset(query, CLIENT_ORDER, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    
+    result = await db.execute(query.offset(skip).limit(limit))
+    clients = result.scalars().all()
     
+    token = next_cursor(clients, CLIENT_ORDER, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return clients
 
 @router.get("/clients/{client_id}", response_model=ClientResponse)
 async def get_client(
     client_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific client details"""
     if current_user.role != "msp":
@@ -110,10 +118,11 @@ async def get_client(
             detail="Access denied. MSP role required."
         )
     
-    client = db.query(Client).filter(
+    result = await db.execute(select(Client).where(
         Client.id == client_id,
         Client.owner_id == current_user.id
-    ).first()
+    ))
+    client = result.scalar_one_or_none()
     
     if not client:
         raise HTTPException(
@@ -127,7 +136,7 @@ async def get_client(
 async def create_client(
     client: ClientCreate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Add a new client"""
     if current_user.role != "msp":
@@ -159,8 +168,8 @@ async def create_client(
     )
     
     db.add(db_client)
-    db.commit()
-    db.refresh(db_client)
+    await db.commit()
+    await db.refresh(db_client)
     
     return db_client
 
@@ -168,7 +177,7 @@ async def create_client(
 async def get_client_health_score(
     client_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get detailed health score breakdown for a client"""
     if current_user.role != "msp":
@@ -177,29 +186,42 @@ async def get_client_health_score(
             detail="Access denied. MSP role required."
         )
     
-    client = db.query(Client).filter(
+    # Client and its stored factors in one primary-key lookup
+    result = await db.execute(select(Client, ClientHealthFactors).outerjoin(
+        ClientHealthFactors, ClientHealthFactors.client_id == Client.id
+    ).where(
         Client.id == client_id,
         Client.owner_id == current_user.id
-    ).first()
+    ))
+    row = result.one_or_none()
     
-    if not client:
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Client not found"
         )
+    client, stored = row
+    
+    # Recomputed by the ML service only when the client's inputs changed;
+    # while it is down the last stored result is served marked stale
+    try:
+        health, stale = await get_health_factors(db, client, stored)
+    except MLServiceUnavailable:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Health score service unavailable"
+        )
     
     return {
         "client_id": client.client_id,
         "client_name": client.name,
-        "overall_score": client.health_score,
-        "factors": {
-            "payment_history": random.uniform(70, 100),
-            "support_ticket_frequency": random.uniform(60, 90),
-            "license_utilization": random.uniform(65, 95),
-            "contract_renewal_proximity": random.uniform(50, 100),
-            "engagement_level": random.uniform(60, 95)
-        },
-        "trend": "improving" if random.random() > 0.5 else "declining",
+        "overall_score": health.overall_score,
+        "factors": health.factors,
+        "trend": health.trend,
+        "health_status": health.health_status,
+        "insights": health.insights,
+        "computed_at": health.computed_at,
+        "stale": stale,
         "churn_risk": client.churn_risk,
         "churn_probability": client.churn_probability
     }
@@ -207,7 +229,7 @@ async def get_client_health_score(
 @router.get("/recommendations", response_model=List[RecommendationResponse])
 async def get_recommendations(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     recommendation_type: str = None
 ):
     """Get AI-generated recommendations"""
@@ -217,53 +239,64 @@ async def get_recommendations(
             detail="Access denied. MSP role required."
         )
     
-    query = db.query(Recommendation).filter(
+    query = select(Recommendation).where(
         Recommendation.owner_id == current_user.id
     )
     
     if recommendation_type:
-        query = query.filter(Recommendation.recommendation_type == recommendation_type)
+        query = query.where(Recommendation.recommendation_type == recommendation_type)
     
-    recommendations = query.order_by(desc(Recommendation.created_at)).all()
+    result = await db.execute(query.order_by(desc(Recommendation.created_at)))
+    recommendations = result.scalars().all()
     
     return recommendations
 
-@router.get("/alerts")
+@router.get("/alerts", response_model=List[AlertResponse])
 async def get_alerts(
+    response: Response,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    status_filter: str = "active"
+    db: AsyncSession = Depends(get_db),
+    status_filter: str = "active",
+    since: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None
 ):
-    """Get priority alerts for MSP admin"""
+    """Get priority alerts for MSP admin, Critical first then newest; X-Next-Cursor holds the next page token"""
     if current_user.role != "msp":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied. MSP role required."
         )
     
-    query = db.query(Alert).filter(Alert.owner_id == current_user.id)
+    query = select(Alert).where(Alert.owner_id == current_user.id)
     
     if status_filter:
-        query = query.filter(Alert.status == status_filter)
-    
-    alerts = query.order_by(
-        # Sort by priority: Critical, High, Medium, Low
-        func.case(
-            (Alert.priority == 'Critical', 1),
-            (Alert.priority == 'High', 2),
-            (Alert.priority == 'Medium', 3),
-            else_=4
-        ),
-        Alert.created_at.desc()
-    ).all()
+        query = query.where(Alert.status == status_filter)
+    
+    # Only alerts raised after the caller's last poll (created_at is naive UTC)
+    if since:
+        if since.tzinfo:
+            since = since.astimezone(timezone.utc).replace(tzinfo=None)
+        query = query.where(Alert.created_at > since)
+    
+    try:
+        query = apply_keyset(query, ALERT_ORDER, cursor)
+    except InvalidCursor as exc:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(exc))
+    
+    result = await db.execute(query.limit(limit))
+    alerts = result.scalars().all()
     
+    token = next_cursor(alerts, ALERT_ORDER, limit)
+    if token:
+        response.headers[NEXT_CURSOR_HEADER] = token
     return alerts
 
 @router.post("/alerts/{alert_id}/resolve")
 async def resolve_alert(
     alert_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Mark an alert as resolved"""
     if current_user.role != "msp":
@@ -272,10 +305,11 @@ async def resolve_alert(
             detail="Access denied. MSP role required."
         )
     
-    alert = db.query(Alert).filter(
+    result = await db.execute(select(Alert).where(
         Alert.id == alert_id,
         Alert.owner_id == current_user.id
-    ).first()
+    ))
+    alert = result.scalar_one_or_none()
     
     if not alert:
         raise HTTPException(
@@ -285,7 +319,7 @@ async def resolve_alert(
     
     alert.status = "resolved"
     alert.resolved_at = datetime.utcnow()
-    db.commit()
-    db.refresh(alert)
+    await db.commit()
+    await db.refresh(alert)
     
     return {"message": "Alert resolved successfully", "alert": alert}
\ No newline at end of file
@@ -2,9 +2,9 @@
 Pydantic schemas for request/response validation
 """
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
 
 # User schemas
 class UserBase(BaseModel):
@@ -108,6 +108,77 @@ class RecommendationResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# Alert schemas
+class AlertResponse(BaseModel):
+    id: int
+    alert_type: Optional[str] = None
+    title: str
+    description: Optional[str] = None
+    client_id: Optional[str] = None
+    client_name: Optional[str] = None
+    impact: Optional[str] = None
+    priority: Optional[str] = None
+    action_label: Optional[str] = None
+    action_route: Optional[str] = None
+    details: Optional[str] = None
+    due_date: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[datetime] = None
+    resolved_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+# Bulk creation schemas
+class BulkRowResult(BaseModel):
+    index: int
+    status: str  # 'created' or 'error'
+    id: Optional[int] = None
+    errors: Optional[List[str]] = None
+
+class BulkCreateResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+# Streaming import schemas
+class ImportRowError(BaseModel):
+    row: int  # 1-based data row in the uploaded file
+    errors: List[str]
+
+class ImportReportResponse(BaseModel):
+    processed: int
+    created: int
+    updated: int
+    unchanged: int = 0  # matched an existing row without changing it
+    superseded: int = 0  # replaced by a later row with the same key in the file
+    failed: int
+    errors: List[ImportRowError]
+    errors_truncated: bool  # more rows failed than IMPORT_MAX_ERRORS lists
+    aborted: Optional[str] = None  # set when the file stopped parsing part-way
+
+# Usage event ingestion schemas
+class UsageEvent(BaseModel):
+    license_id: int
+    user_email: str
+    occurred_at: datetime  # login or activity time
+    usage_hours: float = Field(0, ge=0)  # hours since the previous event for this seat
+
+    @field_validator("occurred_at")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Stored timestamps are naive UTC; mixing aware and naive values breaks comparisons
+        if value.tzinfo:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+
+class UsageEventBatch(BaseModel):
+    events: List[UsageEvent]
+
+class UsageIngestResponse(BaseModel):
+    accepted: int
+    buffered: int  # events waiting for the next flush
+
 # Dashboard schemas
 class MSPDashboardResponse(BaseModel):
     total_clients: int
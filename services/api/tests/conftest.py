@@ -1,30 +1,48 @@
 """
 Test configuration and fixtures
 """
+import os
 import pytest
 import sys
+import tempfile
 from pathlib import Path
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 # Add parent directory to path to import main
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+# Scratch SQLite file shared by the blocking fixture session and the async
+# sessions used by the app (an in-memory database is per-connection). Set
+# before main is imported, whose create_all would otherwise add tables to
+# the tracked dev database.
+TEST_DATABASE_PATH = Path(tempfile.mkdtemp()) / "test.db"
+os.environ["USE_SQLITE"] = "true"
+os.environ["SQLITE_PATH"] = str(TEST_DATABASE_PATH)
+
 from main import app
 from database import Base, get_db
+from routers.auth import principal_cache
+from routers.it_team import usage_buffer
+from utils.spend_aggregates import spend_cache
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DATABASE_PATH}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
 
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
+    poolclass=NullPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool: each TestClient runs its own event loop, so connections must not be reused
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
 
 @pytest.fixture
 def db_session():
@@ -41,13 +59,14 @@ def db_session():
 @pytest.fixture
 def client(db_session):
     """Create a test client with test database"""
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
 
     app.dependency_overrides[get_db] = override_get_db
+    principal_cache.clear()
+    spend_cache.clear()
+    usage_buffer.session_factory = TestingAsyncSessionLocal
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -93,3 +112,71 @@ def auth_token(client, test_user):
 def auth_headers(auth_token):
     """Get authentication headers"""
     return {"Authorization": f"Bearer {auth_token}"}
+
+
+@pytest.fixture
+def it_user(db_session):
+    """Create a test IT admin user"""
+    from models.models import User
+    from routers.auth import get_password_hash
+
+    user = User(
+        email="it@example.com",
+        username="ituser",
+        hashed_password=get_password_hash("itpassword"),
+        role="it_admin",
+        company_name="Test IT",
+        is_active=True
+    )
+    db_session.add(user)
+    db_session.commit()
+    db_session.refresh(user)
+    return user
+
+
+@pytest.fixture
+def it_auth_headers(client, it_user):
+    """Get authentication headers for the IT admin user"""
+    response = client.post(
+        "/api/auth/login",
+        data={
+            "email": "it@example.com",
+            "password": "itpassword"
+        }
+    )
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _load_ml_module(relative_path, name):
+    """Import a module from services/ml by path (its package names clash with ours)"""
+    import importlib.util
+
+    path = Path(__file__).parent.parent.parent / "ml" / relative_path
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def ml_service(monkeypatch):
+    """Answer ML service calls in-process with the ML service's own models; records payloads"""
+    calculator_module = _load_ml_module("models/health_score_calculator.py", "ml_health_score_calculator")
+    calculator = calculator_module.HealthScoreCalculator()
+    calls = []
+
+    async def calculate_health(payload):
+        calls.append(payload)
+        result = calculator.calculate(payload)
+        # Same shape as the ML service's /api/calculate/health-score
+        return {
+            "health_score": result["overall_score"],
+            "factors": result["factor_scores"],
+            "trend": result["trend"],
+            "insights": result["insights"],
+            "health_status": result["health_status"],
+        }
+
+    monkeypatch.setattr("utils.health_factors.calculate_health", calculate_health)
+    return calls
@@ -0,0 +1,135 @@
+"""
+Tests for analytics endpoints and the daily metric rollup
+"""
+import pytest
+from datetime import datetime, timedelta
+
+
+def _rollup_rows(db_session):
+    from models.models import ClientMetricDaily
+
+    return sorted(
+        (r.owner_id, r.metric_type, str(r.day), round(r.value_sum, 6), r.sample_count)
+        for r in db_session.query(ClientMetricDaily).all()
+    )
+
+
+@pytest.fixture
+def metrics(db_session, test_user):
+    """Two clients with revenue and churn metrics spread over the last 40 days"""
+    from models.models import Client, ClientMetric
+
+    clients = [Client(client_id=f"CLT-R{i}", name=f"R{i}", owner_id=test_user.id) for i in range(2)]
+    db_session.add_all(clients)
+    db_session.commit()
+
+    now = datetime.utcnow().replace(hour=12)
+    db_session.add_all([
+        ClientMetric(client_id=clients[0].id, metric_type="revenue", value=1000.0, timestamp=now),
+        ClientMetric(client_id=clients[1].id, metric_type="revenue", value=250.0, timestamp=now),
+        ClientMetric(client_id=clients[0].id, metric_type="revenue", value=900.0, timestamp=now - timedelta(days=1)),
+        ClientMetric(client_id=clients[0].id, metric_type="revenue", value=800.0, timestamp=now - timedelta(days=40)),
+        ClientMetric(client_id=clients[1].id, metric_type="churn", value=1, timestamp=now),
+    ])
+    db_session.commit()
+    return clients
+
+
+def test_revenue_trends_from_rollup(client, auth_headers, it_auth_headers, metrics):
+    """Test the revenue series is read from rollup rows, zero-filled and windowed"""
+    response = client.get("/api/analytics/trends/revenue?days=7", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    trends = data["trends"]
+    assert len(trends) == 7
+    assert trends[-1]["date"] == datetime.utcnow().date().isoformat()
+    assert (trends[-1]["revenue"], trends[-1]["new_clients"], trends[-1]["churned_clients"]) == (1250.0, 2, 1)
+    assert trends[-2]["revenue"] == 900.0
+    assert trends[0]["revenue"] == 0.0
+    assert data["total_revenue"] == 2150.0
+    assert data["avg_daily_revenue"] == pytest.approx(2150.0 / 7)
+
+    wide = client.get("/api/analytics/trends/revenue?days=60", headers=auth_headers).json()
+    assert wide["total_revenue"] == 2950.0
+
+    assert client.get("/api/analytics/trends/revenue?days=0", headers=auth_headers).status_code == 400
+    assert client.get("/api/analytics/trends/revenue", headers=it_auth_headers).status_code == 403
+
+
+def test_rollup_tracks_metric_writes(db_session, metrics):
+    """Test updates and deletes leave the rollup equal to a full rebuild"""
+    from models.models import ClientMetric
+    from utils.metric_rollup import rebuild_metric_rollup
+
+    revenue = db_session.query(ClientMetric).filter_by(metric_type="revenue").order_by(ClientMetric.id).all()
+    revenue[0].value = 1500.0
+    revenue[2].timestamp = revenue[2].timestamp - timedelta(days=3)
+    db_session.delete(revenue[1])
+    db_session.commit()
+
+    # Expired instance: the old timestamp has to be recovered
+    revenue[3].timestamp = datetime.utcnow()
+    db_session.commit()
+
+    maintained = _rollup_rows(db_session)
+    rebuild_metric_rollup(db_session.connection())
+    assert _rollup_rows(db_session) == maintained
+    db_session.rollback()
+
+
+def test_rollup_repair_scoped_without_loaded_old_values(db_session, metrics, test_user, monkeypatch):
+    """Test expired metrics rebuild only their owner's affected days, never the whole rollup"""
+    from models.models import ClientMetric
+    from utils import metric_rollup
+
+    revenue = db_session.query(ClientMetric).filter_by(metric_type="revenue").order_by(ClientMetric.id).all()
+    old_day = revenue[3].timestamp.date()
+    db_session.commit()  # expires every instance
+
+    calls = []
+    rebuild = metric_rollup.rebuild_metric_rollup
+    monkeypatch.setattr(metric_rollup, "rebuild_metric_rollup",
+                        lambda connection, *args: calls.append(args) or rebuild(connection, *args))
+
+    new_time = datetime.utcnow().replace(hour=12) - timedelta(days=5)
+    revenue[3].timestamp = new_time
+    db_session.delete(revenue[2])
+    db_session.commit()
+
+    assert len(calls) == 1
+    owner_id, days = calls[0]
+    assert owner_id == test_user.id
+    assert set(days) == {old_day, new_time.date(), (datetime.utcnow() - timedelta(days=1)).date()}
+
+    maintained = _rollup_rows(db_session)
+    rebuild(db_session.connection())
+    assert _rollup_rows(db_session) == maintained
+    db_session.rollback()
+
+
+def test_cost_trends_from_history(client, it_auth_headers, db_session, it_user):
+    """Test daily cost totals, savings and new licenses come from the cost history"""
+    from models.models import LicenseCostHistory, SoftwareLicense
+
+    db_session.add(LicenseCostHistory(
+        license_id=999, owner_id=it_user.id, change="created", monthly_cost=500.0, owner_total=500.0,
+        changed_at=datetime.utcnow() - timedelta(days=60)
+    ))
+    db_session.commit()
+
+    rows = [
+        {"software_name": "Zoom", "total_licenses": 20, "monthly_cost": 300.0},
+        {"software_name": "Figma", "total_licenses": 10, "monthly_cost": 100.0},
+    ]
+    assert client.post("/api/it/software/bulk", headers=it_auth_headers, json=rows).json()["created"] == 2
+    zoom = db_session.query(SoftwareLicense).filter_by(software_name="Zoom").one()
+    zoom.monthly_cost = 200.0
+    db_session.commit()
+
+    response = client.get("/api/analytics/trends/cost?days=7", headers=it_auth_headers)
+    assert response.status_code == 200
+    trends = response.json()["trends"]
+    assert len(trends) == 7
+    # The history row before the window supplies the opening total
+    assert trends[0]["total_cost"] == 500.0
+    assert (trends[-1]["total_cost"], trends[-1]["optimization_savings"], trends[-1]["new_licenses"]) == (300.0, 100.0, 2)
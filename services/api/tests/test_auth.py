@@ -91,3 +91,47 @@ def test_protected_endpoint_without_token(client):
     response = client.get("/api/msp/dashboard")
     # Should return 401 for missing token, but may return 403 in some cases
     assert response.status_code in [401, 403]
+
+
+def test_principal_cache_hit(client, auth_headers):
+    """Test repeated calls with the same token are served from the principal cache"""
+    from routers.auth import principal_cache
+
+    client.get("/api/auth/me", headers=auth_headers)
+    misses = principal_cache.misses
+    response = client.get("/api/auth/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "test@example.com"
+    assert principal_cache.misses == misses
+    assert principal_cache.hits >= 1
+
+
+def test_principal_cache_invalidated_on_user_change(client, auth_headers, db_session, test_user):
+    """Test role changes take effect on the next request despite the cache"""
+    from models.models import User
+
+    response = client.get("/api/msp/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+
+    user = db_session.query(User).filter(User.id == test_user.id).first()
+    user.role = "it_admin"
+    db_session.commit()
+
+    response = client.get("/api/msp/dashboard", headers=auth_headers)
+    assert response.status_code == 403
+
+
+def test_login_rejected_when_hashing_pool_saturated(client, test_user, monkeypatch):
+    """Test login sheds load with 429 instead of queueing behind a full hash pool"""
+    from routers.auth import hashing_pool
+
+    monkeypatch.setattr(hashing_pool, "_pending", hashing_pool.max_workers + hashing_pool.max_queue)
+    response = client.post(
+        "/api/auth/login",
+        data={
+            "email": "test@example.com",
+            "password": "testpassword"
+        }
+    )
+    assert response.status_code == 429
+    assert "Retry-After" in response.headers
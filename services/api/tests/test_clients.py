@@ -0,0 +1,240 @@
+"""
+Tests for client management endpoints
+"""
+
+
+def test_client_crud(client):
+    """Test create, read, update and delete of a client"""
+    response = client.post(
+        "/api/clients/",
+        json={"client_id": "CLT-CRUD001", "name": "Acme", "monthly_spend": 500.0}
+    )
+    assert response.status_code == 200
+    client_id = response.json()["id"]
+    assert response.json()["status"] == "Active"
+
+    response = client.put(f"/api/clients/{client_id}", json={"monthly_spend": 750.0})
+    assert response.status_code == 200
+    assert response.json()["monthly_spend"] == 750.0
+
+    response = client.get(f"/api/clients/{client_id}")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Acme"
+
+    response = client.delete(f"/api/clients/{client_id}")
+    assert response.status_code == 200
+    assert client.get(f"/api/clients/{client_id}").status_code == 404
+
+
+def test_client_cursor_pagination(client, db_session):
+    """Test that cursor pages cover every client once, even with tied timestamps"""
+    from datetime import datetime
+    from models.models import Client
+
+    created = datetime(2024, 1, 1)
+    for i in range(5):
+        db_session.add(Client(client_id=f"CLT-PAGE{i:03d}", name=f"Client {i}", created_at=created))
+    db_session.commit()
+
+    seen = []
+    response = client.get("/api/clients/", params={"limit": 2})
+    while True:
+        assert response.status_code == 200
+        seen.extend(c["client_id"] for c in response.json())
+        token = response.headers.get("X-Next-Cursor")
+        if not token:
+            break
+        response = client.get("/api/clients/", params={"limit": 2, "cursor": token})
+
+    assert seen == [f"CLT-PAGE{i:03d}" for i in range(5)]
+
+    response = client.get("/api/clients/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_bulk_create_clients(client, db_session, auth_headers, test_user):
+    """Test bulk creation reports invalid and duplicate rows without dropping the valid ones"""
+    from models.models import Client
+
+    db_session.add(Client(client_id="CLT-TAKEN", name="Existing"))
+    db_session.commit()
+
+    rows = [
+        {"client_id": "CLT-BULK000", "name": "First", "monthly_spend": 100.0},
+        {"client_id": "CLT-BULK001"},
+        {"client_id": "CLT-TAKEN", "name": "Clash with database"},
+        {"client_id": "CLT-BULK000", "name": "Clash within request"},
+        {"client_id": "CLT-BULK002", "name": "Second", "status": "Onboarding"},
+    ]
+    response = client.post("/api/clients/bulk", json=rows, headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 3)
+    assert [r["status"] for r in data["results"]] == ["created", "error", "error", "error", "created"]
+    assert data["results"][1]["errors"] == ["name: Field required"]
+    assert "already exists" in data["results"][2]["errors"][0]
+
+    created = db_session.get(Client, data["results"][4]["id"])
+    assert (created.name, created.status, created.owner_id) == ("Second", "Onboarding", test_user.id)
+    assert db_session.query(Client).count() == 3
+
+
+def test_bulk_create_clients_row_limit(client, auth_headers, monkeypatch):
+    """Test oversized bulk requests are rejected up front"""
+    from config import settings
+
+    monkeypatch.setattr(settings, "BULK_MAX_ROWS", 2)
+    rows = [{"client_id": f"CLT-{i}", "name": "x"} for i in range(3)]
+    assert client.post("/api/clients/bulk", json=rows, headers=auth_headers).status_code == 413
+
+
+def test_import_clients_csv(client, db_session, auth_headers, test_user):
+    """Test CSV import upserts on client_id, keeps quoted newlines and reports bad rows"""
+    from models.models import Client
+
+    db_session.add(Client(client_id="CLT-OLD", name="Old name", monthly_spend=10.0, owner_id=test_user.id))
+    db_session.commit()
+
+    body = (
+        "﻿client_id,name,industry,monthly_spend\r\n"
+        "CLT-NEW,\"Acme, Inc.\",Retail,250\r\n"
+        "CLT-OLD,Renamed,,99.5\r\n"
+        "CLT-BAD,Bad spend,Retail,lots\r\n"
+        "CLT-SHORT,Too few\r\n"
+        "CLT-MULTI,\"Two\nlines\",Finance,\r\n"
+    )
+    response = client.post(
+        "/api/clients/import", content=body.encode(), headers={**auth_headers, "Content-Type": "text/csv"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["processed"], data["created"], data["updated"], data["failed"]) == (5, 2, 1, 2)
+    assert [e["row"] for e in data["errors"]] == [3, 4]
+    assert data["errors"][0]["errors"][0].startswith("monthly_spend:")
+    assert data["aborted"] is None
+
+    rows = {c.client_id: c for c in db_session.query(Client).all()}
+    assert set(rows) == {"CLT-OLD", "CLT-NEW", "CLT-MULTI"}
+    assert (rows["CLT-OLD"].name, rows["CLT-OLD"].monthly_spend) == ("Renamed", 99.5)
+    assert (rows["CLT-NEW"].name, rows["CLT-MULTI"].name) == ("Acme, Inc.", "Two\nlines")
+
+
+def test_import_clients_partial_columns(client, db_session, auth_headers, test_user):
+    """Test an upsert leaves columns the file does not carry untouched"""
+    from models.models import Client
+
+    db_session.add(Client(
+        client_id="C1", name="Old name", industry="Retail", monthly_spend=400.0, health_score=81.0,
+        owner_id=test_user.id
+    ))
+    db_session.commit()
+
+    body = "client_id,name\nC1,New name\n"
+    response = client.post(
+        "/api/clients/import", content=body.encode(), headers={**auth_headers, "Content-Type": "text/csv"}
+    )
+    assert response.json()["updated"] == 1
+
+    db_session.expire_all()
+    row = db_session.query(Client).filter_by(client_id="C1").one()
+    assert (row.name, row.industry, row.monthly_spend, row.health_score) == ("New name", "Retail", 400.0, 81.0)
+    assert row.status == "Active"
+
+
+def test_import_clients_ndjson(client, db_session, auth_headers, monkeypatch):
+    """Test NDJSON import in insert mode across chunks with a capped error list"""
+    from config import settings
+    from models.models import Client
+
+    monkeypatch.setattr(settings, "IMPORT_CHUNK_ROWS", 2)
+    monkeypatch.setattr(settings, "IMPORT_MAX_ERRORS", 2)
+    lines = [
+        '{"client_id": "CLT-A", "name": "A"}',
+        '{"client_id": "CLT-B", "name": "B"}',
+        '{"client_id": "CLT-A", "name": "Duplicate"}',
+        'not json',
+        '',
+        '["not", "an", "object"]',
+        '{"client_id": "CLT-C", "name": "C"}',
+    ]
+    response = client.post(
+        "/api/clients/import?format=ndjson&mode=insert", content="\n".join(lines).encode(), headers=auth_headers
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["processed"], data["created"], data["failed"]) == (6, 3, 3)
+    assert [e["row"] for e in data["errors"]] == [3, 4]
+    assert data["errors_truncated"] is True
+    assert db_session.query(Client).count() == 3
+
+    assert client.post("/api/clients/import", content=b"x", headers=auth_headers).status_code == 415
+    assert client.post("/api/clients/import?format=csv&mode=merge", content=b"x", headers=auth_headers).status_code == 400
+
+
+def test_export_clients(client, db_session, auth_headers, test_user, monkeypatch):
+    """Test CSV and NDJSON exports stream every client of the caller across cursor batches"""
+    import json
+    from config import settings
+    from models.models import Client
+
+    monkeypatch.setattr(settings, "EXPORT_BATCH_ROWS", 2)
+    for i in range(5):
+        db_session.add(Client(client_id=f"CLT-{i}", name=f"Client, {i}", monthly_spend=i * 10.0, owner_id=test_user.id))
+    db_session.add(Client(client_id="CLT-OTHER", name="Someone else's"))
+    db_session.commit()
+
+    response = client.get("/api/clients/export", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="clients.csv"' in response.headers["content-disposition"]
+    lines = response.text.splitlines()
+    assert lines[0].split(",")[:3] == ["name", "industry", "contract_value"]
+    assert len(lines) == 6
+    assert '"Client, 0"' in lines[1]
+
+    response = client.get("/api/clients/export?format=ndjson", headers=auth_headers)
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["client_id"] for r in rows] == [f"CLT-{i}" for i in range(5)]
+    assert rows[4]["monthly_spend"] == 40.0
+
+    # The CSV export is a valid import file
+    exported = client.get("/api/clients/export", headers=auth_headers).content
+    db_session.query(Client).filter_by(owner_id=test_user.id).delete()
+    db_session.commit()
+    report = client.post(
+        "/api/clients/import", content=exported, headers={**auth_headers, "Content-Type": "text/csv"}
+    ).json()
+    assert (report["created"], report["failed"]) == (5, 0)
+
+    assert client.get("/api/clients/export?format=xml", headers=auth_headers).status_code == 400
+
+
+def test_client_bulk_endpoints_scoped_to_msp_owner(client, db_session, auth_headers, it_auth_headers):
+    """Test bulk endpoints need an MSP login and never read or overwrite another owner's clients"""
+    from models.models import Client
+
+    db_session.add(Client(client_id="CLT-THEIRS", name="Theirs", email="a@other.example", monthly_spend=50.0))
+    db_session.commit()
+
+    calls = (
+        lambda **kwargs: client.get("/api/clients/export", **kwargs),
+        lambda **kwargs: client.post("/api/clients/bulk", json=[], **kwargs),
+        lambda **kwargs: client.post("/api/clients/import?format=csv", content=b"", **kwargs),
+    )
+    for call in calls:
+        assert call().status_code in (401, 403)
+        assert call(headers=it_auth_headers).status_code == 403
+
+    assert client.get("/api/clients/export", headers=auth_headers).text.splitlines()[1:] == []
+
+    body = "client_id,name\nCLT-THEIRS,Hijacked\n"
+    response = client.post(
+        "/api/clients/import", content=body.encode(), headers={**auth_headers, "Content-Type": "text/csv"}
+    )
+    data = response.json()
+    assert (data["created"], data["updated"], data["failed"]) == (0, 0, 1)
+    assert "already exists" in data["errors"][0]["errors"][0]
+
+    db_session.expire_all()
+    theirs = db_session.query(Client).filter_by(client_id="CLT-THEIRS").one()
+    assert (theirs.name, theirs.owner_id) == ("Theirs", None)
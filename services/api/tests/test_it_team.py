@@ -0,0 +1,543 @@
+"""
+Tests for IT team endpoints
+"""
+import pytest
+from datetime import datetime, timedelta
+
+
+@pytest.fixture
+def software(db_session, it_user):
+    """Create a software license with a mix of active and stale seats"""
+    from models.models import SoftwareLicense, LicenseUsage
+
+    license = SoftwareLicense(
+        software_name="Slack",
+        vendor="Salesforce",
+        category="Communication",
+        total_licenses=10,
+        active_users=4,
+        utilization_percent=40.0,
+        monthly_cost=100.0,
+        annual_cost=1200.0,
+        department="Engineering",
+        owner_id=it_user.id
+    )
+    db_session.add(license)
+    db_session.commit()
+
+    now = datetime.utcnow()
+    for i in range(4):
+        db_session.add(LicenseUsage(
+            license_id=license.id,
+            user_email=f"user{i}@example.com",
+            last_login=now - timedelta(days=60 if i < 2 else 1),
+            usage_hours=float(i),
+            is_active=True
+        ))
+    db_session.commit()
+    db_session.refresh(license)
+    return license
+
+
+def test_it_dashboard(client, it_auth_headers, software):
+    """Test IT dashboard endpoint"""
+    response = client.get("/api/it/dashboard", headers=it_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_software"] == 1
+    assert data["total_monthly_cost"] == 100.0
+    assert data["avg_utilization"] == 40.0
+    assert data["cost_savings_potential"] == pytest.approx(60.0)
+
+
+def test_it_dashboard_requires_it_role(client, auth_headers):
+    """Test MSP users cannot read the IT dashboard"""
+    response = client.get("/api/it/dashboard", headers=auth_headers)
+    assert response.status_code == 403
+
+
+def test_create_and_list_software(client, it_auth_headers):
+    """Test creating a software license and listing it back"""
+    response = client.post(
+        "/api/it/software",
+        headers=it_auth_headers,
+        json={
+            "software_name": "Zoom",
+            "vendor": "Zoom",
+            "total_licenses": 20,
+            "active_users": 15,
+            "monthly_cost": 300.0,
+            "department": "Sales"
+        }
+    )
+    assert response.status_code == 201
+    assert response.json()["utilization_percent"] == 75.0
+
+    response = client.get("/api/it/software", headers=it_auth_headers)
+    assert response.status_code == 200
+    assert [s["software_name"] for s in response.json()] == ["Zoom"]
+
+
+def test_software_cursor(client, it_auth_headers, software):
+    """Test paging the license list with a cursor and a department filter"""
+    first = client.get("/api/it/software", headers=it_auth_headers,
+                       params={"limit": 1, "department": "Engineering"})
+    assert [s["software_name"] for s in first.json()] == ["Slack"]
+
+    second = client.get("/api/it/software", headers=it_auth_headers,
+                        params={"limit": 1, "department": "Engineering",
+                                "cursor": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert second.json() == []
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_license_usage(client, it_auth_headers, software):
+    """Test usage detail for a license"""
+    response = client.get(f"/api/it/software/{software.id}/usage", headers=it_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["inactive_users"] == 2
+    assert data["potential_savings"] == pytest.approx(20.0)
+    assert len(data["recent_usage"]) == 4
+    assert data["usage_hours_percentiles"]["p50"] == pytest.approx(1.5)
+
+
+def test_license_usage_counts_every_seat(client, it_auth_headers, db_session, it_user):
+    """Test usage stats cover the full population, not just the recent listing"""
+    from models.models import SoftwareLicense, LicenseUsage
+
+    license = SoftwareLicense(software_name="Figma", total_licenses=400, active_users=200,
+                              utilization_percent=50.0, monthly_cost=4000.0, owner_id=it_user.id)
+    db_session.add(license)
+    db_session.commit()
+    now = datetime.utcnow()
+    db_session.add_all([
+        LicenseUsage(license_id=license.id, user_email=f"u{i}@example.com",
+                     last_login=now - timedelta(days=45 if i % 4 == 0 else 2),
+                     usage_hours=float(i), is_active=i < 180)
+        for i in range(200)
+    ])
+    db_session.commit()
+
+    data = client.get(f"/api/it/software/{license.id}/usage", headers=it_auth_headers).json()
+    assert len(data["recent_usage"]) == 20
+    assert (data["tracked_users"], data["active_seats"]) == (200, 180)
+    assert data["inactive_users"] == 45  # stale and still holding a seat
+    assert data["recently_active_users"] == 150
+    assert data["potential_savings"] == pytest.approx(45 * 10.0)
+    assert data["avg_usage_hours"] == pytest.approx(99.5)
+    assert data["usage_hours_percentiles"] == {
+        "p50": pytest.approx(99.5), "p90": pytest.approx(179.1), "p99": pytest.approx(197.01)
+    }
+
+
+def test_deactivate_unused(client, it_auth_headers, software):
+    """Test stale seats are deactivated and counters adjusted"""
+    response = client.post(f"/api/it/software/{software.id}/deactivate-unused", headers=it_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deactivated_count"] == 2
+    assert data["monthly_cost_saved"] == pytest.approx(20.0)
+    assert data["new_utilization"] == pytest.approx(20.0)
+
+    # The seats are already claimed: a repeat call must not subtract again
+    data = client.post(f"/api/it/software/{software.id}/deactivate-unused", headers=it_auth_headers).json()
+    assert (data["deactivated_count"], data["new_utilization"]) == (0, pytest.approx(20.0))
+    listed = client.get("/api/it/software", headers=it_auth_headers).json()
+    assert listed[0]["active_users"] == 2
+
+
+def test_deactivate_unused_owner_wide(client, it_auth_headers, db_session, it_user, software):
+    """Test the owner-wide variant reports savings per license and keeps the snapshot exact"""
+    from models.models import SoftwareLicense, LicenseUsage
+    from utils.kpi_snapshot import reconcile_kpi_snapshots
+
+    zoom = SoftwareLicense(software_name="Zoom", total_licenses=4, active_users=3, utilization_percent=75.0,
+                           monthly_cost=400.0, owner_id=it_user.id)
+    db_session.add(zoom)
+    db_session.commit()
+    stale = datetime.utcnow() - timedelta(days=90)
+    db_session.add_all([
+        LicenseUsage(license_id=zoom.id, user_email=f"z{i}@example.com", last_login=stale, is_active=True)
+        for i in range(3)
+    ])
+    db_session.commit()
+
+    response = client.post("/api/it/software/deactivate-unused", headers=it_auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["deactivated_count"] == 5
+    assert data["monthly_cost_saved"] == pytest.approx(320.0)
+    assert [(r["software_name"], r["deactivated_count"], r["new_utilization"]) for r in data["licenses"]] == [
+        ("Zoom", 3, 0.0), ("Slack", 2, pytest.approx(20.0))
+    ]
+
+    assert reconcile_kpi_snapshots(db_session.connection(), [it_user.id]) == []
+    db_session.rollback()
+    dashboard = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert dashboard["total_monthly_cost"] == 500.0
+
+
+def test_ingest_usage_events(client, it_auth_headers, db_session, it_user, software):
+    """Test buffered events upsert seats and move the counters incrementally"""
+    from models.models import LicenseUsage
+    from routers.it_team import usage_buffer
+    from utils.kpi_snapshot import reconcile_kpi_snapshots
+
+    # user0 and user1 are stale; deactivating them frees two seats
+    client.post(f"/api/it/software/{software.id}/deactivate-unused", headers=it_auth_headers)
+    now = datetime.utcnow().replace(microsecond=0)
+    events = [
+        {"license_id": software.id, "user_email": "user0@example.com", "occurred_at": now.isoformat(), "usage_hours": 1.5},
+        {"license_id": software.id, "user_email": "user2@example.com", "occurred_at": now.isoformat(), "usage_hours": 2},
+        {"license_id": software.id, "user_email": "new@example.com", "occurred_at": now.isoformat(), "usage_hours": 1},
+        {"license_id": software.id, "user_email": "new@example.com",
+         "occurred_at": (now - timedelta(hours=1)).isoformat(), "usage_hours": 1},
+    ]
+    response = client.post("/api/it/usage/events", json={"events": events}, headers=it_auth_headers)
+    assert response.status_code == 202
+    assert response.json() == {"accepted": 4, "buffered": 4}
+    assert client.portal.call(usage_buffer.flush) == 4
+
+    seats = {u.user_email: u for u in db_session.query(LicenseUsage).filter_by(license_id=software.id)}
+    assert len(seats) == 5
+    assert seats["user0@example.com"].is_active and seats["user0@example.com"].last_login == now
+    assert seats["user0@example.com"].usage_hours == pytest.approx(1.5)
+    assert seats["user2@example.com"].usage_hours == pytest.approx(4.0)
+    assert (seats["new@example.com"].last_login, seats["new@example.com"].usage_hours) == (now, 2.0)
+
+    # 4 active - 2 deactivated + 1 reactivated + 1 new
+    listed = client.get("/api/it/software", headers=it_auth_headers).json()
+    assert (listed[0]["active_users"], listed[0]["utilization_percent"]) == (4, pytest.approx(40.0))
+    assert reconcile_kpi_snapshots(db_session.connection(), [it_user.id]) == []
+
+
+def test_ingest_usage_events_rejects(client, it_auth_headers, software, monkeypatch):
+    """Test unknown licenses are refused and a full buffer pushes back"""
+    from routers.it_team import usage_buffer
+
+    event = {"license_id": software.id, "user_email": "a@example.com", "occurred_at": "2024-06-01T09:00:00"}
+    response = client.post("/api/it/usage/events", json={"events": [{**event, "license_id": 999}]},
+                           headers=it_auth_headers)
+    assert response.status_code == 404
+
+    monkeypatch.setattr(usage_buffer, "max_events", 1)
+    response = client.post("/api/it/usage/events", json={"events": [event, event]}, headers=it_auth_headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "1"
+    assert usage_buffer.stats()["buffered"] == 0
+
+
+def test_usage_buffer_drains_past_failing_events(client, software):
+    """Test a batch that keeps failing is split and its bad event dead-lettered so the queue drains"""
+    from routers.it_team import usage_buffer
+    from utils.usage_ingest import UsageEventBuffer
+
+    buffer = UsageEventBuffer(usage_buffer.session_factory, max_attempts=2)
+    now = datetime.utcnow()
+    good = {"license_id": software.id, "user_email": "good@example.com", "occurred_at": now, "usage_hours": 1}
+    bad = {**good, "user_email": "bad@example.com", "occurred_at": "yesterday"}
+    buffer.submit([good, bad])
+
+    # Two failures, then the halves get one more try each
+    assert [client.portal.call(buffer.flush) for _ in range(4)] == [0, 0, 1, 0]
+    stats = buffer.stats()
+    assert (stats["buffered"], stats["written"], stats["dead_lettered"]) == (0, 1, 1)
+    assert list(buffer.dead_letter) == [bad]
+
+
+def test_usage_event_times_normalized_to_utc(client, it_auth_headers, db_session, software):
+    """Test aware and naive event times for one seat coalesce as naive UTC"""
+    from models.models import LicenseUsage
+    from routers.it_team import usage_buffer
+
+    events = [
+        {"license_id": software.id, "user_email": "tz@example.com", "occurred_at": "2024-06-01T09:00:00"},
+        {"license_id": software.id, "user_email": "tz@example.com", "occurred_at": "2024-06-01T12:00:00+02:00"},
+    ]
+    assert client.post("/api/it/usage/events", json={"events": events}, headers=it_auth_headers).status_code == 202
+    assert client.portal.call(usage_buffer.flush) == 2
+
+    seat = db_session.query(LicenseUsage).filter_by(user_email="tz@example.com").one()
+    assert seat.last_login == datetime(2024, 6, 1, 10, 0)
+
+
+def test_usage_activity_bitmaps(client, it_auth_headers, software):
+    """Test DAU/WAU/MAU and inactivity counts from the daily activity bitmaps"""
+    from routers.it_team import usage_buffer
+
+    now = datetime.utcnow()
+
+    def ingest(*events):
+        body = {"events": [
+            {"license_id": software.id, "user_email": email, "occurred_at": (now - timedelta(days=days)).isoformat()}
+            for email, days in events
+        ]}
+        assert client.post("/api/it/usage/events", json=body, headers=it_auth_headers).status_code == 202
+        client.portal.call(usage_buffer.flush)
+
+    ingest(("a@example.com", 0), ("b@example.com", 5), ("c@example.com", 45))
+    # Separate flushes OR into the same day's bitmap
+    ingest(("a@example.com", 20), ("b@example.com", 0))
+
+    data = client.get(f"/api/it/software/{software.id}/usage", headers=it_auth_headers).json()
+    assert data["activity"] == {
+        "dau": 2, "wau": 2, "mau": 2, "active_60d": 3, "active_90d": 3,
+        "inactive_30d": 1, "inactive_60d": 0, "inactive_90d": 0,
+    }
+
+
+def test_usage_compaction_keeps_endpoints_correct(client, it_auth_headers, db_session, software):
+    """Test compacted seats still count, and a returning user takes their seat back"""
+    from models.models import LicenseUsage, LicenseUsageDaily
+    from routers.it_team import usage_buffer
+    from utils.usage_compaction import compact_license_usage
+
+    before = client.get(f"/api/it/software/{software.id}/usage", headers=it_auth_headers).json()
+    client.post(f"/api/it/software/{software.id}/deactivate-unused", headers=it_auth_headers)
+    # Only the released, long-idle seats move; batch size 1 exercises the keyset walk
+    assert compact_license_usage(db_session.get_bind(), retention_days=30, batch_size=1) == 2
+    assert compact_license_usage(db_session.get_bind(), retention_days=30, batch_size=1) == 0
+    assert db_session.query(LicenseUsage).count() == 2
+    assert db_session.query(LicenseUsageDaily).count() == 2
+
+    after = client.get(f"/api/it/software/{software.id}/usage", headers=it_auth_headers).json()
+    assert (after["tracked_users"], after["active_seats"], after["inactive_users"]) == (4, 2, 0)
+    assert after["usage_hours_percentiles"] == before["usage_hours_percentiles"]
+    assert sorted(u["user_email"] for u in after["recent_usage"]) == sorted(
+        u["user_email"] for u in before["recent_usage"]
+    )
+
+    event = {"license_id": software.id, "user_email": "user1@example.com",
+             "occurred_at": datetime.utcnow().isoformat(), "usage_hours": 0.5}
+    client.post("/api/it/usage/events", json={"events": [event]}, headers=it_auth_headers)
+    client.portal.call(usage_buffer.flush)
+    db_session.expire_all()
+    seat = db_session.query(LicenseUsage).filter_by(user_email="user1@example.com").one()
+    assert (seat.is_active, seat.usage_hours) == (True, pytest.approx(1.5))
+    assert db_session.query(LicenseUsageDaily).count() == 1
+    listed = client.get("/api/it/software", headers=it_auth_headers).json()
+    assert listed[0]["active_users"] == 3
+
+
+def test_spend_breakdowns(client, it_auth_headers, software):
+    """Test department, category and cost breakdown views"""
+    response = client.get("/api/it/spend/department", headers=it_auth_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["department"] == "Engineering"
+    assert response.json()[0]["monthly_cost"] == 100.0
+
+    response = client.get("/api/it/spend/category", headers=it_auth_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["category"] == "Communication"
+
+    response = client.get("/api/it/cost-breakdown", headers=it_auth_headers)
+    assert response.status_code == 200
+    assert response.json()[0]["perLicense"] == 10.0
+
+
+def test_bulk_create_software(client, it_auth_headers, auth_headers):
+    """Test bulk license creation derives utilization and updates dashboard totals"""
+    rows = [
+        {"software_name": "Zoom", "total_licenses": 20, "active_users": 15, "monthly_cost": 300.0},
+        {"software_name": "Figma", "total_licenses": 10, "active_users": 2, "monthly_cost": 100.0},
+        {"software_name": "Broken", "total_licenses": "many", "monthly_cost": 1.0},
+    ]
+    response = client.post("/api/it/software/bulk", headers=it_auth_headers, json=rows)
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 1)
+    assert data["results"][2]["errors"][0].startswith("total_licenses:")
+
+    listed = client.get("/api/it/software", headers=it_auth_headers).json()
+    assert {s["software_name"]: s["utilization_percent"] for s in listed} == {"Zoom": 75.0, "Figma": 20.0}
+
+    dashboard = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert dashboard["total_software"] == 2
+    assert dashboard["total_monthly_cost"] == 400.0
+
+    assert client.post("/api/it/software/bulk", headers=auth_headers, json=rows).status_code == 403
+
+
+def test_import_software_upsert(client, it_auth_headers, software):
+    """Test license import matches existing licenses by name and keeps dashboard totals in step"""
+    body = (
+        "software_name,total_licenses,active_users,monthly_cost,department\n"
+        "Slack,100,90,900,Engineering\n"
+        "Notion,10,5,50,\n"
+    )
+    response = client.post(
+        "/api/it/software/import", headers={**it_auth_headers, "Content-Type": "text/csv"}, content=body
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["updated"], data["failed"]) == (1, 1, 0)
+
+    listed = {s["software_name"]: s for s in client.get("/api/it/software", headers=it_auth_headers).json()}
+    assert listed["Slack"]["monthly_cost"] == 900.0
+    # Seat counts belong to usage ingestion; utilization follows the new seat total
+    assert (listed["Slack"]["active_users"], listed["Slack"]["utilization_percent"]) == (4, 4.0)
+    assert listed["Notion"]["utilization_percent"] == 50.0
+
+    dashboard = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert dashboard["total_software"] == len(listed)
+    assert dashboard["total_monthly_cost"] == sum(s["monthly_cost"] for s in listed.values())
+
+
+def test_import_software_partial_columns(client, it_auth_headers, software):
+    """Test an upsert only changes the columns the file supplies"""
+    body = "software_name,total_licenses,monthly_cost\nSlack,12,150\n"
+    response = client.post(
+        "/api/it/software/import", headers={**it_auth_headers, "Content-Type": "text/csv"}, content=body
+    )
+    assert response.json()["updated"] == 1
+
+    slack = client.get("/api/it/software", headers=it_auth_headers).json()[0]
+    assert (slack["total_licenses"], slack["monthly_cost"], slack["annual_cost"]) == (12, 150.0, 1800.0)
+    assert (slack["vendor"], slack["department"]) == ("Salesforce", "Engineering")
+    assert (slack["active_users"], round(slack["utilization_percent"], 2)) == (4, 33.33)
+
+    dashboard = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert round(dashboard["avg_utilization"], 2) == 33.33
+
+
+def test_upsert_counts_only_written_rows(client, it_auth_headers, db_session, it_user, software):
+    """Test updated counts rows written, with superseded and no-op rows reported apart"""
+    from models.models import SoftwareLicense
+    from routers.it_team import license_values, usage_buffer
+    from schemas.schemas import SoftwareLicenseCreate
+    from utils.bulk import upsert_rows
+
+    db_session.add(SoftwareLicense(software_name="Zoom", total_licenses=5, monthly_cost=50.0, owner_id=it_user.id))
+    db_session.commit()
+
+    def values(name):
+        return license_values(SoftwareLicenseCreate(software_name=name, total_licenses=5, monthly_cost=50.0), it_user.id)
+
+    rows = [
+        (0, (values("Slack"), {"department": "Sales"})),
+        (1, (values("Jira"), values("Jira"))),
+        (2, (values("Slack"), {"department": "Finance"})),
+        (3, (values("Jira"), values("Jira"))),
+        (4, (values("Zoom"), {})),
+    ]
+
+    async def upsert():
+        async with usage_buffer.session_factory() as db:
+            counts = await upsert_rows(db, SoftwareLicense, rows, ("owner_id", "software_name"))
+            await db.commit()
+            return counts
+
+    counts = client.portal.call(upsert)
+    assert (counts["created"], counts["updated"], counts["unchanged"], counts["superseded"]) == (1, 1, 1, 2)
+    listed = {s["software_name"]: s for s in client.get("/api/it/software", headers=it_auth_headers).json()}
+    assert (listed["Slack"]["department"], len(listed)) == ("Finance", 3)
+
+
+def test_export_software(client, it_auth_headers, auth_headers, software):
+    """Test the license export only streams the caller's licenses"""
+    import json
+
+    response = client.get("/api/it/software/export?format=ndjson", headers=it_auth_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["id"], r["software_name"], r["monthly_cost"]) for r in rows] == [(software.id, "Slack", 100.0)]
+    assert rows[0]["created_at"].startswith(str(software.created_at.date()))
+
+    assert client.get("/api/it/software/export", headers=auth_headers).status_code == 403
+
+
+def test_spending_trend_from_cost_history(client, it_auth_headers, db_session, it_user, software):
+    """Test the spending trend follows recorded cost changes and is stable between calls"""
+    from models.models import LicenseCostHistory, OwnerMonthlyCost, SoftwareLicense
+
+    license = db_session.get(SoftwareLicense, software.id)
+    license.monthly_cost = 60.0
+    db_session.commit()
+
+    history = db_session.query(LicenseCostHistory).order_by(LicenseCostHistory.id).all()
+    assert [(h.change, h.previous_cost, h.monthly_cost, h.owner_total) for h in history] == [
+        ("created", None, 100.0, 100.0), ("updated", 100.0, 60.0, 60.0)
+    ]
+
+    now = datetime.utcnow()
+    response = client.get(f"/api/it/spending-trend?year={now.year}", headers=it_auth_headers)
+    assert response.status_code == 200
+    trend = response.json()
+    assert trend == client.get(f"/api/it/spending-trend?year={now.year}", headers=it_auth_headers).json()
+    current = trend[now.month - 1]
+    assert (current["actual"], current["predicted"]) == (60.0, 0.0)
+    assert all(m["actual"] is None and m["predicted"] == 60.0 for m in trend[now.month:])
+
+    # Months without changes carry the previous month's total
+    db_session.add_all([
+        OwnerMonthlyCost(owner_id=it_user.id, month=datetime(2023, 3, 1).date(), closing_cost=100.0),
+        OwnerMonthlyCost(owner_id=it_user.id, month=datetime(2023, 6, 1).date(), closing_cost=150.0),
+    ])
+    db_session.commit()
+    trend = client.get("/api/it/spending-trend?year=2023&from_month=4&to_month=7", headers=it_auth_headers).json()
+    assert [(m["month"], m["actual"], m["predicted"]) for m in trend] == [
+        ("Apr", 100.0, 100.0), ("May", 100.0, 100.0), ("Jun", 150.0, 100.0), ("Jul", 150.0, 150.0)
+    ]
+
+    assert client.get("/api/it/spending-trend?from_month=5&to_month=2", headers=it_auth_headers).status_code == 400
+    for year in (0, -1, 10000):
+        assert client.get(f"/api/it/spending-trend?year={year}", headers=it_auth_headers).status_code == 422
+    for year in (1, 9999):
+        response = client.get(f"/api/it/spending-trend?year={year}", headers=it_auth_headers)
+        assert response.status_code == 200
+        assert [m["month"] for m in response.json()][::11] == ["Jan", "Dec"]
+
+
+def test_spend_aggregates_cached_and_invalidated(client, it_auth_headers, db_session, software):
+    """Test spend views share one cached aggregate that is dropped when licenses change"""
+    from models.models import SoftwareLicense
+    from utils.spend_aggregates import spend_cache
+
+    assert client.get("/api/it/spend/department", headers=it_auth_headers).json()[0]["monthly_cost"] == 100.0
+    hits = spend_cache.hits
+    client.get("/api/it/spend/category", headers=it_auth_headers)
+    client.get("/api/it/cost-breakdown", headers=it_auth_headers)
+    assert spend_cache.hits == hits + 2
+
+    rows = [{"software_name": "Jira", "total_licenses": 5, "monthly_cost": 50.0, "department": "Engineering"}]
+    client.post("/api/it/software/bulk", headers=it_auth_headers, json=rows)
+    assert client.get("/api/it/spend/department", headers=it_auth_headers).json()[0]["monthly_cost"] == 150.0
+
+    license = db_session.get(SoftwareLicense, software.id)
+    license.department = None
+    license.category = "Other"
+    db_session.commit()
+    departments = client.get("/api/it/spend/department", headers=it_auth_headers).json()
+    assert {d["department"]: d["monthly_cost"] for d in departments} == {"Engineering": 50.0, "Unassigned": 100.0}
+    # A NULL category and a literal "Other" are one group
+    categories = client.get("/api/it/spend/category", headers=it_auth_headers).json()
+    assert categories == [{
+        "category": "Other", "monthly_cost": 150.0, "annual_cost": 1800.0,
+        "software_count": 2, "total_licenses": 15, "avg_utilization": 20.0
+    }]
+
+
+def test_grouping_sets_fold_matches_fallback():
+    """Test Postgres GROUPING SETS rows fold to the same aggregates as the per-cell fallback"""
+    from utils.spend_aggregates import fold_spend_rows
+
+    def measures(cost, count):
+        return {"monthly_cost": cost, "annual_cost": cost * 12, "software_count": count,
+                "total_licenses": count * 10, "utilization_sum": 50.0 * count, "utilization_count": count}
+
+    cells = [
+        {"grouping": 0, "department": "Eng", "category": "Dev", **measures(100.0, 2)},
+        {"grouping": 0, "department": "Eng", "category": None, **measures(30.0, 1)},
+        {"grouping": 0, "department": None, "category": "Dev", **measures(20.0, 1)},
+    ]
+    grouping_sets = [
+        {"grouping": 1, "department": "Eng", "category": None, **measures(130.0, 3)},
+        {"grouping": 1, "department": None, "category": None, **measures(20.0, 1)},
+        {"grouping": 2, "department": None, "category": "Dev", **measures(120.0, 3)},
+        {"grouping": 2, "department": None, "category": None, **measures(30.0, 1)},
+        {"grouping": 3, "department": None, "category": None, **measures(150.0, 4)},
+    ]
+    assert fold_spend_rows(grouping_sets, rolled_up=True) == fold_spend_rows(cells, rolled_up=False)
@@ -0,0 +1,108 @@
+"""
+Tests for incremental owner KPI snapshots
+"""
+import pytest
+
+
+def _snapshot_drift(db_session, owner_id):
+    """Owners whose snapshot disagrees with a full recomputation"""
+    from utils.kpi_snapshot import reconcile_kpi_snapshots
+
+    drift = reconcile_kpi_snapshots(db_session.connection(), [owner_id])
+    db_session.rollback()
+    return drift
+
+
+def test_snapshot_tracks_client_writes(client, auth_headers, db_session, test_user):
+    """Test inserts, updates and deletes are folded into the snapshot"""
+    from models.models import Client, OwnerKpiSnapshot
+
+    assert client.get("/api/msp/dashboard", headers=auth_headers).json()["total_clients"] == 0
+
+    response = client.post(
+        "/api/msp/clients",
+        headers=auth_headers,
+        json={"name": "Acme", "monthly_spend": 1000.0}
+    )
+    assert response.status_code == 201
+    client_pk = response.json()["id"]
+
+    extra = Client(client_id="CLT-EXTRA", name="Extra", monthly_spend=500.0,
+                   health_score=40.0, churn_risk="high", owner_id=test_user.id)
+    db_session.add(extra)
+    db_session.commit()
+
+    data = client.get("/api/msp/dashboard", headers=auth_headers).json()
+    assert data["total_clients"] == 2
+    assert data["total_mrr"] == 1500.0
+    assert data["high_risk_clients"] == 1
+
+    # Expired instance: old values are not in memory and must be recovered
+    extra.churn_risk = "low"
+    extra.monthly_spend = 700.0
+    db_session.commit()
+    assert _snapshot_drift(db_session, test_user.id) == []
+
+    db_session.delete(db_session.get(Client, client_pk))
+    db_session.commit()
+    assert _snapshot_drift(db_session, test_user.id) == []
+
+    data = client.get("/api/msp/dashboard", headers=auth_headers).json()
+    assert data["total_clients"] == 1
+    assert data["total_mrr"] == 700.0
+    assert data["high_risk_clients"] == 0
+    assert db_session.get(OwnerKpiSnapshot, test_user.id) is not None
+
+
+def test_snapshot_tracks_license_writes(client, it_auth_headers, db_session, it_user):
+    """Test IT totals follow license creation and utilization changes"""
+    from models.models import SoftwareLicense
+
+    response = client.post(
+        "/api/it/software",
+        headers=it_auth_headers,
+        json={"software_name": "Jira", "total_licenses": 10, "active_users": 3, "monthly_cost": 200.0}
+    )
+    assert response.status_code == 201
+    data = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert data["total_monthly_cost"] == 200.0
+    assert data["cost_savings_potential"] == pytest.approx(140.0)
+
+    license = db_session.get(SoftwareLicense, response.json()["id"])
+    license.active_users = 8
+    license.utilization_percent = 80.0
+    db_session.commit()
+
+    data = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert data["active_licenses"] == 8
+    assert data["avg_utilization"] == 80.0
+    assert data["cost_savings_potential"] == 0
+    assert _snapshot_drift(db_session, it_user.id) == []
+
+    # Bulk inserts bypass flush events and apply their own delta
+    response = client.post(
+        "/api/it/software/bulk",
+        headers=it_auth_headers,
+        json=[{"software_name": f"Tool {i}", "total_licenses": 4, "active_users": 1, "monthly_cost": 40.0}
+              for i in range(3)]
+    )
+    assert response.json()["created"] == 3
+    data = client.get("/api/it/dashboard", headers=it_auth_headers).json()
+    assert data["total_software"] == 4
+    assert data["total_monthly_cost"] == 320.0
+    assert _snapshot_drift(db_session, it_user.id) == []
+
+
+def test_reconcile_repairs_drift(client, auth_headers, db_session, test_user):
+    """Test the reconciliation job rewrites a snapshot that drifted"""
+    from models.models import OwnerKpiSnapshot
+    from utils.kpi_snapshot import reconcile_kpi_snapshots
+
+    client.get("/api/msp/dashboard", headers=auth_headers)
+    snapshot = db_session.get(OwnerKpiSnapshot, test_user.id)
+    snapshot.client_count = 42
+    db_session.commit()
+
+    assert reconcile_kpi_snapshots(db_session.connection()) == [test_user.id]
+    db_session.commit()
+    assert client.get("/api/msp/dashboard", headers=auth_headers).json()["total_clients"] == 0
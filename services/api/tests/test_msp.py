@@ -51,6 +51,35 @@ def test_get_clients_list(client, auth_headers, db_session, test_user):
     assert response.status_code == 200
     data = response.json()
     assert len(data) == 3
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_clients_cursor(client, auth_headers, db_session, test_user):
+    """Test walking the client list with next-page cursors"""
+    from models.models import Client
+    
+    for i in range(5):
+        db_session.add(Client(
+            client_id=f"CLT-TEST{i:03d}",
+            name=f"Client {i}",
+            owner_id=test_user.id,
+            created_at=datetime(2024, 1, 1) + timedelta(days=i)
+        ))
+    db_session.commit()
+    
+    first = client.get("/api/msp/clients", headers=auth_headers, params={"limit": 3})
+    assert [c["name"] for c in first.json()] == ["Client 0", "Client 1", "Client 2"]
+    
+    # A row inserted ahead of the cursor must not shift the next page
+    db_session.add(Client(client_id="CLT-EARLY", name="Early", owner_id=test_user.id,
+                          created_at=datetime(2023, 1, 1)))
+    db_session.commit()
+    
+    second = client.get("/api/msp/clients", headers=auth_headers,
+                        params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert [c["name"] for c in second.json()] == ["Client 3", "Client 4"]
+    assert "X-Next-Cursor" not in second.headers
 
 
 def test_get_client_details(client, auth_headers, db_session, test_user):
@@ -79,3 +108,148 @@ def test_get_nonexistent_client(client, auth_headers):
     """Test getting nonexistent client"""
     response = client.get("/api/msp/clients/99999", headers=auth_headers)
     assert response.status_code == 404
+
+
+def test_msp_dashboard_aggregates(client, auth_headers, db_session, test_user):
+    """Test dashboard KPIs are aggregated over all of the owner's clients"""
+    from models.models import Client, Recommendation
+
+    for i, (spend, health, risk) in enumerate([(1000.0, 90.0, "low"), (2000.0, None, "high"), (3000.0, 60.0, "high")]):
+        db_session.add(Client(
+            client_id=f"CLT-AGG{i:03d}",
+            name=f"Client {i}",
+            monthly_spend=spend,
+            health_score=health,
+            churn_risk=risk,
+            churn_probability=0.2 * i,
+            owner_id=test_user.id
+        ))
+    db_session.add(Client(client_id="CLT-OTHER", name="Other", monthly_spend=9999.0, owner_id=None))
+    for status in ("pending", "pending", "implemented"):
+        db_session.add(Recommendation(
+            recommendation_type="upsell",
+            title="Upsell",
+            description="More seats",
+            priority="high",
+            potential_value=100.0,
+            status=status,
+            owner_id=test_user.id
+        ))
+    db_session.commit()
+
+    response = client.get("/api/msp/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_clients"] == 3
+    assert data["total_mrr"] == 6000.0
+    assert data["avg_health_score"] == pytest.approx(50.0)
+    assert data["high_risk_clients"] == 2
+    assert data["total_recommendations"] == 2
+    assert len(data["upsell_opportunities"]) == 2
+    assert len(data["churn_risks"]) == 2
+
+
+def test_msp_dashboard_empty(client, auth_headers):
+    """Test dashboard KPIs for an MSP without clients"""
+    response = client.get("/api/msp/dashboard", headers=auth_headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total_clients"] == 0
+    assert data["total_mrr"] == 0
+    assert data["avg_health_score"] == 0
+
+
+def test_alerts_feed(client, auth_headers, db_session, test_user):
+    """Test alerts are ranked by priority then recency, paged by cursor and filtered by since"""
+    from models.models import Alert
+    
+    base = datetime(2024, 6, 1)
+    for title, priority, age in [
+        ("Low old", "Low", 5), ("Critical old", "Critical", 4), ("High new", "High", 1),
+        ("Critical new", "Critical", 2), ("Unknown", None, 0), ("Resolved", "Critical", 0),
+    ]:
+        db_session.add(Alert(
+            title=title,
+            priority=priority,
+            status="resolved" if title == "Resolved" else "active",
+            created_at=base - timedelta(days=age),
+            owner_id=test_user.id
+        ))
+    db_session.commit()
+    
+    first = client.get("/api/msp/alerts", headers=auth_headers, params={"limit": 3})
+    assert first.status_code == 200
+    assert [a["title"] for a in first.json()] == ["Critical new", "Critical old", "High new"]
+    assert "priority_rank" not in first.json()[0]
+    
+    second = client.get("/api/msp/alerts", headers=auth_headers,
+                        params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert [a["title"] for a in second.json()] == ["Unknown", "Low old"]
+    assert "X-Next-Cursor" not in second.headers
+    
+    recent = client.get("/api/msp/alerts", headers=auth_headers,
+                        params={"since": (base - timedelta(days=3)).isoformat() + "Z"})
+    assert [a["title"] for a in recent.json()] == ["Critical new", "High new", "Unknown"]
+
+
+def test_client_health_score_factors(client, auth_headers, db_session, test_user, ml_service, monkeypatch):
+    """Test factors come from the calculator, are stored, and recompute only on input changes"""
+    from models.models import Client, ClientHealthFactors
+    from utils.ml_client import MLServiceUnavailable
+    
+    client_obj = Client(
+        client_id="CLT-HEALTH",
+        name="Health Co",
+        total_licenses=50,
+        total_users=40,
+        contract_value=24000.0,
+        monthly_spend=2000.0,
+        health_score=80.0,
+        owner_id=test_user.id
+    )
+    db_session.add(client_obj)
+    db_session.commit()
+    url = f"/api/msp/clients/{client_obj.id}/health-score"
+    
+    first = client.get(url, headers=auth_headers)
+    assert first.status_code == 200
+    data = first.json()
+    assert data["factors"]["license_utilization"] == 100.0
+    assert set(data["factors"]) == {
+        "payment_history", "support_engagement", "license_utilization",
+        "contract_stability", "feature_adoption", "communication_frequency"
+    }
+    assert len(ml_service) == 1
+    # The score and its status come from the same calculator result
+    stored = db_session.get(ClientHealthFactors, client_obj.id)
+    assert (data["overall_score"], data["health_status"]) == (stored.overall_score, stored.health_status)
+    assert data["stale"] is False
+    
+    # Unchanged inputs: served from the stored row
+    assert client.get(url, headers=auth_headers).json() == data
+    assert len(ml_service) == 1
+    
+    # Changed inputs: recomputed and persisted
+    client_obj.total_users = 10
+    db_session.commit()
+    updated = client.get(url, headers=auth_headers).json()
+    assert updated["factors"]["license_utilization"] == 20.0
+    assert len(ml_service) == 2
+    db_session.expire_all()
+    assert db_session.get(ClientHealthFactors, client_obj.id).factors["license_utilization"] == 20.0
+    
+    # ML service down: stale factors are still served, nothing stored yet gives 503
+    async def unavailable(payload):
+        raise MLServiceUnavailable("down")
+    monkeypatch.setattr("utils.health_factors.calculate_health", unavailable)
+    client_obj.total_users = 45
+    db_session.commit()
+    stale = client.get(url, headers=auth_headers).json()
+    assert stale["factors"]["license_utilization"] == 20.0
+    assert (stale["overall_score"], stale["stale"]) == (updated["overall_score"], True)
+    
+    other = Client(client_id="CLT-NEW", name="New Co", owner_id=test_user.id)
+    db_session.add(other)
+    db_session.commit()
+    response = client.get(f"/api/msp/clients/{other.id}/health-score", headers=auth_headers)
+    assert response.status_code == 503
@@ -0,0 +1,156 @@
+"""
+Query-plan regression tests
+Runs EXPLAIN QUERY PLAN on every statement a router issues and fails when a
+hot table is read with a full table scan instead of an index.
+"""
+import re
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HOT_TABLES = {
+    "users", "clients", "software_licenses", "license_usage", "cost_anomalies",
+    "recommendations", "alerts", "owner_kpi_snapshot", "client_metrics", "client_metric_daily",
+    "license_cost_history", "owner_monthly_cost",
+}
+
+# A bare "SCAN <table>" (no "USING ... INDEX") is a full table scan in SQLite
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS \w+)?$")
+
+ENDPOINTS = [
+    ("msp", "GET", "/api/msp/dashboard"),
+    ("msp", "GET", "/api/msp/clients"),
+    ("msp", "GET", "/api/msp/clients/{client_pk}"),
+    ("msp", "GET", "/api/msp/clients/{client_pk}/health-score"),
+    ("msp", "GET", "/api/msp/recommendations?recommendation_type=upsell"),
+    ("msp", "GET", "/api/msp/recommendations"),
+    ("msp", "GET", "/api/msp/alerts"),
+    ("msp", "GET", "/api/msp/alerts?since=2024-01-01T00:00:00"),
+    ("msp", "POST", "/api/msp/alerts/{alert_pk}/resolve"),
+    ("msp", "GET", "/api/analytics/reports/executive-summary"),
+    ("msp", "GET", "/api/analytics/trends/revenue?days=90"),
+    ("msp", "GET", "/api/clients/"),
+    ("it", "GET", "/api/it/dashboard"),
+    ("it", "GET", "/api/it/software"),
+    ("it", "GET", "/api/it/software?department=Engineering"),
+    ("it", "GET", "/api/it/software/{license_pk}/usage"),
+    ("it", "POST", "/api/it/software/{license_pk}/deactivate-unused"),
+    ("it", "POST", "/api/it/software/deactivate-unused"),
+    ("it", "GET", "/api/it/anomalies"),
+    ("it", "GET", "/api/it/anomalies?resolved=false"),
+    ("it", "GET", "/api/it/spend/department"),
+    ("it", "GET", "/api/it/spend/category"),
+    ("it", "GET", "/api/it/software/category/Communication"),
+    ("it", "GET", "/api/it/cost-breakdown"),
+    ("it", "GET", "/api/it/spending-trend?from_month=3&to_month=9"),
+    ("it", "GET", "/api/analytics/trends/cost?days=30"),
+    ("it", "GET", "/api/analytics/reports/executive-summary"),
+]
+
+
+@pytest.fixture
+def seeded(db_session, test_user, it_user):
+    """A few rows per table so every endpoint has something to read"""
+    from models.models import Client, SoftwareLicense, LicenseUsage, CostAnomaly, Recommendation, Alert
+
+    now = datetime.utcnow()
+    clients = [
+        Client(client_id=f"CLT-PLAN{i:03d}", name=f"Client {i}", monthly_spend=1000.0 * i,
+               health_score=70.0, churn_risk=["low", "medium", "high"][i % 3],
+               churn_probability=i / 10, owner_id=test_user.id)
+        for i in range(6)
+    ]
+    license = SoftwareLicense(software_name="Slack", category="Communication", total_licenses=10,
+                              active_users=4, utilization_percent=40.0, monthly_cost=100.0,
+                              department="Engineering", owner_id=it_user.id)
+    db_session.add_all(clients + [license])
+    db_session.commit()
+
+    alert = Alert(title="Renewal due", priority="High", status="active", owner_id=test_user.id)
+    db_session.add_all([
+        alert,
+        CostAnomaly(software_name="Slack", expected_cost=100.0, actual_cost=150.0, variance_percent=50.0,
+                    severity="high", cause="Seat growth", resolved=False, owner_id=it_user.id),
+        Recommendation(recommendation_type="upsell", title="Upsell", description="Add seats",
+                       potential_value=500.0, priority="high", status="pending", owner_id=test_user.id),
+        Recommendation(recommendation_type="cost_saving", title="Trim seats", description="Remove idle seats",
+                       potential_value=50.0, priority="medium", status="pending", owner_id=it_user.id),
+    ] + [
+        LicenseUsage(license_id=license.id, user_email=f"user{i}@example.com",
+                     last_login=now - timedelta(days=60 * (i % 2)), usage_hours=1.0, is_active=True)
+        for i in range(4)
+    ])
+    db_session.commit()
+    return {"client_pk": clients[0].id, "license_pk": license.id, "alert_pk": alert.id}
+
+
+@pytest.fixture
+def captured_sql():
+    """Statements (with parameters) sent through any engine, including the app's async one"""
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(Engine, "before_cursor_execute", capture)
+
+
+def full_scans(db_session, statement, parameters):
+    """Hot tables that EXPLAIN QUERY PLAN reports as full table scans"""
+    plan = db_session.connection().exec_driver_sql(
+        f"EXPLAIN QUERY PLAN {statement}", tuple(parameters)
+    ).fetchall()
+    db_session.rollback()
+    scans = []
+    for row in plan:
+        match = FULL_SCAN.match(row[-1])
+        if match and match.group(1) in HOT_TABLES:
+            scans.append(row[-1])
+    return scans
+
+
+@pytest.mark.parametrize("role,method,path", ENDPOINTS)
+def test_router_queries_use_indexes(client, auth_headers, it_auth_headers, db_session, seeded,
+                                    ml_service, captured_sql, role, method, path):
+    """Every SELECT/UPDATE/DELETE behind an endpoint must reach hot tables through an index"""
+    headers = auth_headers if role == "msp" else it_auth_headers
+    # Authentication queries are covered by the cache; only count the endpoint's own SQL
+    client.get("/api/auth/me", headers=headers)
+    captured_sql.clear()
+
+    response = client.request(method, path.format(**seeded), headers=headers)
+    assert response.status_code < 400, response.text
+    assert captured_sql, "no SQL captured"
+
+    offenders = []
+    for statement, parameters in captured_sql:
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            for scan in full_scans(db_session, statement, parameters):
+                offenders.append(f"{scan}: {statement}")
+    assert not offenders, "\n".join(offenders)
+
+
+def test_usage_ingest_flush_uses_indexes(client, it_auth_headers, db_session, seeded, captured_sql):
+    """The bulk seat upsert behind usage ingestion must reach license_usage through an index"""
+    from routers.it_team import usage_buffer
+
+    events = [
+        {"license_id": seeded["license_pk"], "user_email": f"user{i}@example.com",
+         "occurred_at": datetime.utcnow().isoformat(), "usage_hours": 1.0}
+        for i in range(6)
+    ]
+    response = client.post("/api/it/usage/events", json={"events": events}, headers=it_auth_headers)
+    assert response.status_code == 202, response.text
+    captured_sql.clear()
+    client.portal.call(usage_buffer.flush)
+
+    offenders = []
+    for statement, parameters in captured_sql:
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            for scan in full_scans(db_session, statement, parameters):
+                offenders.append(f"{scan}: {statement}")
+    assert not offenders, "\n".join(offenders)
@@ -0,0 +1,8 @@
+"""
+Initialize utils package
+"""
+
+from .cache import TTLCache
+from .hashing import PasswordHashingPool, HashingPoolSaturated
+
+__all__ = ['TTLCache', 'PasswordHashingPool', 'HashingPoolSaturated']
@@ -0,0 +1,163 @@
+"""
+Daily active-seat bitmaps
+One bitmap per license and day over dense seat numbers, updated as usage
+events arrive, so DAU/WAU/MAU and inactivity counts are ORs and popcounts
+"""
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import SoftwareLicense, LicenseSeatNumber, LicenseDailyActivity
+
+activity_table = LicenseDailyActivity.__table__
+
+# Reported windows in days: 1, 7 and 30 are DAU, WAU and MAU
+ACTIVITY_WINDOWS = (1, 7, 30, 60, 90)
+INACTIVITY_WINDOWS = (30, 60, 90)
+
+
+def to_bitmap(bits: int) -> bytes:
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+
+def from_bitmap(bitmap: bytes) -> int:
+    return int.from_bytes(bitmap or b'', 'little')
+
+
+def _per_license(model, keys):
+    """WHERE clause for (license_id, value) pairs: one primary-key range per license"""
+    column = model.user_email if model is LicenseSeatNumber else model.day
+    values = defaultdict(set)
+    for license_id, value in keys:
+        values[license_id].add(value)
+    return or_(*[
+        and_(model.license_id == license_id, column.in_(sorted(license_values)))
+        for license_id, license_values in values.items()
+    ])
+
+
+async def assign_seat_numbers(db: AsyncSession, keys: Iterable[Tuple[int, str]]) -> Dict[Tuple[int, str], int]:
+    """
+    Seat numbers for (license_id, user_email) pairs, allocating new ones.
+
+    Numbers are handed out per license in order of first activity and never
+    reused, so they stay valid across compaction. The license rows are
+    locked while allocating, so concurrent writers cannot take the same
+    number. The caller commits.
+    """
+    keys = set(keys)
+    if not keys:
+        return {}
+    result = await db.execute(select(
+        LicenseSeatNumber.license_id, LicenseSeatNumber.user_email, LicenseSeatNumber.seat_no
+    ).where(_per_license(LicenseSeatNumber, keys)))
+    numbers = {(license_id, email): seat_no for license_id, email, seat_no in result}
+
+    missing = sorted(keys - set(numbers))
+    if missing:
+        license_ids = sorted({license_id for license_id, _ in missing})
+        await db.execute(select(SoftwareLicense.id).where(SoftwareLicense.id.in_(license_ids)).with_for_update())
+        # Re-read under the lock: another writer may have numbered some meanwhile
+        result = await db.execute(select(
+            LicenseSeatNumber.license_id, LicenseSeatNumber.user_email, LicenseSeatNumber.seat_no
+        ).where(_per_license(LicenseSeatNumber, missing)))
+        numbers.update({(license_id, email): seat_no for license_id, email, seat_no in result})
+        result = await db.execute(select(
+            LicenseSeatNumber.license_id, func.max(LicenseSeatNumber.seat_no)
+        ).where(LicenseSeatNumber.license_id.in_(license_ids)).group_by(LicenseSeatNumber.license_id))
+        next_no = defaultdict(int, {license_id: top + 1 for license_id, top in result})
+
+        rows = []
+        for license_id, email in missing:
+            if (license_id, email) in numbers:
+                continue
+            numbers[(license_id, email)] = next_no[license_id]
+            rows.append({'license_id': license_id, 'user_email': email, 'seat_no': next_no[license_id]})
+            next_no[license_id] += 1
+        if rows:
+            await db.execute(insert(LicenseSeatNumber), rows)
+    return numbers
+
+
+async def record_activity(db: AsyncSession, events: List[dict]) -> None:
+    """
+    Set each event's seat bit in its license's bitmap for the event day.
+
+    Bitmaps are ORed in Python and written back under a lock on the license
+    rows, so concurrent writers never drop each other's bits. The caller
+    commits.
+    """
+    if not events:
+        return
+    license_ids = sorted({event['license_id'] for event in events})
+    await db.execute(select(SoftwareLicense.id).where(SoftwareLicense.id.in_(license_ids)).with_for_update())
+    numbers = await assign_seat_numbers(db, {(event['license_id'], event['user_email']) for event in events})
+    bits = defaultdict(int)
+    for event in events:
+        seat_no = numbers[(event['license_id'], event['user_email'])]
+        bits[(event['license_id'], event['occurred_at'].date())] |= 1 << seat_no
+
+    result = await db.execute(select(
+        LicenseDailyActivity.license_id, LicenseDailyActivity.day, LicenseDailyActivity.bitmap
+    ).where(_per_license(LicenseDailyActivity, bits)))
+    stored = {(license_id, day): from_bitmap(bitmap) for license_id, day, bitmap in result}
+
+    new_rows, changed_rows = [], []
+    for (license_id, day), day_bits in bits.items():
+        old = stored.get((license_id, day))
+        if old is None:
+            new_rows.append({'license_id': license_id, 'day': day, 'bitmap': to_bitmap(day_bits)})
+        elif old | day_bits != old:
+            changed_rows.append({'b_license_id': license_id, 'b_day': day, 'b_bitmap': to_bitmap(old | day_bits)})
+    if new_rows:
+        await db.execute(insert(LicenseDailyActivity), new_rows)
+    if changed_rows:
+        await db.execute(update(activity_table).where(
+            activity_table.c.license_id == bindparam('b_license_id'), activity_table.c.day == bindparam('b_day')
+        ).values(bitmap=bindparam('b_bitmap')), changed_rows)
+
+
+def activity_counts(bitmaps: Dict[date, int], tracked_seats: int, today: date) -> dict:
+    """DAU/WAU/MAU, 60/90-day active and N-day inactive seat counts from day -> bitmap"""
+    names = {1: 'dau', 7: 'wau', 30: 'mau'}
+    counts, active = {}, {}
+    seen, day, covered = 0, today, 0
+    for window in sorted(ACTIVITY_WINDOWS):
+        # Widen the running OR one day at a time up to this window
+        while covered < window:
+            seen |= bitmaps.get(day, 0)
+            day -= timedelta(days=1)
+            covered += 1
+        active[window] = seen.bit_count()
+        counts[names.get(window, f'active_{window}d')] = active[window]
+    for window in INACTIVITY_WINDOWS:
+        counts[f'inactive_{window}d'] = tracked_seats - active[window]
+    return counts
+
+
+async def get_activity_counts(db: AsyncSession, license_id: int, today: date = None) -> dict:
+    """
+    Active and inactive seat counts for a license over ACTIVITY_WINDOWS.
+
+    Reads at most max(ACTIVITY_WINDOWS) bitmaps (a primary-key range) and the
+    seat count; every window is a running OR and a popcount. Inactive counts
+    cover seats that were ever active on the license.
+    """
+    today = today or datetime.utcnow().date()
+    first = today - timedelta(days=max(ACTIVITY_WINDOWS) - 1)
+    result = await db.execute(select(LicenseDailyActivity.day, LicenseDailyActivity.bitmap).where(
+        LicenseDailyActivity.license_id == license_id,
+        LicenseDailyActivity.day >= first,
+        LicenseDailyActivity.day <= today
+    ))
+    bitmaps = {day: from_bitmap(bitmap) for day, bitmap in result}
+    # Seat numbers are dense and never reused, so the highest one gives the count
+    top = (await db.execute(select(func.max(LicenseSeatNumber.seat_no)).where(
+        LicenseSeatNumber.license_id == license_id
+    ))).scalar()
+    tracked_seats = 0 if top is None else top + 1
+    return activity_counts(bitmaps, tracked_seats, today)
@@ -0,0 +1,248 @@
+"""
+Bulk row creation
+Validates rows one by one and writes the valid ones with batched executemany
+INSERTs (or UPDATEs for upserts), reporting a result per row
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import insert, select, tuple_, update
+
+from config import settings
+from models.models import SoftwareLicense
+from utils.cost_history import cost_change, record_cost_changes
+from utils.kpi_snapshot import TRACKED_MODELS, apply_kpi_delta, insert_deltas, update_deltas
+from utils.spend_aggregates import mark_spend_changed
+
+
+def validation_messages(exc: ValidationError) -> List[str]:
+    """Flatten a pydantic ValidationError into 'field: message' strings"""
+    return [
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in exc.errors()
+    ]
+
+
+def supplied_values(item: BaseModel) -> dict:
+    """Only the fields the incoming row actually carried (for updates)"""
+    return item.model_dump(exclude_unset=True)
+
+
+def row_error(index: int, errors: List[str]) -> dict:
+    return {"index": index, "status": "error", "errors": errors}
+
+
+def validate_rows(
+    rows: List[dict],
+    schema: type,
+    to_values: Callable[[BaseModel], dict],
+    start: int = 0
+) -> Tuple[List[Tuple[int, dict]], List[dict]]:
+    """
+    Validate raw rows against a pydantic schema.
+
+    Returns (index, column values) for the valid rows and error results for
+    the rest; start offsets the reported indexes for chunked callers.
+    """
+    valid, errors = [], []
+    for offset, raw in enumerate(rows):
+        index = start + offset
+        try:
+            valid.append((index, to_values(schema.model_validate(raw))))
+        except ValidationError as exc:
+            errors.append(row_error(index, validation_messages(exc)))
+    return valid, errors
+
+
+async def _insert_skipping_duplicates(db, model, column, rows):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING (id, key); rows whose key
+    another writer already holds are simply not returned.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        dialect_insert = None
+    if dialect_insert is None:
+        stmt = insert(model).returning(model.id, column, sort_by_parameter_order=True)
+    else:
+        stmt = dialect_insert(model).on_conflict_do_nothing(index_elements=[column]).returning(model.id, column)
+    result = await db.execute(stmt, rows)
+    return {key: new_id for new_id, key in result}
+
+
+async def insert_rows(db, model, indexed_values: List[Tuple[int, dict]], unique_key: Optional[str] = None) -> List[dict]:
+    """
+    Insert validated rows with batched executemany INSERT ... RETURNING.
+
+    With a unique_key, rows collide on it through ON CONFLICT DO NOTHING, so
+    keys taken in the database (even by a concurrent import) or by an
+    earlier row in the same call are reported as errors instead of
+    aborting the batch. Flush events do not fire for these inserts, so
+    owner KPI snapshots are updated here. The caller commits.
+    """
+    results = []
+    inserted = []
+    seen = set()
+    batch_size = settings.BULK_BATCH_SIZE
+    stmt = insert(model).returning(model.id, sort_by_parameter_order=True)
+
+    def duplicate(index, key):
+        results.append(row_error(index, [f"{unique_key}: '{key}' already exists"]))
+
+    for start in range(0, len(indexed_values), batch_size):
+        batch = indexed_values[start:start + batch_size]
+        if unique_key:
+            accepted = []
+            for index, values in batch:
+                key = values[unique_key]
+                if key in seen:
+                    duplicate(index, key)
+                else:
+                    seen.add(key)
+                    accepted.append((index, values))
+            if not accepted:
+                continue
+            ids = await _insert_skipping_duplicates(
+                db, model, getattr(model, unique_key), [values for _, values in accepted]
+            )
+            batch = []
+            for index, values in accepted:
+                new_id = ids.get(values[unique_key])
+                if new_id is None:
+                    duplicate(index, values[unique_key])
+                else:
+                    batch.append((index, values, new_id))
+        elif batch:
+            ids = (await db.execute(stmt, [values for _, values in batch])).scalars().all()
+            batch = [(index, values, new_id) for (index, values), new_id in zip(batch, ids)]
+
+        for index, values, new_id in batch:
+            results.append({"index": index, "status": "created", "id": new_id})
+            inserted.append({**values, "id": new_id})
+
+    if model in TRACKED_MODELS and inserted:
+        await _apply_deltas(db, insert_deltas(model, inserted))
+    if model is SoftwareLicense and inserted:
+        await _record_costs(db, [
+            cost_change(row["id"], row.get("owner_id"), "created", None, row.get("monthly_cost"))
+            for row in inserted
+        ])
+    return results
+
+
+async def _apply_deltas(db, deltas):
+    await db.run_sync(lambda session: [
+        apply_kpi_delta(session.connection(), owner_id, delta) for owner_id, delta in deltas.items()
+    ])
+
+
+async def _record_costs(db, changes):
+    # After _apply_deltas: cost history reads owner totals from the snapshots
+    await db.run_sync(lambda session: record_cost_changes(session.connection(), changes))
+    # Core writes skip the flush hook that drops cached spend aggregates
+    mark_spend_changed(db.sync_session, {change["owner_id"] for change in changes if change["owner_id"] is not None})
+
+
+def _license_changes(stored: dict, changes: dict) -> dict:
+    """Changes to a license plus the utilization a new seat total implies"""
+    if "total_licenses" not in changes:
+        return changes
+    total = changes["total_licenses"]
+    active_users = stored["active_users"] or 0
+    return {**changes, "utilization_percent": (active_users / total * 100) if total > 0 else 0}
+
+
+async def upsert_rows(
+    db,
+    model,
+    indexed_values: List[Tuple[int, Tuple[dict, dict]]],
+    key: Tuple[str, ...],
+    unique_key: Optional[str] = None
+) -> Dict:
+    """
+    Insert new rows and update existing ones matched on the key columns.
+
+    Each row carries two dicts: the full column values used when it is
+    inserted, and the changes applied when it matches an existing row (only
+    the columns the import actually supplied, so anything it left out is
+    kept). Within one call the last row for a key wins; the earlier ones are
+    counted as superseded. Updates go through a batched executemany UPDATE
+    by primary key and owner KPI snapshots are adjusted for both paths. New
+    rows are inserted with insert_rows, so one whose unique_key is held by a
+    row outside the key match (for example another owner's) becomes an
+    error. The caller commits.
+
+    Returns:
+        dict: created, updated, unchanged and superseded row counts and the
+        error results
+    """
+    latest = {}
+    for index, (values, changes) in indexed_values:
+        latest[tuple(values[column] for column in key)] = (index, values, changes)
+
+    tracked = TRACKED_MODELS.get(model, ((), None))[0]
+    columns = [model.id] + [getattr(model, name) for name in dict.fromkeys(key + tuple(tracked))]
+    key_columns = [getattr(model, column) for column in key]
+    existing = {}
+    keys = list(latest)
+    batch_size = settings.BULK_BATCH_SIZE
+    for start in range(0, len(keys), batch_size):
+        # Locked so seat counters read for derived columns cannot move underneath
+        result = await db.execute(
+            select(*columns).where(tuple_(*key_columns).in_(keys[start:start + batch_size])).with_for_update()
+        )
+        for row in result.mappings():
+            existing[tuple(row[column] for column in key)] = dict(row)
+
+    inserts, updates, old_rows, new_rows = [], [], [], []
+    for row_key, (index, values, changes) in latest.items():
+        stored = existing.get(row_key)
+        if stored is None:
+            inserts.append((index, values))
+            continue
+        if model is SoftwareLicense:
+            changes = _license_changes(stored, changes)
+        if changes:
+            updates.append({"id": stored["id"], **changes})
+            old_rows.append(stored)
+            new_rows.append({**stored, **changes})
+
+    for start in range(0, len(updates), batch_size):
+        await db.execute(update(model), updates[start:start + batch_size])
+    if model in TRACKED_MODELS and updates:
+        await _apply_deltas(db, update_deltas(model, old_rows, new_rows))
+    if model is SoftwareLicense and updates:
+        await _record_costs(db, [
+            cost_change(old["id"], new["owner_id"], "updated", old["monthly_cost"], new["monthly_cost"])
+            for old, new in zip(old_rows, new_rows)
+        ])
+
+    results = await insert_rows(db, model, inserts, unique_key)
+    errors = [result for result in results if result["status"] == "error"]
+    return {
+        "created": len(results) - len(errors),
+        "updated": len(updates),
+        "unchanged": len(latest) - len(inserts) - len(updates),
+        "superseded": len(indexed_values) - len(latest),
+        "errors": errors,
+    }
+
+
+def bulk_summary(results: List[dict]) -> Dict:
+    """Response body: counts plus per-row results in request order"""
+    results = sorted(results, key=lambda result: result["index"])
+    created = sum(1 for result in results if result["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+
+async def bulk_create(db, model, rows: List[dict], schema: type, to_values, unique_key: Optional[str] = None) -> Dict:
+    """Validate and insert rows in one transaction; returns bulk_summary"""
+    valid, errors = validate_rows(rows, schema, to_values)
+    results = errors + await insert_rows(db, model, valid, unique_key)
+    await db.commit()
+    return bulk_summary(results)
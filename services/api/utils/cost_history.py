@@ -0,0 +1,275 @@
+"""
+License cost history
+Records every change to SoftwareLicense.monthly_cost with the owner's running
+total and folds it into owner_monthly_cost, so cost trends are range scans
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import case, event, func, insert, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import SoftwareLicense, LicenseCostHistory, OwnerMonthlyCost, OwnerKpiSnapshot
+# Imported for its after_flush hook too, which must run before ours
+from utils.kpi_snapshot import rebuild_kpi_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def month_start(value):
+    """First day of the month containing a date or datetime"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def cost_change(license_id, owner_id, change, previous_cost, monthly_cost):
+    return {
+        'license_id': license_id, 'owner_id': owner_id, 'change': change,
+        'previous_cost': previous_cost, 'monthly_cost': monthly_cost or 0,
+    }
+
+
+def _cost_delta(change):
+    return change['monthly_cost'] - (change['previous_cost'] or 0)
+
+
+def record_cost_changes(connection, changes, changed_at=None):
+    """
+    Append cost changes to the history and fold them into monthly totals.
+
+    Owner totals are read from owner_kpi_snapshot, so call this after the
+    snapshots include the changes (the flush hook and utils/bulk.py do).
+    Changes are applied in list order and share one timestamp.
+
+    Args:
+        connection: Database connection
+        changes (list): dicts built by cost_change()
+        changed_at (datetime): Defaults to now
+    """
+    changes = [
+        change for change in changes
+        if change['owner_id'] is not None
+        and (change['change'] != 'updated' or change['previous_cost'] != change['monthly_cost'])
+    ]
+    if not changes:
+        return
+    changed_at = changed_at or datetime.utcnow()
+    month = month_start(changed_at)
+
+    owner_ids = {change['owner_id'] for change in changes}
+    totals = dict(connection.execute(
+        select(OwnerKpiSnapshot.owner_id, OwnerKpiSnapshot.total_monthly_cost).where(
+            OwnerKpiSnapshot.owner_id.in_(list(owner_ids))
+        )
+    ).all())
+    for owner_id in owner_ids - set(totals):
+        totals[owner_id] = rebuild_kpi_snapshot(connection, owner_id)['total_monthly_cost']
+
+    # Snapshots hold the total after every change; walk back for the earlier ones
+    rows = []
+    running = dict(totals)
+    for change in reversed(changes):
+        rows.append({**change, 'owner_total': running[change['owner_id']], 'changed_at': changed_at})
+        running[change['owner_id']] -= _cost_delta(change)
+    rows.reverse()
+    connection.execute(insert(LicenseCostHistory), rows)
+
+    monthly = defaultdict(lambda: {'cost_added': 0.0, 'cost_removed': 0.0, 'new_licenses': 0})
+    for change in changes:
+        values = monthly[change['owner_id']]
+        delta = _cost_delta(change)
+        if delta > 0:
+            values['cost_added'] += delta
+        else:
+            values['cost_removed'] -= delta
+        if change['change'] == 'created':
+            values['new_licenses'] += 1
+    _add_to_month(connection, month, [
+        {'owner_id': owner_id, 'month': month, 'closing_cost': totals[owner_id], **values}
+        for owner_id, values in monthly.items()
+    ])
+
+
+def _add_to_month(connection, month, rows):
+    """Upsert monthly rows: closing_cost is replaced, the counters are added"""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(OwnerMonthlyCost)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OwnerMonthlyCost.owner_id, OwnerMonthlyCost.month],
+            set_={
+                'closing_cost': stmt.excluded.closing_cost,
+                'cost_added': OwnerMonthlyCost.cost_added + stmt.excluded.cost_added,
+                'cost_removed': OwnerMonthlyCost.cost_removed + stmt.excluded.cost_removed,
+                'new_licenses': OwnerMonthlyCost.new_licenses + stmt.excluded.new_licenses,
+            }
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(update(OwnerMonthlyCost).where(
+            OwnerMonthlyCost.owner_id == row['owner_id'], OwnerMonthlyCost.month == month
+        ).values(
+            closing_cost=row['closing_cost'],
+            cost_added=OwnerMonthlyCost.cost_added + row['cost_added'],
+            cost_removed=OwnerMonthlyCost.cost_removed + row['cost_removed'],
+            new_licenses=OwnerMonthlyCost.new_licenses + row['new_licenses']
+        ))
+        if result.rowcount == 0:
+            connection.execute(insert(OwnerMonthlyCost).values(**row))
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _loaded(state, key):
+    """(old, new) for an attribute; old is None when it was not loaded"""
+    history = state.attrs[key].history
+    if history.added:
+        return (history.deleted[0] if history.deleted else None), history.added[0]
+    value = history.unchanged[0] if history.unchanged else state.dict.get(key)
+    return value, value
+
+
+def _record_license_cost_changes(session, flush_context):
+    """after_flush hook: log monthly_cost changes of flushed licenses"""
+    changes = []
+    for obj in session.new:
+        if isinstance(obj, SoftwareLicense):
+            changes.append(cost_change(obj.id, obj.owner_id, 'created', None, obj.monthly_cost))
+
+    for obj in session.dirty:
+        if not isinstance(obj, SoftwareLicense) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if not (state.attrs.monthly_cost.history.has_changes() or state.attrs.owner_id.history.has_changes()):
+            continue
+        old_owner, new_owner = _loaded(state, 'owner_id')
+        old_cost, new_cost = _loaded(state, 'monthly_cost')
+        if new_owner is None and 'owner_id' not in state.dict:
+            new_owner = old_owner = session.connection().execute(
+                select(SoftwareLicense.owner_id).where(SoftwareLicense.id == obj.id)
+            ).scalar()
+        if old_owner != new_owner:
+            # Moving a license removes it from one owner's costs and adds it to another's
+            changes.append(cost_change(obj.id, old_owner, 'deleted', old_cost, 0))
+            changes.append(cost_change(obj.id, new_owner, 'created', None, new_cost))
+        else:
+            changes.append(cost_change(obj.id, new_owner, 'updated', old_cost, new_cost))
+
+    for obj in session.deleted:
+        if not isinstance(obj, SoftwareLicense):
+            continue
+        values = inspect(obj).dict
+        if 'owner_id' not in values:
+            logger.debug("Owner of deleted license %s unknown, cost change not recorded", obj.id)
+            continue
+        changes.append(cost_change(obj.id, values['owner_id'], 'deleted', values.get('monthly_cost'), 0))
+
+    if changes:
+        record_cost_changes(session.connection(), changes)
+
+
+event.listen(Session, "after_flush", _record_license_cost_changes)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def get_monthly_costs(db: AsyncSession, owner_id: int, first: date, last: date) -> list:
+    """
+    Closing and opening monthly cost for each month in [first, last].
+
+    One range scan over owner_monthly_cost, starting at the latest month on
+    or before first so months without changes carry the previous total.
+
+    Returns:
+        list: (month, opening cost, closing cost) in month order
+    """
+    carried_from = select(func.max(OwnerMonthlyCost.month)).where(
+        OwnerMonthlyCost.owner_id == owner_id,
+        OwnerMonthlyCost.month <= first
+    ).scalar_subquery()
+    result = await db.execute(
+        select(OwnerMonthlyCost.month, OwnerMonthlyCost.closing_cost).where(
+            OwnerMonthlyCost.owner_id == owner_id,
+            OwnerMonthlyCost.month >= func.coalesce(carried_from, first),
+            OwnerMonthlyCost.month <= last
+        ).order_by(OwnerMonthlyCost.month)
+    )
+    closing_by_month = dict(result.all())
+
+    series = []
+    closing = 0.0
+    for month in sorted(closing_by_month):
+        if month >= first:
+            break
+        closing = closing_by_month[month]
+    # Count months rather than stepping past last, which may be December 9999
+    for offset in range((last.year - first.year) * 12 + last.month - first.month + 1):
+        month = add_months(first, offset)
+        opening = closing
+        closing = closing_by_month.get(month, opening)
+        series.append((month, opening, closing))
+    return series
+
+
+async def get_daily_costs(db: AsyncSession, owner_id: int, first: date, last: date) -> list:
+    """
+    Daily cost totals for [first, last] from the cost history.
+
+    Returns:
+        list: (day, total monthly cost at end of day, cost removed, licenses added)
+    """
+    start = datetime.combine(first, time.min)
+    opening = (await db.execute(
+        select(LicenseCostHistory.owner_total).where(
+            LicenseCostHistory.owner_id == owner_id,
+            LicenseCostHistory.changed_at < start
+        ).order_by(LicenseCostHistory.changed_at.desc(), LicenseCostHistory.id.desc()).limit(1)
+    )).scalar() or 0.0
+
+    bucket = func.date(LicenseCostHistory.changed_at)
+    per_day = select(
+        bucket.label('day'),
+        func.max(LicenseCostHistory.id).label('last_id'),
+        func.sum(case(
+            (LicenseCostHistory.monthly_cost < func.coalesce(LicenseCostHistory.previous_cost, 0),
+             func.coalesce(LicenseCostHistory.previous_cost, 0) - LicenseCostHistory.monthly_cost),
+            else_=0
+        )).label('removed'),
+        func.sum(case((LicenseCostHistory.change == 'created', 1), else_=0)).label('created')
+    ).where(
+        LicenseCostHistory.owner_id == owner_id,
+        LicenseCostHistory.changed_at >= start,
+        LicenseCostHistory.changed_at < datetime.combine(last + timedelta(days=1), time.min)
+    ).group_by(bucket).subquery()
+    # Rows are appended in time order, so a day's highest id carries its closing total
+    result = await db.execute(
+        select(per_day.c.day, LicenseCostHistory.owner_total, per_day.c.removed, per_day.c.created).join(
+            LicenseCostHistory, LicenseCostHistory.id == per_day.c.last_id
+        )
+    )
+    by_day = {str(day): (total, removed or 0.0, created or 0) for day, total, removed, created in result}
+
+    series = []
+    total = opening
+    day = first
+    while day <= last:
+        total, removed, created = by_day.get(day.isoformat(), (total, 0.0, 0))
+        series.append((day, total, removed, created))
+        day += timedelta(days=1)
+    return series
@@ -0,0 +1,60 @@
+"""
+Password hashing worker pool
+Runs bcrypt off the event loop with a concurrency limit and admission control
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+
+
+class HashingPoolSaturated(Exception):
+    """Raised when the hashing pool is running and queueing at capacity"""
+
+
+class PasswordHashingPool:
+    """
+    Bounded thread pool for password hashing and verification.
+
+    At most ``max_workers`` hashes run concurrently and at most ``max_queue``
+    more wait for a worker. Anything beyond that is rejected immediately with
+    HashingPoolSaturated so callers can shed load instead of queueing forever.
+    """
+
+    def __init__(self, context: CryptContext, max_workers: int = 4, max_queue: int = 32):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pwhash")
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            raise HashingPoolSaturated("Password hashing pool is saturated")
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self.completed += 1
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    def stats(self) -> dict:
+        """Return in-flight work, queue depth and rejection counters"""
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": min(self._pending, self.max_workers),
+            "queue_depth": max(self._pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
@@ -0,0 +1,105 @@
+"""
+Persisted client health-score factors
+Factor scores come from the ML service's HealthScoreCalculator and are stored
+per client; they are recomputed only when the calculator inputs change
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+
+from models.models import ClientHealthFactors
+from utils.ml_client import MLServiceUnavailable, post_ml
+
+HEALTH_SCORE_PATH = "/api/calculate/health-score"
+
+# Bump when the inputs sent to the calculator change meaning
+INPUTS_VERSION = 1
+
+
+def health_inputs(client, now=None):
+    """
+    Calculator payload for a client, built from its stored columns.
+
+    Only fields the client actually has are sent; the calculator falls back
+    to its defaults for the rest. Ages are whole days, so a client's inputs
+    change at most once a day without a write.
+    """
+    now = now or datetime.utcnow()
+    payload = {
+        'total_licenses': client.total_licenses,
+        'total_users': client.total_users,
+        'contract_value': client.contract_value,
+        'monthly_spend': client.monthly_spend,
+        'previous_health_score': client.health_score,
+    }
+    if client.created_at:
+        payload['contract_age_days'] = (now - client.created_at).days
+    if client.last_support_ticket:
+        payload['days_since_last_contact'] = (now - client.last_support_ticket).days
+    return {key: value for key, value in payload.items() if value is not None}
+
+
+def inputs_fingerprint(payload):
+    """Stable hash of a calculator payload"""
+    canonical = json.dumps({'v': INPUTS_VERSION, 'inputs': payload}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+async def calculate_health(payload):
+    """Score one client with the ML service's HealthScoreCalculator"""
+    return await post_ml(HEALTH_SCORE_PATH, payload)
+
+
+async def get_health_factors(db, client, stored=None):
+    """
+    Stored factors for client, recomputing them first if its inputs changed.
+
+    Pass the row already loaded alongside the client as stored to skip the
+    lookup. If the ML service is down, the last stored factors are returned
+    marked stale; MLServiceUnavailable is raised only when nothing has been
+    stored yet.
+
+    Returns:
+        tuple: (ClientHealthFactors, stale)
+    """
+    payload = health_inputs(client)
+    fingerprint = inputs_fingerprint(payload)
+    if stored is None:
+        stored = await db.get(ClientHealthFactors, client.id)
+    if stored is not None and stored.inputs_hash == fingerprint:
+        return stored, False
+
+    try:
+        result = await calculate_health(payload)
+    except MLServiceUnavailable:
+        if stored is not None:
+            return stored, True
+        raise
+
+    values = {
+        'overall_score': result['health_score'],
+        'factors': result['factors'],
+        'trend': result.get('trend'),
+        'insights': result.get('insights', []),
+        'health_status': result.get('health_status'),
+        'inputs_hash': fingerprint,
+        'computed_at': datetime.utcnow(),
+    }
+    if stored is None:
+        stored = ClientHealthFactors(client_id=client.id, **values)
+        db.add(stored)
+    else:
+        for key, value in values.items():
+            setattr(stored, key, value)
+
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request stored the same client first; serve its row
+        await db.rollback()
+        await db.refresh(client)
+        stored = await db.get(ClientHealthFactors, client.id)
+    return stored, False
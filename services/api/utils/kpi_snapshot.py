@@ -0,0 +1,389 @@
+"""
+Owner KPI snapshots
+Keeps one owner_kpi_snapshot row per owner in step with Client, SoftwareLicense,
+Recommendation and CostAnomaly writes so dashboards read totals in O(1)
+"""
+
+import logging
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select, update, insert, func, case
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import Client, SoftwareLicense, Recommendation, CostAnomaly, OwnerKpiSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLUMNS = [
+    'client_count', 'total_mrr', 'health_score_sum', 'high_risk_clients',
+    'pending_recommendations',
+    'software_count', 'total_monthly_cost', 'total_licenses', 'active_users',
+    'utilization_sum', 'utilization_count', 'low_utilization_count',
+    'low_utilization_cost', 'savings_potential', 'open_anomalies'
+]
+
+# Float sums are compared with a tolerance during reconciliation
+_FLOAT_TOLERANCE = 1e-6
+
+
+def _client_contribution(row):
+    return {
+        'client_count': 1,
+        'total_mrr': row['monthly_spend'] or 0,
+        'health_score_sum': row['health_score'] or 0,
+        'high_risk_clients': 1 if row['churn_risk'] == 'high' else 0
+    }
+
+
+def _license_contribution(row):
+    utilization = row['utilization_percent']
+    monthly_cost = row['monthly_cost'] or 0
+    # Same rule as the dashboards: a truthy utilization below 50%
+    low_utilization = bool(utilization) and utilization < 50
+    return {
+        'software_count': 1,
+        'total_monthly_cost': monthly_cost,
+        'total_licenses': row['total_licenses'] or 0,
+        'active_users': row['active_users'] or 0,
+        'utilization_sum': utilization or 0,
+        'utilization_count': 1 if utilization is not None else 0,
+        'low_utilization_count': 1 if low_utilization else 0,
+        'low_utilization_cost': monthly_cost if low_utilization else 0,
+        'savings_potential': monthly_cost * (1 - utilization / 100) if low_utilization else 0
+    }
+
+
+def _recommendation_contribution(row):
+    return {'pending_recommendations': 1 if row['status'] == 'pending' else 0}
+
+
+def _anomaly_contribution(row):
+    return {'open_anomalies': 0 if row['resolved'] else 1}
+
+
+# Model -> (attributes the snapshot depends on, contribution function)
+TRACKED_MODELS = {
+    Client: (('owner_id', 'monthly_spend', 'health_score', 'churn_risk'), _client_contribution),
+    SoftwareLicense: (
+        ('owner_id', 'monthly_cost', 'total_licenses', 'active_users', 'utilization_percent'),
+        _license_contribution
+    ),
+    Recommendation: (('owner_id', 'status'), _recommendation_contribution),
+    CostAnomaly: (('owner_id', 'resolved'), _anomaly_contribution),
+}
+
+
+def license_change_delta(old_row, new_row):
+    """Snapshot delta for a license whose counters were changed with a Core UPDATE"""
+    delta = defaultdict(float)
+    for key, value in _license_contribution(new_row).items():
+        delta[key] += value
+    for key, value in _license_contribution(old_row).items():
+        delta[key] -= value
+    return dict(delta)
+
+
+def insert_deltas(model, rows):
+    """Per-owner snapshot deltas for rows added with a Core INSERT (no flush events)"""
+    keys, contribution = TRACKED_MODELS[model]
+    deltas = defaultdict(lambda: defaultdict(float))
+    for row in rows:
+        owner_id = row.get('owner_id')
+        if owner_id is None:
+            continue
+        for key, value in contribution({key: row.get(key) for key in keys}).items():
+            deltas[owner_id][key] += value
+    return {owner_id: dict(delta) for owner_id, delta in deltas.items()}
+
+
+def update_deltas(model, old_rows, new_rows):
+    """Per-owner snapshot deltas for rows rewritten with a Core UPDATE"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    for rows, sign in ((new_rows, 1), (old_rows, -1)):
+        for owner_id, delta in insert_deltas(model, rows).items():
+            for key, value in delta.items():
+                deltas[owner_id][key] += sign * value
+    return {owner_id: dict(delta) for owner_id, delta in deltas.items()}
+
+
+# ---------------------------------------------------------------------------
+# Full recomputation
+# ---------------------------------------------------------------------------
+
+def compute_owner_kpis(connection, owner_id):
+    """Compute an owner's totals from the base tables (one aggregate per table)"""
+    clients = connection.execute(select(
+        func.count(Client.id),
+        func.coalesce(func.sum(Client.monthly_spend), 0),
+        func.coalesce(func.sum(Client.health_score), 0),
+        func.coalesce(func.sum(case((Client.churn_risk == 'high', 1), else_=0)), 0)
+    ).where(Client.owner_id == owner_id)).one()
+
+    low_utilization = (SoftwareLicense.utilization_percent != 0) & (SoftwareLicense.utilization_percent < 50)
+    licenses = connection.execute(select(
+        func.count(SoftwareLicense.id),
+        func.coalesce(func.sum(SoftwareLicense.monthly_cost), 0),
+        func.coalesce(func.sum(SoftwareLicense.total_licenses), 0),
+        func.coalesce(func.sum(SoftwareLicense.active_users), 0),
+        func.coalesce(func.sum(SoftwareLicense.utilization_percent), 0),
+        func.count(SoftwareLicense.utilization_percent),
+        func.coalesce(func.sum(case((low_utilization, 1), else_=0)), 0),
+        func.coalesce(func.sum(case((low_utilization, func.coalesce(SoftwareLicense.monthly_cost, 0)), else_=0)), 0),
+        func.coalesce(func.sum(case((
+            low_utilization,
+            func.coalesce(SoftwareLicense.monthly_cost, 0) * (1 - SoftwareLicense.utilization_percent / 100.0)
+        ), else_=0)), 0)
+    ).where(SoftwareLicense.owner_id == owner_id)).one()
+
+    pending_recommendations = connection.execute(select(func.count(Recommendation.id)).where(
+        Recommendation.owner_id == owner_id,
+        Recommendation.status == 'pending'
+    )).scalar()
+
+    open_anomalies = connection.execute(select(func.count(CostAnomaly.id)).where(
+        CostAnomaly.owner_id == owner_id,
+        func.coalesce(CostAnomaly.resolved, False) == False
+    )).scalar()
+
+    return {
+        'client_count': clients[0],
+        'total_mrr': float(clients[1]),
+        'health_score_sum': float(clients[2]),
+        'high_risk_clients': int(clients[3]),
+        'pending_recommendations': pending_recommendations,
+        'software_count': licenses[0],
+        'total_monthly_cost': float(licenses[1]),
+        'total_licenses': int(licenses[2]),
+        'active_users': int(licenses[3]),
+        'utilization_sum': float(licenses[4]),
+        'utilization_count': licenses[5],
+        'low_utilization_count': int(licenses[6]),
+        'low_utilization_cost': float(licenses[7]),
+        'savings_potential': float(licenses[8]),
+        'open_anomalies': open_anomalies
+    }
+
+
+def _upsert_snapshot(connection, owner_id, values):
+    """Insert or overwrite an owner's snapshot row"""
+    values = dict(values, owner_id=owner_id, updated_at=datetime.utcnow())
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(OwnerKpiSnapshot).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[OwnerKpiSnapshot.owner_id],
+            set_={key: stmt.excluded[key] for key in values if key != 'owner_id'}
+        )
+        connection.execute(stmt)
+        return
+    result = connection.execute(
+        update(OwnerKpiSnapshot).where(OwnerKpiSnapshot.owner_id == owner_id).values(**values)
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(OwnerKpiSnapshot).values(**values))
+
+
+def rebuild_kpi_snapshot(connection, owner_id):
+    """Recompute an owner's snapshot from scratch and store it"""
+    values = compute_owner_kpis(connection, owner_id)
+    _upsert_snapshot(connection, owner_id, values)
+    return values
+
+
+def apply_kpi_delta(connection, owner_id, delta):
+    """Add a delta to an owner's snapshot, building the row first if it is missing"""
+    delta = {key: value for key, value in delta.items() if value}
+    if owner_id is None or not delta:
+        return
+    stmt = update(OwnerKpiSnapshot).where(OwnerKpiSnapshot.owner_id == owner_id).values(
+        updated_at=datetime.utcnow(),
+        **{key: getattr(OwnerKpiSnapshot, key) + value for key, value in delta.items()}
+    )
+    if connection.execute(stmt).rowcount == 0:
+        # No snapshot yet: the rebuild already sees this transaction's rows
+        rebuild_kpi_snapshot(connection, owner_id)
+
+
+def reconcile_kpi_snapshots(connection, owner_ids=None):
+    """
+    Repair drift between snapshots and the base tables.
+
+    Args:
+        connection: Database connection
+        owner_ids (list): Owners to check; defaults to every owner with data
+
+    Returns:
+        list: Owner ids whose snapshot was missing or wrong and has been rewritten
+    """
+    if owner_ids is None:
+        owner_ids = set()
+        for model in TRACKED_MODELS:
+            owner_ids.update(connection.execute(
+                select(model.owner_id).where(model.owner_id.isnot(None)).distinct()
+            ).scalars())
+        owner_ids.update(connection.execute(select(OwnerKpiSnapshot.owner_id)).scalars())
+
+    stored = {
+        row.owner_id: row for row in connection.execute(
+            select(OwnerKpiSnapshot).where(OwnerKpiSnapshot.owner_id.in_(list(owner_ids)))
+        )
+    }
+
+    repaired = []
+    for owner_id in sorted(owner_ids):
+        expected = compute_owner_kpis(connection, owner_id)
+        current = stored.get(owner_id)
+        if current is not None and all(
+            abs((getattr(current, key) or 0) - expected[key]) <= _FLOAT_TOLERANCE * max(1.0, abs(expected[key]))
+            for key in SNAPSHOT_COLUMNS
+        ):
+            continue
+        _upsert_snapshot(connection, owner_id, expected)
+        repaired.append(owner_id)
+    return repaired
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+_UNKNOWN = object()
+
+
+def _row_values(obj, keys, when):
+    """
+    Values of the tracked attributes before or after the flush.
+
+    Returns None when an old value cannot be recovered from attribute history
+    (for example an expired attribute that was overwritten without loading).
+    """
+    state = inspect(obj)
+    values = {}
+    for key in keys:
+        history = state.attrs[key].history
+        if when == 'old' and history.added:
+            if not history.deleted:
+                return None
+            values[key] = history.deleted[0]
+        elif history.added:
+            values[key] = history.added[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        else:
+            values[key] = state.dict.get(key, _UNKNOWN)
+    return values
+
+
+def _fill_unknown(connection, model, obj, values):
+    """Load unmodified attributes that were not in memory (they still hold the old value)"""
+    missing = [key for key, value in values.items() if value is _UNKNOWN]
+    if missing:
+        row = connection.execute(
+            select(*[getattr(model, key) for key in missing]).where(model.id == obj.id)
+        ).one_or_none()
+        if row is None:
+            return None
+        values.update(zip(missing, row))
+    return values
+
+
+def _maintain_kpi_snapshots(session, flush_context):
+    """after_flush hook: fold inserted, updated and deleted rows into owner snapshots"""
+    deltas = defaultdict(lambda: defaultdict(float))
+    rebuild = set()
+    connection = session.connection()
+
+    def add(owner_id, contribution, sign):
+        if owner_id is None:
+            return
+        for key, value in contribution.items():
+            deltas[owner_id][key] += sign * value
+
+    for obj in session.new:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked is None:
+            continue
+        keys, contribution = tracked
+        values = {key: inspect(obj).dict.get(key) for key in keys}
+        add(values['owner_id'], contribution(values), 1)
+
+    for obj in session.deleted:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked is None:
+            continue
+        keys, contribution = tracked
+        values = {key: inspect(obj).dict.get(key, _UNKNOWN) for key in keys}
+        if any(value is _UNKNOWN for value in values.values()):
+            # The row is gone, so rebuild whichever owner we can still identify
+            if values['owner_id'] is not _UNKNOWN:
+                rebuild.add(values['owner_id'])
+            continue
+        add(values['owner_id'], contribution(values), -1)
+
+    for obj in session.dirty:
+        tracked = TRACKED_MODELS.get(type(obj))
+        if tracked is None or not session.is_modified(obj):
+            continue
+        keys, contribution = tracked
+        state = inspect(obj)
+        if not any(state.attrs[key].history.has_changes() for key in keys):
+            continue
+        new = _fill_unknown(connection, type(obj), obj, _row_values(obj, keys, 'new'))
+        old = _row_values(obj, keys, 'old')
+        if old is not None:
+            old = _fill_unknown(connection, type(obj), obj, old)
+        if new is None:
+            continue
+        if old is None:
+            logger.debug("Old values unavailable for %r, rebuilding snapshot", obj)
+            rebuild.add(new['owner_id'])
+            continue
+        add(old['owner_id'], contribution(old), -1)
+        add(new['owner_id'], contribution(new), 1)
+
+    for owner_id in rebuild:
+        if owner_id is not None:
+            rebuild_kpi_snapshot(connection, owner_id)
+            deltas.pop(owner_id, None)
+    for owner_id, delta in deltas.items():
+        apply_kpi_delta(connection, owner_id, delta)
+
+
+event.listen(Session, "after_flush", _maintain_kpi_snapshots)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def snapshot_view(values):
+    """Add the derived averages dashboards display to raw snapshot totals"""
+    view = dict(values)
+    client_count = values['client_count']
+    software_count = values['software_count']
+    view['avg_health_score'] = values['health_score_sum'] / client_count if client_count else 0
+    # IT dashboard averages over licenses that report utilization ...
+    view['avg_utilization'] = (
+        values['utilization_sum'] / values['utilization_count'] if values['utilization_count'] else 0
+    )
+    # ... while the executive summary treats a missing utilization as 0
+    view['avg_utilization_all'] = values['utilization_sum'] / software_count if software_count else 0
+    return view
+
+
+async def get_kpi_snapshot(db: AsyncSession, owner_id: int) -> dict:
+    """Read an owner's snapshot (a primary-key lookup), building it on first use"""
+    result = await db.execute(select(OwnerKpiSnapshot).where(OwnerKpiSnapshot.owner_id == owner_id))
+    snapshot = result.scalar_one_or_none()
+    if snapshot is not None:
+        return snapshot_view({key: getattr(snapshot, key) for key in SNAPSHOT_COLUMNS})
+
+    values = await db.run_sync(lambda session: rebuild_kpi_snapshot(session.connection(), owner_id))
+    await db.commit()
+    return snapshot_view(values)
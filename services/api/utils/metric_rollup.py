@@ -0,0 +1,274 @@
+"""
+Daily ClientMetric rollups
+Folds ClientMetric writes into client_metric_daily (one row per owner, metric
+type and day) so trend endpoints read at most one row per day of the window
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import and_, delete, event, func, insert, inspect, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from models.models import Client, ClientMetric, ClientMetricDaily
+
+logger = logging.getLogger(__name__)
+
+_ROLLUP_KEYS = ('client_id', 'metric_type', 'value', 'timestamp')
+
+
+def _day_range(day):
+    start = datetime.combine(day, time.min)
+    return start, start + timedelta(days=1)
+
+
+def add_to_rollup(connection, totals):
+    """
+    Add metric totals to the rollup, creating missing day rows.
+
+    Args:
+        connection: Database connection
+        totals (dict): (owner_id, metric_type, day) -> (value sum, sample count)
+    """
+    rows = [
+        {'owner_id': owner_id, 'metric_type': metric_type, 'day': day,
+         'value_sum': value_sum, 'sample_count': count}
+        for (owner_id, metric_type, day), (value_sum, count) in totals.items()
+    ]
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(ClientMetricDaily)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ClientMetricDaily.owner_id, ClientMetricDaily.metric_type, ClientMetricDaily.day],
+            set_={
+                'value_sum': ClientMetricDaily.value_sum + stmt.excluded.value_sum,
+                'sample_count': ClientMetricDaily.sample_count + stmt.excluded.sample_count,
+            }
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        result = connection.execute(update(ClientMetricDaily).where(
+            ClientMetricDaily.owner_id == row['owner_id'],
+            ClientMetricDaily.metric_type == row['metric_type'],
+            ClientMetricDaily.day == row['day']
+        ).values(
+            value_sum=ClientMetricDaily.value_sum + row['value_sum'],
+            sample_count=ClientMetricDaily.sample_count + row['sample_count']
+        ))
+        if result.rowcount == 0:
+            connection.execute(insert(ClientMetricDaily).values(**row))
+
+
+def rebuild_metric_rollup(connection, owner_id=None, days=None):
+    """
+    Recompute rollup rows from client_metrics with SQL date bucketing.
+
+    Args:
+        connection: Database connection
+        owner_id (int): Owner to rebuild; defaults to every owner
+        days (iterable): Days to rebuild; defaults to all of them
+
+    Returns:
+        int: Rollup rows written
+    """
+    bucket = func.date(ClientMetric.timestamp)
+    query = select(
+        Client.owner_id, ClientMetric.metric_type, bucket,
+        func.coalesce(func.sum(ClientMetric.value), 0), func.count(ClientMetric.id)
+    ).join(Client, Client.id == ClientMetric.client_id).where(
+        Client.owner_id.isnot(None),
+        ClientMetric.metric_type.isnot(None),
+        ClientMetric.timestamp.isnot(None)
+    ).group_by(Client.owner_id, ClientMetric.metric_type, bucket)
+    stale = delete(ClientMetricDaily)
+
+    if owner_id is not None:
+        query = query.where(Client.owner_id == owner_id)
+        stale = stale.where(ClientMetricDaily.owner_id == owner_id)
+    if days is not None:
+        days = sorted(set(days))
+        if not days:
+            return 0
+        # Timestamp ranges rather than date(timestamp) so the index is usable
+        query = query.where(or_(*[
+            and_(ClientMetric.timestamp >= start, ClientMetric.timestamp < end)
+            for start, end in map(_day_range, days)
+        ]))
+        stale = stale.where(ClientMetricDaily.day.in_(days))
+
+    connection.execute(stale)
+    result = connection.execute(insert(ClientMetricDaily).from_select(
+        ['owner_id', 'metric_type', 'day', 'value_sum', 'sample_count'], query
+    ))
+    return result.rowcount
+
+
+# ---------------------------------------------------------------------------
+# Incremental maintenance
+# ---------------------------------------------------------------------------
+
+def _history_values(obj, when):
+    """Rollup attributes before or after the flush; None when an old value was never loaded"""
+    state = inspect(obj)
+    values = {}
+    for key in _ROLLUP_KEYS:
+        history = state.attrs[key].history
+        if when == 'old' and history.added:
+            if not history.deleted:
+                return None
+            values[key] = history.deleted[0]
+        elif history.added:
+            values[key] = history.added[0]
+        elif history.unchanged:
+            values[key] = history.unchanged[0]
+        elif key in state.dict:
+            values[key] = state.dict[key]
+        else:
+            return None
+    return values
+
+
+def _stored_values(connection, ids):
+    """Rollup attributes of metric rows by primary key, as the database holds them"""
+    if not ids:
+        return {}
+    result = connection.execute(
+        select(ClientMetric.id, *[getattr(ClientMetric, key) for key in _ROLLUP_KEYS])
+        .where(ClientMetric.id.in_(list(ids)))
+    )
+    return {row[0]: dict(zip(_ROLLUP_KEYS, row[1:])) for row in result}
+
+
+def _load_old_values(session, flush_context, instances):
+    """
+    before_flush hook: read the stored rollup keys of changed or deleted
+    metrics whose old values were never loaded (for example an expired
+    instance overwritten without a refresh), while the rows still hold them.
+    """
+    ids = []
+    for obj in session.dirty:
+        if not isinstance(obj, ClientMetric) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if any(state.attrs[key].history.has_changes() for key in _ROLLUP_KEYS) and _history_values(obj, 'old') is None:
+            ids.append(state.identity[0])
+    for obj in session.deleted:
+        state = inspect(obj)
+        if isinstance(obj, ClientMetric) and any(key not in state.dict for key in _ROLLUP_KEYS):
+            ids.append(state.identity[0])
+    session.info['metric_rollup_old_values'] = _stored_values(session.connection(), ids) if ids else {}
+
+
+def _maintain_metric_rollups(session, flush_context):
+    """
+    after_flush hook: fold ClientMetric writes into client_metric_daily.
+
+    New metrics are added to their day's totals. Updated and deleted metrics
+    re-aggregate the owner days they touched (the flush has already been
+    applied), since client_metrics is expected to be append-only and this is
+    rare. Old values missing from attribute history come from the rows read
+    by _load_old_values; whole-table rebuilds are left to offline reconciles.
+    """
+    stored = session.info.pop('metric_rollup_old_values', {})
+    added, touched, reload = [], [], []
+
+    for obj in session.new:
+        if isinstance(obj, ClientMetric):
+            added.append({key: getattr(obj, key) for key in _ROLLUP_KEYS})
+
+    for obj in session.dirty:
+        if not isinstance(obj, ClientMetric) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        if not any(state.attrs[key].history.has_changes() for key in _ROLLUP_KEYS):
+            continue
+        old = _history_values(obj, 'old') or stored.get(state.identity[0])
+        if old is None:
+            logger.warning("Old rollup values unavailable for %r; its previous day needs a reconcile", obj)
+        else:
+            touched.append(old)
+        new = _history_values(obj, 'new')
+        if new is None:
+            reload.append(state.identity[0])
+        else:
+            touched.append(new)
+
+    for obj in session.deleted:
+        if not isinstance(obj, ClientMetric):
+            continue
+        state = inspect(obj)
+        values = stored.get(state.identity[0]) or {key: state.dict.get(key) for key in _ROLLUP_KEYS}
+        touched.append(values)
+
+    if not (added or touched or reload):
+        return
+    connection = session.connection()
+    # The flush has been applied, so the rows hold the new values
+    touched += _stored_values(connection, reload).values()
+
+    client_ids = {row['client_id'] for row in added + touched if row['client_id'] is not None}
+    owners = dict(connection.execute(
+        select(Client.id, Client.owner_id).where(Client.id.in_(list(client_ids)))
+    ).all())
+
+    repair = defaultdict(set)
+    for row in touched:
+        owner_id = owners.get(row['client_id'])
+        if owner_id is not None and row['timestamp'] is not None:
+            repair[owner_id].add(row['timestamp'].date())
+
+    totals = defaultdict(lambda: [0.0, 0])
+    for row in added:
+        owner_id = owners.get(row['client_id'])
+        if owner_id is None or row['metric_type'] is None or row['timestamp'] is None:
+            continue
+        day = row['timestamp'].date()
+        if day in repair.get(owner_id, ()):
+            continue  # the rebuild below already counts it
+        key = (owner_id, row['metric_type'], day)
+        totals[key][0] += row['value'] or 0
+        totals[key][1] += 1
+
+    for owner_id, days in repair.items():
+        rebuild_metric_rollup(connection, owner_id, days)
+    add_to_rollup(connection, totals)
+
+
+event.listen(Session, "before_flush", _load_old_values)
+event.listen(Session, "after_flush", _maintain_metric_rollups)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+async def get_daily_totals(db: AsyncSession, owner_id: int, metric_types, start: date, end: date) -> dict:
+    """
+    Rollup totals for an owner over [start, end] (a primary-key range scan).
+
+    Returns:
+        dict: metric_type -> {day: (value sum, sample count)}; days without
+        metrics are absent
+    """
+    result = await db.execute(select(
+        ClientMetricDaily.metric_type, ClientMetricDaily.day,
+        ClientMetricDaily.value_sum, ClientMetricDaily.sample_count
+    ).where(
+        ClientMetricDaily.owner_id == owner_id,
+        ClientMetricDaily.metric_type.in_(list(metric_types)),
+        ClientMetricDaily.day >= start,
+        ClientMetricDaily.day <= end
+    ))
+    totals = defaultdict(dict)
+    for metric_type, day, value_sum, count in result:
+        totals[metric_type][day] = (value_sum, count)
+    return totals
@@ -0,0 +1,25 @@
+"""
+ML service client
+Async JSON calls to the PulseOps ML service at settings.ML_ENDPOINT
+"""
+
+import httpx
+
+from config import settings
+
+
+class MLServiceUnavailable(Exception):
+    """Raised when the ML service cannot be reached or rejects a request"""
+
+
+async def post_ml(path: str, payload: dict) -> dict:
+    """POST payload to an ML service endpoint and return the decoded JSON body"""
+    url = f"{settings.ML_ENDPOINT.rstrip('/')}{path}"
+    try:
+        async with httpx.AsyncClient(timeout=settings.ML_TIMEOUT_SECONDS) as client:
+            response = await client.post(url, json=payload)
+    except httpx.HTTPError as exc:
+        raise MLServiceUnavailable(f"ML service unreachable: {exc}") from exc
+    if response.status_code != 200:
+        raise MLServiceUnavailable(f"ML service returned {response.status_code} for {path}")
+    return response.json()
@@ -0,0 +1,85 @@
+"""
+Keyset (cursor) pagination helpers
+Opaque next-page tokens over a stable, unique sort order
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# (column, descending) pairs; the last column must be unique (usually the id)
+SortOrder = Sequence[Tuple[object, bool]]
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination token cannot be decoded"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values: Sequence) -> str:
+    """Encode the sort key of the last row on a page as an opaque token"""
+    payload = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, size: int) -> List:
+    """Decode a token produced by encode_cursor for a sort order of the given size"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise InvalidCursor("Cursor does not match this listing")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError) as exc:
+        raise InvalidCursor("Invalid pagination cursor") from exc
+
+
+def keyset_condition(order: SortOrder, values: Sequence):
+    """
+    WHERE clause selecting rows strictly after values in the given order.
+
+    Expands to a >= x AND ((a > x) OR (a = x AND b > y) OR ...), flipping the
+    comparisons for descending columns, so mixed directions work on every
+    dialect. The redundant leading bound lets the planner seek the index
+    instead of filtering every row before the cursor.
+    """
+    clauses = []
+    for i, (column, descending) in enumerate(order):
+        equal_prefix = [col == values[j] for j, (col, _) in enumerate(order[:i])]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, after))
+    lead, lead_descending = order[0]
+    seek = lead <= values[0] if lead_descending else lead >= values[0]
+    return and_(seek, or_(*clauses))
+
+
+def apply_keyset(query, order: SortOrder, cursor: Optional[str]):
+    """Order a select by the sort key and, given a cursor, start after it"""
+    query = query.order_by(*[column.desc() if descending else column.asc() for column, descending in order])
+    if cursor:
+        query = query.where(keyset_condition(order, decode_cursor(cursor, len(order))))
+    return query
+
+
+def next_cursor(rows: Sequence, order: SortOrder, limit: int) -> Optional[str]:
+    """Token for the page after rows, or None when this was the last page"""
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor([getattr(last, column.key) for column, _ in order])
@@ -0,0 +1,69 @@
+"""
+License seat counters
+Moves SoftwareLicense.active_users and utilization_percent by per-license seat
+deltas in SQL and keeps owner KPI snapshots and spend aggregates in step
+"""
+
+from typing import Dict, List
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import SoftwareLicense
+from utils.kpi_snapshot import apply_kpi_delta, update_deltas
+from utils.spend_aggregates import mark_spend_changed
+
+LICENSE_COUNTERS = (
+    SoftwareLicense.id, SoftwareLicense.software_name, SoftwareLicense.owner_id,
+    SoftwareLicense.monthly_cost, SoftwareLicense.total_licenses,
+    SoftwareLicense.active_users, SoftwareLicense.utilization_percent,
+)
+
+
+async def adjust_active_users(db: AsyncSession, changes: Dict[int, int]) -> List[dict]:
+    """
+    Add seat deltas to active_users (clamped at 0) and recompute utilization.
+
+    The increment happens in the UPDATE itself, so concurrent callers never
+    overwrite each other's counts. The licenses are locked first to read the
+    old counters for exact snapshot deltas. Core UPDATEs skip the flush hooks,
+    so snapshots and the spend cache are updated here. The caller commits.
+
+    Args:
+        db: Database session
+        changes (dict): license_id -> seats gained (negative for seats freed)
+
+    Returns:
+        list: New counter rows (LICENSE_COUNTERS) of the changed licenses
+    """
+    changes = {license_id: delta for license_id, delta in changes.items() if delta}
+    if not changes:
+        return []
+
+    result = await db.execute(
+        select(*LICENSE_COUNTERS).where(SoftwareLicense.id.in_(list(changes))).with_for_update()
+    )
+    old_rows = [dict(row) for row in result.mappings()]
+
+    # SET expressions all see the old row, so utilization reuses the new count expression
+    greatest = func.max if db.get_bind().dialect.name == 'sqlite' else func.greatest
+    delta = case(changes, value=SoftwareLicense.id, else_=0)
+    active_users = greatest(func.coalesce(SoftwareLicense.active_users, 0) + delta, 0)
+    result = await db.execute(
+        update(SoftwareLicense).where(SoftwareLicense.id.in_(list(changes))).values(
+            active_users=active_users,
+            utilization_percent=case(
+                (SoftwareLicense.total_licenses > 0, active_users * 100.0 / SoftwareLicense.total_licenses),
+                else_=0
+            )
+        ).returning(*LICENSE_COUNTERS),
+        execution_options={"synchronize_session": "fetch"}
+    )
+    new_rows = [dict(row) for row in result.mappings()]
+
+    deltas = update_deltas(SoftwareLicense, old_rows, new_rows)
+    await db.run_sync(lambda session: [
+        apply_kpi_delta(session.connection(), owner_id, delta) for owner_id, delta in deltas.items()
+    ])
+    mark_spend_changed(db.sync_session, {row['owner_id'] for row in new_rows if row['owner_id'] is not None})
+    return new_rows
@@ -0,0 +1,68 @@
+"""
+Set-based seat deactivation
+Deactivates stale LicenseUsage seats with one UPDATE ... RETURNING and adjusts
+the license counters in SQL, so concurrent calls cannot double-subtract
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import SoftwareLicense, LicenseUsage
+from utils.seat_counters import adjust_active_users
+
+
+async def deactivate_stale_seats(
+    db: AsyncSession,
+    owner_id: int,
+    inactive_before: datetime,
+    license_id: Optional[int] = None
+) -> List[dict]:
+    """
+    Deactivate seats not used since inactive_before and commit.
+
+    Covers one license or, when license_id is None, every license of the
+    owner. A seat is claimed by whichever concurrent call flips it first
+    (the UPDATE re-checks is_active), and active_users is decremented in
+    SQL, so counts stay exact under concurrency.
+
+    Returns:
+        list: Per-license results for licenses that lost seats, ordered by
+        monthly savings
+    """
+    licenses = select(SoftwareLicense.id).where(SoftwareLicense.owner_id == owner_id)
+    if license_id is not None:
+        licenses = licenses.where(SoftwareLicense.id == license_id)
+
+    result = await db.execute(
+        update(LicenseUsage).where(
+            LicenseUsage.license_id.in_(licenses.scalar_subquery()),
+            LicenseUsage.last_login < inactive_before,
+            LicenseUsage.is_active == True
+        ).values(is_active=False).returning(LicenseUsage.license_id),
+        execution_options={"synchronize_session": False}
+    )
+    deactivated = Counter(result.scalars())
+    if not deactivated:
+        await db.commit()
+        return []
+
+    new_rows = await adjust_active_users(db, {license_id: -count for license_id, count in deactivated.items()})
+    await db.commit()
+
+    results = []
+    for row in new_rows:
+        count = deactivated[row['id']]
+        per_seat = (row['monthly_cost'] or 0) / row['total_licenses'] if row['total_licenses'] else 0
+        results.append({
+            "license_id": row['id'],
+            "software_name": row['software_name'],
+            "deactivated_count": count,
+            "monthly_cost_saved": count * per_seat,
+            "new_utilization": row['utilization_percent'],
+        })
+    results.sort(key=lambda r: r["monthly_cost_saved"], reverse=True)
+    return results
@@ -0,0 +1,163 @@
+"""
+Owner spend aggregates
+Computes every software_licenses spend dimension (department, category, total)
+in one query and caches the result per owner until a license changes
+"""
+
+from collections import defaultdict
+
+from sqlalchemy import event, func, inspect, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from config import settings
+from models.models import SoftwareLicense
+from utils.cache import TTLCache
+
+# Owner id -> aggregates. Writes in this process invalidate on commit; the
+# TTL bounds staleness from other workers.
+spend_cache = TTLCache(maxsize=settings.SPEND_CACHE_SIZE, ttl=settings.SPEND_CACHE_TTL_SECONDS)
+
+DIMENSIONS = {
+    # dimension -> (column, label for NULL)
+    'department': (SoftwareLicense.department, 'Unassigned'),
+    'category': (SoftwareLicense.category, 'Other'),
+}
+
+MEASURES = (
+    ('monthly_cost', func.coalesce(func.sum(SoftwareLicense.monthly_cost), 0)),
+    ('annual_cost', func.coalesce(func.sum(SoftwareLicense.annual_cost), 0)),
+    ('software_count', func.count(SoftwareLicense.id)),
+    ('total_licenses', func.coalesce(func.sum(SoftwareLicense.total_licenses), 0)),
+    ('utilization_sum', func.coalesce(func.sum(SoftwareLicense.utilization_percent), 0)),
+    ('utilization_count', func.count(SoftwareLicense.utilization_percent)),
+)
+
+
+def _empty_measures():
+    return {name: 0 for name, _ in MEASURES}
+
+
+def _add_measures(target, values):
+    for name, _ in MEASURES:
+        target[name] += values[name] or 0
+
+
+def _grouping_sets_query(owner_id):
+    """Postgres: one GROUPING SETS pass; grouping() tells department rows from category rows"""
+    department, category = SoftwareLicense.department, SoftwareLicense.category
+    return select(
+        func.grouping(department, category).label('grouping'), department, category,
+        *[expression.label(name) for name, expression in MEASURES]
+    ).where(SoftwareLicense.owner_id == owner_id).group_by(
+        func.grouping_sets(tuple_(department), tuple_(category), tuple_())
+    )
+
+
+def _finest_grain_query(owner_id):
+    """Other dialects: group by (department, category) once and roll up in Python"""
+    department, category = SoftwareLicense.department, SoftwareLicense.category
+    return select(
+        literal(0).label('grouping'), department, category,
+        *[expression.label(name) for name, expression in MEASURES]
+    ).where(SoftwareLicense.owner_id == owner_id).group_by(department, category)
+
+
+def fold_spend_rows(rows, rolled_up):
+    """
+    Build the aggregates from query rows.
+
+    Args:
+        rows: Result mappings of either query
+        rolled_up (bool): Rows come from GROUPING SETS; grouping(department,
+            category) is 1 for department rows (category rolled up), 2 for
+            category rows and 3 for the total
+
+    Returns:
+        dict: {'department': {label: measures}, 'category': {...}, 'total': measures}
+    """
+    aggregates = {dimension: defaultdict(_empty_measures) for dimension in DIMENSIONS}
+    total = _empty_measures()
+    for row in rows:
+        if rolled_up:
+            targets = {1: ('department',), 2: ('category',)}.get(row['grouping'])
+            if targets is None:
+                _add_measures(total, row)
+                continue
+        else:
+            targets = tuple(DIMENSIONS)
+            _add_measures(total, row)
+        for dimension in targets:
+            column, null_label = DIMENSIONS[dimension]
+            # NULL and the fallback label are reported as one group
+            _add_measures(aggregates[dimension][row[column.key] or null_label], row)
+    return {**{dimension: dict(groups) for dimension, groups in aggregates.items()}, 'total': total}
+
+
+async def get_spend_aggregates(db: AsyncSession, owner_id: int) -> dict:
+    """Cached spend aggregates for an owner, computed in a single query on a miss"""
+    cached = spend_cache.get(owner_id)
+    if cached is not None:
+        return cached
+
+    rolled_up = db.get_bind().dialect.name == 'postgresql'
+    query = _grouping_sets_query(owner_id) if rolled_up else _finest_grain_query(owner_id)
+    result = await db.execute(query)
+    aggregates = fold_spend_rows(result.mappings(), rolled_up)
+    spend_cache.set(owner_id, aggregates)
+    return aggregates
+
+
+def average_utilization(measures):
+    count = measures['utilization_count']
+    return measures['utilization_sum'] / count if count else 0
+
+
+# ---------------------------------------------------------------------------
+# Invalidation
+# ---------------------------------------------------------------------------
+
+def mark_spend_changed(session, owner_ids):
+    """Invalidate these owners' aggregates when the session commits (None means everyone)"""
+    session.info.setdefault('spend_owners', set()).update(owner_ids)
+
+
+def _collect_changed_owners(session, flush_context):
+    """after_flush hook: remember owners whose licenses were written"""
+    owners = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, SoftwareLicense) and (obj in session.new or session.is_modified(obj)):
+            history = inspect(obj).attrs.owner_id.history
+            owners.update(owner_id for owner_id in history.deleted or () if owner_id is not None)
+            if obj.owner_id is not None:
+                owners.add(obj.owner_id)
+    for obj in session.deleted:
+        if not isinstance(obj, SoftwareLicense):
+            continue
+        values = inspect(obj).dict
+        if 'owner_id' not in values:
+            owners.add(None)  # an unloaded owner could be anyone
+        elif values['owner_id'] is not None:
+            owners.add(values['owner_id'])
+    if owners:
+        mark_spend_changed(session, owners)
+
+
+def _invalidate_on_commit(session):
+    owners = session.info.pop('spend_owners', None)
+    if not owners:
+        return
+    if None in owners:
+        spend_cache.invalidate_where(lambda owner_id, _: True)
+        return
+    for owner_id in owners:
+        spend_cache.invalidate(owner_id)
+
+
+def _discard_on_rollback(session, previous_transaction):
+    session.info.pop('spend_owners', None)
+
+
+event.listen(Session, "after_flush", _collect_changed_owners)
+event.listen(Session, "after_commit", _invalidate_on_commit)
+event.listen(Session, "after_soft_rollback", _discard_on_rollback)
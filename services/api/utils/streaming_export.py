@@ -0,0 +1,67 @@
+"""
+Streaming CSV/NDJSON export
+Reads query results through a server-side cursor in EXPORT_BATCH_ROWS batches
+and encodes each batch as it arrives, so the result set is never materialized
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import AsyncIterator, List, Optional
+
+from fastapi.responses import StreamingResponse
+
+from config import settings
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def _plain(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def encode_batch(rows, columns: List[str], fmt: str) -> bytes:
+    """Encode one batch of rows; CSV writes None as an empty cell"""
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(
+            ["" if value is None else _plain(value) for value in row] for row in rows
+        )
+        return buffer.getvalue().encode()
+    return "".join(
+        json.dumps({column: _plain(value) for column, value in zip(columns, row)}) + "\n"
+        for row in rows
+    ).encode()
+
+
+async def stream_rows(db, query, columns: List[str], fmt: str) -> AsyncIterator[bytes]:
+    """
+    Yield an encoded export of a column select, one cursor batch at a time.
+
+    The query should select plain columns rather than ORM entities so rows
+    are not tracked by the session while streaming.
+    """
+    if fmt == "csv":
+        yield encode_batch([columns], columns, fmt)
+    result = await db.stream(query.execution_options(yield_per=settings.EXPORT_BATCH_ROWS))
+    try:
+        async for batch in result.partitions():
+            yield encode_batch(batch, columns, fmt)
+    finally:
+        await result.close()
+
+
+def export_response(db, query, columns: List[str], fmt: Optional[str], filename: str) -> StreamingResponse:
+    """StreamingResponse for an export; the session must outlive the response"""
+    fmt = fmt or "csv"
+    return StreamingResponse(
+        stream_rows(db, query, columns, fmt),
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,208 @@
+"""
+Streaming CSV/NDJSON import
+Parses an upload as it arrives and validates and writes it in fixed-size
+chunks, so memory stays bounded whatever the file size
+"""
+
+import codecs
+import csv
+import json
+from typing import AsyncIterator, Callable, Optional, Tuple
+
+from config import settings
+from utils.bulk import insert_rows, supplied_values, upsert_rows, validate_rows
+
+IMPORT_FORMATS = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+}
+
+
+class ImportFormatError(ValueError):
+    """Raised when the upload cannot be parsed any further"""
+
+
+def detect_format(content_type: Optional[str], requested: Optional[str] = None) -> str:
+    """Pick csv or ndjson from an explicit format or the request Content-Type"""
+    if requested:
+        if requested not in ("csv", "ndjson"):
+            raise ImportFormatError("format must be 'csv' or 'ndjson'")
+        return requested
+    media_type = (content_type or "").split(";")[0].strip().lower()
+    if media_type not in IMPORT_FORMATS:
+        raise ImportFormatError("Send text/csv or application/x-ndjson, or pass format=csv|ndjson")
+    return IMPORT_FORMATS[media_type]
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream as UTF-8 (BOM tolerated) and yield lines without terminators"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        if len(pending) > settings.IMPORT_MAX_LINE_BYTES and "\n" not in pending:
+            raise ImportFormatError(f"Line longer than {settings.IMPORT_MAX_LINE_BYTES} bytes")
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, dict]]:
+    """
+    Yield (row number, {header: value}) for each CSV record.
+
+    Quoted fields may span lines: physical lines are joined until the quote
+    count is even. Empty cells become None so optional fields stay unset.
+    """
+    header = None
+    record, quotes, row_number = [], 0, 0
+    async for line in lines:
+        record.append(line)
+        quotes += line.count('"')
+        if quotes % 2:
+            if sum(len(part) for part in record) > settings.IMPORT_MAX_LINE_BYTES:
+                raise ImportFormatError("Unterminated quoted field")
+            continue
+        text = "\n".join(record)
+        record, quotes = [], 0
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        row_number += 1
+        if len(values) != len(header):
+            yield row_number, ValueError(f"row: expected {len(header)} columns, got {len(values)}")
+            continue
+        yield row_number, {name: (value if value != "" else None) for name, value in zip(header, values)}
+    if record:
+        raise ImportFormatError("Unterminated quoted field at end of file")
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, dict]]:
+    """Yield (row number, object) for each non-blank NDJSON line"""
+    row_number = 0
+    async for line in lines:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            value = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, ValueError(f"row: invalid JSON ({exc.msg})")
+            continue
+        if not isinstance(value, dict):
+            yield row_number, ValueError("row: expected a JSON object")
+            continue
+        yield row_number, value
+
+
+class ImportReport:
+    """Running totals plus an error list capped at IMPORT_MAX_ERRORS"""
+
+    def __init__(self):
+        self.processed = 0
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.superseded = 0
+        self.failed = 0
+        self.errors = []
+        self.errors_truncated = False
+        self.aborted = None
+
+    def add_errors(self, errors):
+        self.failed += len(errors)
+        room = settings.IMPORT_MAX_ERRORS - len(self.errors)
+        if len(errors) > room:
+            self.errors_truncated = True
+        self.errors.extend({"row": e["index"], "errors": e["errors"]} for e in errors[:max(room, 0)])
+
+    def as_dict(self):
+        return {
+            "processed": self.processed,
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "superseded": self.superseded,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.errors_truncated,
+            "aborted": self.aborted,
+        }
+
+
+async def import_stream(
+    db,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    model,
+    schema: type,
+    to_values: Callable,
+    key: Tuple[str, ...],
+    mode: str = "upsert",
+    update_values: Callable = supplied_values,
+    unique_key: Optional[str] = None
+) -> dict:
+    """
+    Import rows from a byte stream in chunks of IMPORT_CHUNK_ROWS.
+
+    Each chunk is validated, written (upserted on key, or inserted) and
+    committed before the next one is read, so at most one chunk is held in memory. New rows get
+    to_values; rows matching an existing one only get update_values, which
+    by default are the columns present in the file. New rows that collide
+    on unique_key are reported as errors. Row numbers in
+    the error report are 1-based data rows (the CSV header is not counted).
+    """
+    report = ImportReport()
+    parse = iter_csv_records if fmt == "csv" else iter_ndjson_records
+
+    async def flush(batch, parse_errors):
+        errors = list(parse_errors)
+        if batch:
+            numbers, rows = zip(*batch)
+            if mode == "upsert":
+                convert = lambda item: (to_values(item), update_values(item))
+            else:
+                convert = to_values
+            valid, invalid = validate_rows(list(rows), schema, convert)
+            # validate_rows numbers rows by position; map back to file row numbers
+            valid = [(numbers[index], values) for index, values in valid]
+            errors += [{**error, "index": numbers[error["index"]]} for error in invalid]
+            if mode == "upsert":
+                counts = await upsert_rows(db, model, valid, key, unique_key)
+                report.created += counts["created"]
+                report.updated += counts["updated"]
+                report.unchanged += counts["unchanged"]
+                report.superseded += counts["superseded"]
+                errors += counts["errors"]
+            else:
+                results = await insert_rows(db, model, valid, unique_key)
+                report.created += sum(1 for result in results if result["status"] == "created")
+                errors += [result for result in results if result["status"] == "error"]
+            await db.commit()
+        report.processed += len(batch) + len(parse_errors)
+        report.add_errors(sorted(errors, key=lambda error: error["index"]))
+
+    batch, parse_errors = [], []
+    try:
+        async for row_number, row in parse(iter_lines(chunks)):
+            if isinstance(row, Exception):
+                parse_errors.append({"index": row_number, "errors": [str(row)]})
+            else:
+                batch.append((row_number, row))
+            if len(batch) + len(parse_errors) >= settings.IMPORT_CHUNK_ROWS:
+                await flush(batch, parse_errors)
+                batch, parse_errors = [], []
+        await flush(batch, parse_errors)
+    except ImportFormatError as exc:
+        await db.rollback()
+        report.aborted = str(exc)
+    return report.as_dict()
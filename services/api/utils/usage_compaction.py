@@ -0,0 +1,163 @@
+"""
+License usage compaction
+Moves released seats idle past retention out of license_usage into
+license_usage_daily in batches, and reads usage across both tiers
+"""
+
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, delete, desc, func, insert, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import LicenseUsage, LicenseUsageDaily
+
+# A seat lives in exactly one tier: compaction moves it out of license_usage
+# and ingestion moves it back (with its hours) when the user logs in again.
+USAGE_COLUMNS = ('user_email', 'last_login', 'usage_hours', 'is_active')
+
+
+def _compactable(cutoff):
+    """Released seats whose last sign of use is older than cutoff"""
+    seen = func.coalesce(LicenseUsage.last_login, LicenseUsage.timestamp)
+    return (LicenseUsage.is_active == False) & (seen < cutoff) & LicenseUsage.user_email.isnot(None)
+
+
+def _add_to_daily(connection, rows):
+    """Upsert compacted rows: hours add up, the latest login wins"""
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        greatest = func.max if dialect == 'sqlite' else func.greatest
+        stmt = dialect_insert(LicenseUsageDaily)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LicenseUsageDaily.license_id, LicenseUsageDaily.user_email, LicenseUsageDaily.day],
+            set_={
+                'usage_hours': LicenseUsageDaily.usage_hours + stmt.excluded.usage_hours,
+                'last_login': func.coalesce(
+                    greatest(LicenseUsageDaily.last_login, stmt.excluded.last_login),
+                    LicenseUsageDaily.last_login, stmt.excluded.last_login
+                ),
+            }
+        )
+        connection.execute(stmt, rows)
+        return
+    for row in rows:
+        existing = connection.execute(select(LicenseUsageDaily).where(
+            LicenseUsageDaily.license_id == row['license_id'],
+            LicenseUsageDaily.user_email == row['user_email'],
+            LicenseUsageDaily.day == row['day']
+        )).scalar_one_or_none()
+        if existing is None:
+            connection.execute(insert(LicenseUsageDaily).values(**row))
+            continue
+        logins = [value for value in (existing.last_login, row['last_login']) if value is not None]
+        connection.execute(LicenseUsageDaily.__table__.update().where(
+            LicenseUsageDaily.license_id == row['license_id'],
+            LicenseUsageDaily.user_email == row['user_email'],
+            LicenseUsageDaily.day == row['day']
+        ).values(usage_hours=existing.usage_hours + row['usage_hours'], last_login=max(logins, default=None)))
+
+
+def compact_license_usage(engine, retention_days: int, batch_size: int, now=None) -> int:
+    """
+    Move compactable seats into license_usage_daily, one transaction per batch.
+
+    Only released seats (is_active false) are moved, so license counters and
+    stale-seat deactivation never need the second tier. Candidates are walked
+    in id order, so the whole job reads license_usage once.
+
+    Args:
+        engine: Blocking database engine
+        retention_days (int): Keep seats used within this many days
+        batch_size (int): Rows moved and deleted per transaction
+
+    Returns:
+        int: Rows compacted
+    """
+    cutoff = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    compacted, last_id = 0, 0
+    while True:
+        with engine.begin() as connection:
+            ids = connection.execute(
+                select(LicenseUsage.id).where(LicenseUsage.id > last_id, _compactable(cutoff))
+                .order_by(LicenseUsage.id).limit(batch_size)
+            ).scalars().all()
+            if not ids:
+                return compacted
+            # The DELETE re-checks the predicate, so a seat reactivated since the
+            # SELECT stays put, and only rows actually removed are archived
+            removed = connection.execute(delete(LicenseUsage).where(
+                LicenseUsage.id.in_(ids), _compactable(cutoff)
+            ).returning(
+                LicenseUsage.license_id, LicenseUsage.user_email, LicenseUsage.last_login,
+                LicenseUsage.usage_hours, LicenseUsage.timestamp
+            )).all()
+            if removed:
+                _add_to_daily(connection, [
+                    {'license_id': row.license_id, 'user_email': row.user_email,
+                     'day': (row.last_login or row.timestamp).date(), 'usage_hours': row.usage_hours or 0,
+                     'last_login': row.last_login, 'is_active': False}
+                    for row in removed
+                ])
+            compacted += len(removed)
+            last_id = ids[-1]
+
+
+# ---------------------------------------------------------------------------
+# Reads across both tiers
+# ---------------------------------------------------------------------------
+
+def license_seats(license_id, limit_by_login=None):
+    """
+    Seats of one license from both tiers, as a subquery with USAGE_COLUMNS.
+
+    Each branch is filtered by license_id so both reach their indexes; with
+    limit_by_login each branch is also cut to its most recent logins.
+    """
+    branches = []
+    for model in (LicenseUsage, LicenseUsageDaily):
+        query = select(*[getattr(model, column) for column in USAGE_COLUMNS]).where(
+            model.license_id == license_id
+        )
+        if limit_by_login is not None:
+            query = query.order_by(desc(model.last_login)).limit(limit_by_login)
+        branches.append(query.subquery().select() if limit_by_login is not None else query)
+    return union_all(*branches).subquery()
+
+
+async def get_recent_usage(db: AsyncSession, license_id: int, limit: int = 20) -> list:
+    """The most recent logins of a license across both tiers"""
+    seats = license_seats(license_id, limit_by_login=limit)
+    result = await db.execute(select(seats).order_by(desc(seats.c.last_login)).limit(limit))
+    return [dict(row) for row in result.mappings()]
+
+
+async def revive_compacted_seats(db: AsyncSession, keys) -> dict:
+    """
+    Take compacted seats back out of license_usage_daily.
+
+    Returns:
+        dict: (license_id, user_email) -> (usage hours, latest login) of the removed rows
+    """
+    if not keys:
+        return {}
+    emails = defaultdict(list)
+    for license_id, email in keys:
+        emails[license_id].append(email)
+    # One clause per license keeps each lookup on the primary key
+    result = await db.execute(delete(LicenseUsageDaily).where(or_(*[
+        and_(LicenseUsageDaily.license_id == license_id, LicenseUsageDaily.user_email.in_(license_emails))
+        for license_id, license_emails in emails.items()
+    ])).returning(LicenseUsageDaily.license_id, LicenseUsageDaily.user_email,
+                  LicenseUsageDaily.usage_hours, LicenseUsageDaily.last_login))
+    revived = {}
+    for license_id, email, hours, last_login in result:
+        total, latest = revived.get((license_id, email), (0.0, None))
+        if last_login is not None and (latest is None or last_login > latest):
+            latest = last_login
+        revived[(license_id, email)] = (total + (hours or 0), latest)
+    return revived
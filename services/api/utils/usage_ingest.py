@@ -0,0 +1,277 @@
+"""
+License usage event ingestion
+Buffers usage events in memory and writes them in bulk on a size or time
+trigger, moving seat counters by the seats each flush activates
+"""
+
+import asyncio
+import logging
+from collections import Counter, deque
+from typing import Dict, List, Tuple
+
+from sqlalchemy import bindparam, case, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from models.models import LicenseUsage
+from utils.activity_bitmaps import record_activity
+from utils.seat_counters import adjust_active_users
+from utils.usage_compaction import revive_compacted_seats
+
+logger = logging.getLogger(__name__)
+
+usage_table = LicenseUsage.__table__
+
+
+class IngestBufferFull(Exception):
+    """Raised when accepting a batch would take the buffer past its capacity"""
+
+
+def coalesce_events(events: List[dict]) -> Dict[Tuple[int, str], dict]:
+    """Fold events into one change per seat: the latest login and the summed hours"""
+    seats = {}
+    for event in events:
+        key = (event['license_id'], event['user_email'])
+        seat = seats.get(key)
+        if seat is None:
+            seats[key] = {'last_login': event['occurred_at'], 'usage_hours': event.get('usage_hours') or 0}
+            continue
+        seat['last_login'] = max(seat['last_login'], event['occurred_at'])
+        seat['usage_hours'] += event.get('usage_hours') or 0
+    return seats
+
+
+async def _seat_ids(db, keys):
+    """(license_id, user_email) -> id for the seats that already exist"""
+    result = await db.execute(
+        select(usage_table.c.license_id, usage_table.c.user_email, usage_table.c.id).where(
+            tuple_(usage_table.c.license_id, usage_table.c.user_email).in_(keys)
+        )
+    )
+    return {(license_id, email): seat_id for license_id, email, seat_id in result}
+
+
+async def _insert_new_seats(db, rows):
+    """Insert seats, skipping any another writer created first; returns the inserted keys"""
+    dialect = db.get_bind().dialect.name
+    if dialect not in ('sqlite', 'postgresql'):
+        await db.execute(insert(usage_table), rows)
+        return {(row['license_id'], row['user_email']) for row in rows}
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    stmt = dialect_insert(usage_table).on_conflict_do_nothing(
+        index_elements=[usage_table.c.license_id, usage_table.c.user_email]
+    ).returning(usage_table.c.license_id, usage_table.c.user_email)
+    result = await db.execute(stmt, rows)
+    return {tuple(row) for row in result}
+
+
+async def write_usage_events(db: AsyncSession, events: List[dict]) -> dict:
+    """
+    Apply usage events to license_usage in bulk and commit.
+
+    Unknown seats are inserted active (taking back any compacted history);
+    known seats move last_login forward and add usage_hours with one
+    executemany UPDATE. Inactive seats that log in again are reactivated by
+    an UPDATE that re-checks is_active, so each seat is counted once even
+    with several writers. active_users and utilization_percent move by the
+    seats gained rather than a recount, and each event sets its seat's bit
+    in the day's activity bitmap.
+
+    Args:
+        db: Database session
+        events (list): dicts with license_id, user_email, occurred_at and usage_hours
+
+    Returns:
+        dict: Events written, seats created and seats reactivated
+    """
+    seats = coalesce_events(events)
+    created, reactivated = Counter(), Counter()
+    items = list(seats.items())
+
+    for start in range(0, len(items), settings.BULK_BATCH_SIZE):
+        batch = dict(items[start:start + settings.BULK_BATCH_SIZE])
+        seat_ids = await _seat_ids(db, list(batch))
+
+        new_keys = [key for key in batch if key not in seat_ids]
+        if new_keys:
+            # Returning users get their compacted history back on the live seat
+            for key, (hours, last_login) in (await revive_compacted_seats(db, new_keys)).items():
+                batch[key]['usage_hours'] += hours
+                if last_login is not None and last_login > batch[key]['last_login']:
+                    batch[key]['last_login'] = last_login
+            inserted = await _insert_new_seats(db, [
+                {'license_id': license_id, 'user_email': email, 'is_active': True, **batch[(license_id, email)]}
+                for license_id, email in new_keys
+            ])
+            created.update(license_id for license_id, _ in inserted)
+            # Seats another writer created in the meantime are updated like known ones
+            raced = [key for key in new_keys if key not in inserted]
+            if raced:
+                seat_ids.update(await _seat_ids(db, raced))
+        if not seat_ids:
+            continue
+
+        result = await db.execute(
+            update(usage_table).where(usage_table.c.id.in_(list(seat_ids.values())), usage_table.c.is_active == False)
+            .values(is_active=True).returning(usage_table.c.license_id)
+        )
+        reactivated.update(result.scalars())
+
+        login = bindparam('b_login')
+        await db.execute(
+            update(usage_table).where(usage_table.c.id == bindparam('b_id')).values(
+                last_login=case(
+                    (or_(usage_table.c.last_login.is_(None), usage_table.c.last_login < login), login),
+                    else_=usage_table.c.last_login
+                ),
+                usage_hours=func.coalesce(usage_table.c.usage_hours, 0) + bindparam('b_hours')
+            ),
+            [
+                {'b_id': seat_id, 'b_login': batch[key]['last_login'], 'b_hours': batch[key]['usage_hours']}
+                for key, seat_id in seat_ids.items()
+            ]
+        )
+
+    await record_activity(db, events)
+    await adjust_active_users(db, created + reactivated)
+    await db.commit()
+    return {
+        'events': len(events),
+        'seats_created': sum(created.values()),
+        'seats_reactivated': sum(reactivated.values()),
+    }
+
+
+class UsageEventBuffer:
+    """
+    In-memory buffer of usage events with a size/time flush policy.
+
+    A background task writes the buffer once ``flush_events`` are waiting or
+    ``flush_interval`` seconds have passed. At most ``max_events`` are held;
+    submit() rejects a batch that does not fit with IngestBufferFull so
+    callers push back on connectors instead of growing memory. A failed
+    batch is retried on later flushes, ahead of newer events. After
+    ``max_attempts`` failures it is split in half so good events still get
+    through, and a single event that keeps failing is logged and moved to
+    ``dead_letter``, so one bad event never stalls the queue.
+    """
+
+    def __init__(self, session_factory, flush_events: int = 5000, flush_interval: float = 1.0,
+                 max_events: int = 100000, max_attempts: int = 3):
+        self.session_factory = session_factory
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self.max_events = max_events
+        self.max_attempts = max_attempts
+        self._pending: List[dict] = []
+        # (events, failed attempts) retried before _pending
+        self._retry: List[Tuple[List[dict], int]] = []
+        self.dead_letter = deque(maxlen=max_events)
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._stopping = False
+        self.accepted = 0
+        self.written = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    def _buffered(self) -> int:
+        return len(self._pending) + sum(len(batch) for batch, _ in self._retry)
+
+    def submit(self, events: List[dict]) -> int:
+        """Queue a batch (all or nothing) and return the number of buffered events"""
+        if self._buffered() + len(events) > self.max_events:
+            self.rejected += len(events)
+            raise IngestBufferFull("Usage event buffer is full")
+        self._pending.extend(events)
+        self.accepted += len(events)
+        if len(self._pending) >= self.flush_events:
+            self._wake.set()
+        return self._buffered()
+
+    def _failed(self, batch: List[dict], attempts: int) -> bool:
+        """Requeue, split or dead-letter a batch that failed; True to stop this flush"""
+        self.failed_flushes += 1
+        attempts += 1
+        if attempts < self.max_attempts:
+            self._retry.insert(0, (batch, attempts))
+            logger.exception("Usage event flush failed (attempt %d), %d events kept", attempts, self._buffered())
+            return True
+        if len(batch) > 1:
+            # Halves get one more try each, narrowing down the events that fail
+            half = len(batch) // 2
+            self._retry[:0] = [(batch[:half], self.max_attempts - 1), (batch[half:], self.max_attempts - 1)]
+            logger.exception("Usage event batch failed %d times, retrying it in halves", attempts)
+            return True
+        self.dead_letter.append(batch[0])
+        self.dead_lettered += 1
+        logger.exception("Usage event failed %d times, moved to dead letter: %r", attempts, batch[0])
+        return False
+
+    async def flush(self) -> int:
+        """Write every buffered event now; returns the number written"""
+        async with self._lock:
+            written = 0
+            while self._retry or self._pending:
+                if self._retry:
+                    batch, attempts = self._retry.pop(0)
+                else:
+                    batch, attempts = self._pending[:self.flush_events], 0
+                    del self._pending[:len(batch)]
+                try:
+                    async with self.session_factory() as db:
+                        await write_usage_events(db, batch)
+                except asyncio.CancelledError:
+                    self._retry.insert(0, (batch, attempts))
+                    raise
+                except Exception:
+                    if self._failed(batch, attempts):
+                        break
+                    continue
+                written += len(batch)
+                self.written += len(batch)
+            return written
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._task is None or self._task.done():
+            # asyncio primitives bind to the loop that first waits on them
+            self._lock = asyncio.Lock()
+            self._wake = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Let the flusher finish its current write, then write whatever is still buffered"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> dict:
+        """Return buffer depth and throughput counters"""
+        return {
+            "buffered": self._buffered(),
+            "max_events": self.max_events,
+            "accepted": self.accepted,
+            "written": self.written,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+            "dead_lettered": self.dead_lettered
+        }
@@ -0,0 +1,104 @@
+"""
+License usage statistics
+Seat counts and usage-hour percentiles over every seat of a license (live
+and compacted), computed in SQL so the cost does not grow with rows sent to Python
+"""
+
+import math
+from datetime import datetime
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import LicenseUsage, LicenseUsageDaily
+from utils.usage_compaction import license_seats
+
+USAGE_PERCENTILES = (50, 90, 99)
+
+
+def _interpolation_ranks(count, pct):
+    """1-based ranks around a percentile and the weight of the upper one (as percentile_cont)"""
+    position = pct / 100 * (count - 1)
+    lower = math.floor(position)
+    return lower + 1, math.ceil(position) + 1, position - lower
+
+
+def _tier_counts(model, license_id, inactive_before):
+    """Seat counts and hour totals of one tier, answered from its license_id index"""
+    return select(
+        func.count().label('tracked_users'),
+        func.coalesce(func.sum(case((model.is_active == True, 1), else_=0)), 0).label('active_seats'),
+        func.coalesce(func.sum(case(
+            (and_(model.is_active == True, model.last_login < inactive_before), 1), else_=0
+        )), 0).label('inactive_users'),
+        func.coalesce(func.sum(case((model.last_login >= inactive_before, 1), else_=0)), 0)
+            .label('recently_active_users'),
+        func.coalesce(func.sum(model.usage_hours), 0).label('hours_sum'),
+        func.count(model.usage_hours).label('hours_count'),
+    ).where(model.license_id == license_id)
+
+
+async def get_usage_stats(db: AsyncSession, license_id: int, inactive_before: datetime) -> dict:
+    """
+    Seat counts and usage-hour statistics for one license.
+
+    Counts are one aggregate per tier (live and compacted seats), each
+    answered from its license_id index. Percentiles need both tiers in one
+    ordering, so they read the union only when the license has compacted
+    seats: percentile_cont on Postgres; elsewhere usage_hours is ranked with
+    row_number() and only the rows at the interpolation ranks are fetched.
+
+    Args:
+        db: Database session
+        license_id (int): License to summarise
+        inactive_before (datetime): Active seats with an older last login count as inactive
+
+    Returns:
+        dict: tracked_users, active_seats, inactive_users, recently_active_users,
+        avg_usage_hours and usage_hours_percentiles ({'p50': ...}; None without data)
+    """
+    stats = dict.fromkeys(('tracked_users', 'active_seats', 'inactive_users', 'recently_active_users',
+                           'hours_sum', 'hours_count'), 0)
+    compacted = 0
+    for model in (LicenseUsage, LicenseUsageDaily):
+        row = (await db.execute(_tier_counts(model, license_id, inactive_before))).mappings().one()
+        for key in stats:
+            stats[key] += row[key] or 0
+        if model is LicenseUsageDaily:
+            compacted = row['tracked_users']
+
+    hours_sum, hours_count = stats.pop('hours_sum'), stats.pop('hours_count')
+    stats['avg_usage_hours'] = hours_sum / hours_count if hours_count else None
+    if compacted:
+        hours, filters = license_seats(license_id).c.usage_hours, []
+    else:
+        # Straight off the (license_id, usage_hours) index, already in order
+        hours, filters = LicenseUsage.usage_hours, [LicenseUsage.license_id == license_id]
+    stats['usage_hours_percentiles'] = await _percentiles(db, hours, filters, hours_count)
+    return stats
+
+
+async def _percentiles(db, hours, filters, count):
+    """USAGE_PERCENTILES of a usage_hours column holding count non-null values"""
+    if not count:
+        return {f'p{pct}': None for pct in USAGE_PERCENTILES}
+    if db.get_bind().dialect.name == 'postgresql':
+        row = (await db.execute(select(*[
+            func.percentile_cont(pct / 100).within_group(hours).label(f'p{pct}')
+            for pct in USAGE_PERCENTILES
+        ]).where(*filters))).mappings().one()
+        return {f'p{pct}': row[f'p{pct}'] for pct in USAGE_PERCENTILES}
+
+    bounds = {pct: _interpolation_ranks(count, pct) for pct in USAGE_PERCENTILES}
+    ranks = sorted({rank for lower, upper, _ in bounds.values() for rank in (lower, upper)})
+    ranked = select(
+        hours.label('usage_hours'),
+        func.row_number().over(order_by=hours).label('rank')
+    ).where(*filters, hours.isnot(None)).subquery()
+    result = await db.execute(select(ranked.c.rank, ranked.c.usage_hours).where(ranked.c.rank.in_(ranks)))
+    values = dict(result.all())
+
+    return {
+        f'p{pct}': values[lower] + (values[upper] - values[lower]) * weight
+        for pct, (lower, upper, weight) in bounds.items()
+    }
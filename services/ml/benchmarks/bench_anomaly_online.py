@@ -0,0 +1,57 @@
+"""
+Benchmark: cost anomaly scoring, full-history detect() vs stateful observe()
+Times one new observation per call against series of each history length:
+detect() recomputes over the list the caller ships, observe() updates the
+stored running statistics (SQLite read + write included).
+
+Usage: python benchmarks/bench_anomaly_online.py [--history 30 365 3650] [--repeat 200]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.anomaly_detector import AnomalyDetector
+from models.online_stats import SeriesStateStore
+
+
+def median_us(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1e6)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--history", type=int, nargs="+", default=[30, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    detector = AnomalyDetector(state_store=SeriesStateStore(os.path.join(tempfile.mkdtemp(), "bench.db")))
+    rng = np.random.RandomState(7)
+    for length in args.history:
+        history = list(rng.normal(2500, 100, length))
+        payload = json.dumps({"cost_history": history, "current_cost": 2600})
+        key = f"bench:{length}"
+        detector.observe(key, history[-1], cost_history=history[:-1])
+
+        batch = median_us(lambda: detector.detect(history, 2600), args.repeat)
+        online = median_us(lambda: detector.observe(key, 2600), args.repeat)
+        print(f"history {length:>6}  detect(): {batch:9.1f} us  observe(): {online:8.1f} us  "
+              f"request body {len(payload):>7,} B -> {len(json.dumps({'current_cost': 2600})):,} B")
+
+
+if __name__ == "__main__":
+    main()
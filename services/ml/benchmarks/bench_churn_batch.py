@@ -0,0 +1,74 @@
+"""
+Benchmark: churn scoring throughput, one client at a time vs predict_batch
+Scores the same synthetic clients with a predict() loop and with
+predict_batch() at each batch size and reports rows/sec.
+
+Usage: python benchmarks/bench_churn_batch.py [--batch-sizes 1 100 10000] [--rows 10000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.churn_predictor import ChurnPredictor
+from models.model_registry import ModelRegistry
+from train_models import train_churn_model
+
+
+def make_clients(rows):
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    return [
+        {
+            "contract_value": rng.uniform(5000, 100000),
+            "monthly_spend": rng.uniform(100, 8000),
+            "total_licenses": rng.randint(10, 500),
+            "total_users": rng.randint(5, 600),
+            "last_support_ticket": (now - timedelta(days=rng.randint(0, 200))).isoformat(),
+            "support_ticket_frequency": rng.random(),
+            "payment_history_score": rng.random(),
+            "created_at": (now - timedelta(days=rng.randint(30, 2000))).isoformat(),
+            "engagement_score": rng.random(),
+        }
+        for _ in range(rows)
+    ]
+
+
+def rows_per_sec(fn, clients, batch_size):
+    t0 = time.perf_counter()
+    for start in range(0, len(clients), batch_size):
+        fn(clients[start:start + batch_size])
+    return len(clients) / (time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 10000])
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    # Train into a scratch registry instead of trained_models/
+    registry = ModelRegistry(tempfile.mkdtemp())
+    with redirect_stdout(open(os.devnull, "w")):
+        train_churn_model(registry)
+    predictor = ChurnPredictor(registry=registry, fallback=False)
+    clients = make_clients(args.rows)
+
+    # The per-client loop does not depend on batch size, so time it once
+    loop_rate = rows_per_sec(lambda batch: [predictor.predict(c) for c in batch], clients, 1)
+    print(f"{'predict() loop':>22}: {loop_rate:12,.0f} rows/sec")
+    for batch_size in args.batch_sizes:
+        rate = rows_per_sec(predictor.predict_batch, clients, batch_size)
+        print(f"{'predict_batch(' + str(batch_size) + ')':>22}: {rate:12,.0f} rows/sec  ({rate / loop_rate:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
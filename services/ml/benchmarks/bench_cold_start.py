@@ -0,0 +1,63 @@
+"""
+Benchmark: ML service cold start with a prebuilt artifact vs the fallback model
+Starts fresh interpreters that import main.py and serve one churn prediction,
+and reports the median import, model load and first-prediction times.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from models.model_registry import ModelRegistry
+
+# Runs in the child interpreter; prints main.startup_report() after one prediction
+CHILD = """
+import json, main
+main.churn_predictor.predict({"contract_value": 25000, "engagement_score": 0.4})
+print(json.dumps(main.startup_report()))
+"""
+
+
+def cold_start(registry_dir, policy):
+    env = dict(os.environ, MODEL_REGISTRY_DIR=registry_dir, MODEL_MISSING_POLICY=policy,
+               ANOMALY_STATE_PATH=os.path.join(registry_dir, "anomaly_series.db"))
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", CHILD], cwd=SERVICE_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    report = json.loads(out.strip().splitlines()[-1])
+    report["process_ms"] = (time.perf_counter() - t0) * 1000
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    from train_models import train_churn_model
+    built = tempfile.mkdtemp()
+    with redirect_stdout(open(os.devnull, "w")):
+        train_churn_model(ModelRegistry(built))
+
+    for label, registry_dir, policy in (("prebuilt artifact", built, "fail"),
+                                        ("fallback model", tempfile.mkdtemp(), "fallback")):
+        reports = [cold_start(registry_dir, policy) for _ in range(args.runs)]
+        medians = {key: statistics.median(r[key] for r in reports)
+                   for key in ("import_ms", "model_load_ms", "first_prediction_ms", "process_ms")}
+        print(f"{label:>18} ({reports[0]['model_version']}): "
+              + "  ".join(f"{key[:-3]}: {ms:8.1f} ms" for key, ms in medians.items()))
+
+
+if __name__ == "__main__":
+    main()
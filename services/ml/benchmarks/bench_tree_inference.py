@@ -0,0 +1,68 @@
+"""
+Benchmark: churn model latency, sklearn predict_proba vs flattened NumPy trees
+Times the model call alone at each batch size, then a full single-client
+ChurnPredictor.predict() per backend.
+
+Usage: python benchmarks/bench_tree_inference.py [--batch-sizes 1 10000] [--repeat 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.churn_predictor import ChurnPredictor
+from models.model_registry import ModelRegistry
+from models.tree_inference import FlattenedTreeEnsemble
+from train_models import train_churn_model
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10000])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(tempfile.mkdtemp())
+    with redirect_stdout(open(os.devnull, "w")):
+        train_churn_model(registry)
+    artifact = registry.load(ChurnPredictor.MODEL_NAME)
+    model, scaler = artifact["model"], artifact["scaler"]
+    flattened = FlattenedTreeEnsemble.from_gradient_boosting(model)
+
+    rng = np.random.RandomState(7)
+    for batch_size in args.batch_sizes:
+        X = scaler.transform(rng.randn(batch_size, len(artifact["manifest"]["feature_names"])))
+        max_diff = np.abs(flattened.predict_proba(X) - model.predict_proba(X)).max()
+        sk = median_ms(lambda: model.predict_proba(X), args.repeat)
+        flat = median_ms(lambda: flattened.predict_proba(X), args.repeat)
+        print(f"batch {batch_size:>6}  sklearn: {sk:9.3f} ms  numpy: {flat:9.3f} ms  "
+              f"({sk / flat:5.1f}x, max |diff| {max_diff:.1e})")
+
+    client = {"contract_value": 25000, "monthly_spend": 900, "engagement_score": 0.3,
+              "last_support_ticket": "2024-08-01"}
+    for backend in ChurnPredictor.BACKENDS:
+        predictor = ChurnPredictor(registry=registry, fallback=False, backend=backend)
+        predictor.predict(client)
+        print(f"predict() backend={backend:<8} {median_ms(lambda: predictor.predict(client), args.repeat):9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ PulseOps AI - ML Service
 Machine learning models for predictions and recommendations
 """
 
+import time
+_import_started = time.perf_counter()
+
 from flask import Flask, request, jsonify
 from flask_restful import Api, Resource
 import joblib
@@ -13,18 +16,52 @@ from models.churn_predictor import ChurnPredictor
 from models.anomaly_detector import AnomalyDetector
 from models.recommendation_engine import RecommendationEngine
 from models.health_score_calculator import HealthScoreCalculator
+from models.model_registry import ModelNotFoundError
+from models.online_stats import state_store_from_env
 from utils.feature_engineering import FeatureEngineer
 
 app = Flask(__name__)
 api = Api(app)
 
-# Initialize ML models
-churn_predictor = ChurnPredictor()
-anomaly_detector = AnomalyDetector()
+# Largest client list accepted by /api/predict/churn/batch
+CHURN_BATCH_MAX_ROWS = int(os.getenv('CHURN_BATCH_MAX_ROWS', '10000'))
+
+# What to do when no churn model is registered: "fail" refuses to start,
+# "fallback" serves the rule-based model. Training only runs offline
+# (train_models.py), never at startup. "fail" also refuses to start without
+# a durable anomaly state store.
+MODEL_MISSING_POLICY = os.getenv('MODEL_MISSING_POLICY', 'fallback')
+
+# Churn inference backend: "sklearn", "numpy" (flattened trees) or "auto"
+CHURN_BACKEND = os.getenv('CHURN_BACKEND', 'auto')
+
+# Initialize ML models (the churn model itself loads on first prediction)
+churn_predictor = ChurnPredictor(fallback=MODEL_MISSING_POLICY != 'fail', backend=CHURN_BACKEND)
+if MODEL_MISSING_POLICY == 'fail':
+    churn_predictor.check_available()
+anomaly_detector = AnomalyDetector(
+    state_store=state_store_from_env(require_durable=MODEL_MISSING_POLICY == 'fail')
+)
 recommendation_engine = RecommendationEngine()
 health_calculator = HealthScoreCalculator()
 feature_engineer = FeatureEngineer()
 
+# Registry-backed models, by registry name (served by /api/models/<name>)
+served_models = {ChurnPredictor.MODEL_NAME: churn_predictor}
+
+import_ms = (time.perf_counter() - _import_started) * 1000
+
+def startup_report():
+    """Cold-start breakdown: module import, churn model load and first prediction (ms)"""
+    return {
+        "import_ms": import_ms,
+        "model_load_ms": churn_predictor.load_ms,
+        "first_prediction_ms": churn_predictor.first_prediction_ms,
+        "model_version": churn_predictor.version,
+        "model_missing_policy": MODEL_MISSING_POLICY,
+        "churn_backend": CHURN_BACKEND
+    }
+
 @app.route('/')
 def home():
     return jsonify({
@@ -41,7 +78,11 @@ def home():
 
 @app.route('/health')
 def health_check():
-    return jsonify({"status": "healthy", "timestamp": datetime.utcnow().isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.utcnow().isoformat(),
+        "startup": startup_report()
+    })
 
 class ChurnPrediction(Resource):
     def post(self):
@@ -64,6 +105,35 @@ class ChurnPrediction(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class ChurnBatchPrediction(Resource):
+    def post(self):
+        """Predict churn probability for a list of clients in one model call"""
+        try:
+            data = request.get_json()
+            clients = data.get("clients", []) if isinstance(data, dict) else data
+            if len(clients) > CHURN_BATCH_MAX_ROWS:
+                return {"error": f"At most {CHURN_BATCH_MAX_ROWS} clients per batch"}, 413
+            
+            # Same features as /api/predict/churn, scored together
+            features = [feature_engineer.extract_client_features(client) for client in clients]
+            results = churn_predictor.predict_batch(features)
+            
+            return {
+                "predictions": [
+                    {
+                        "client_id": client.get("client_id"),
+                        "churn_probability": result["probability"],
+                        "churn_risk": result["risk_level"],
+                        "risk_factors": result["factors"],
+                        "recommendations": result["recommendations"]
+                    }
+                    for client, result in zip(clients, results)
+                ],
+                "count": len(results)
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class AnomalyDetection(Resource):
     def post(self):
         """Detect cost anomalies in software spending"""
@@ -90,6 +160,38 @@ class AnomalyDetection(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class AnomalyObservation(Resource):
+    def post(self):
+        """Score one new cost against its series' stored statistics and record it"""
+        try:
+            data = request.get_json()
+            
+            current_cost = data.get("current_cost")
+            software_name = data.get("software_name")
+            if current_cost is None or not software_name:
+                return {"error": "current_cost and software_name are required"}, 400
+            
+            # One series per owner and software
+            series_key = f"{data.get('owner_id', '')}:{software_name}"
+            result = anomaly_detector.observe(
+                series_key, float(current_cost), data.get("cost_history"), data.get("observation_id")
+            )
+            
+            return {
+                "is_anomaly": result["is_anomaly"],
+                "anomaly_score": result["score"],
+                "expected_cost": result["expected_cost"],
+                "actual_cost": current_cost,
+                "variance_percent": result["variance_percent"],
+                "severity": result["severity"],
+                "explanation": result["explanation"],
+                "statistics": result.get("statistics"),
+                "observations": result["observations"],
+                "duplicate": result["duplicate"]
+            }, 200
+        except Exception as e:
+            return {"error": str(e)}, 400
+
 class HealthScoreCalculation(Resource):
     def post(self):
         """Calculate client health score"""
@@ -103,7 +205,8 @@ class HealthScoreCalculation(Resource):
                 "health_score": result["overall_score"],
                 "factors": result["factor_scores"],
                 "trend": result["trend"],
-                "insights": result["insights"]
+                "insights": result["insights"],
+                "health_status": result["health_status"]
             }, 200
         except Exception as e:
             return {"error": str(e)}, 400
@@ -161,12 +264,36 @@ class UtilizationOptimization(Resource):
         except Exception as e:
             return {"error": str(e)}, 400
 
+class ModelMetadata(Resource):
+    def get(self, name):
+        """Live registry version of a model and the version this process serves"""
+        predictor = served_models.get(name)
+        if predictor is None:
+            return {"error": f"Unknown model: {name}"}, 404
+        
+        try:
+            live = predictor.registry.manifest(name)
+        except ModelNotFoundError:
+            live = None
+        
+        return {
+            "name": name,
+            "live_version": live["version"] if live else None,
+            "loaded_version": predictor.version,
+            "backend": predictor.backend,
+            "versions": predictor.registry.versions(name),
+            "manifest": live
+        }, 200
+
 # Register API endpoints
 api.add_resource(ChurnPrediction, '/api/predict/churn')
+api.add_resource(ChurnBatchPrediction, '/api/predict/churn/batch')
 api.add_resource(AnomalyDetection, '/api/detect/anomaly')
+api.add_resource(AnomalyObservation, '/api/detect/anomaly/observe')
 api.add_resource(HealthScoreCalculation, '/api/calculate/health-score')
 api.add_resource(RecommendationGeneration, '/api/generate/recommendations')
 api.add_resource(UtilizationOptimization, '/api/optimize/utilization')
+api.add_resource(ModelMetadata, '/api/models/<string:name>')
 
 # Lambda handler for AWS Lambda deployment
 def handler(event, context):
@@ -6,10 +6,12 @@ from .churn_predictor import ChurnPredictor
 from .anomaly_detector import AnomalyDetector
 from .recommendation_engine import RecommendationEngine
 from .health_score_calculator import HealthScoreCalculator
+from .model_registry import ModelRegistry
 
 __all__ = [
     'ChurnPredictor',
     'AnomalyDetector',
     'RecommendationEngine',
-    'HealthScoreCalculator'
+    'HealthScoreCalculator',
+    'ModelRegistry'
 ]
\ No newline at end of file
@@ -11,8 +11,13 @@ from scipy import stats
 import joblib
 import os
 
+from .online_stats import SeriesStats, SeriesStateStore
+
 class AnomalyDetector:
-    def __init__(self):
+    # Smoothing factor of the per-series EWMA kept by observe()
+    EWMA_ALPHA = 0.3
+
+    def __init__(self, state_store=None):
         self.model = IsolationForest(
             contamination=0.1,
             random_state=42,
@@ -20,6 +25,7 @@ class AnomalyDetector:
         )
         self.scaler = StandardScaler()
         self.trained = False
+        self.state_store = state_store or SeriesStateStore()
     
     def detect(self, historical_costs, current_cost):
         """
@@ -34,7 +40,9 @@ class AnomalyDetector:
         """
         if not historical_costs or len(historical_costs) < 3:
             # Not enough data for anomaly detection
-            return self._simple_threshold_check(historical_costs, current_cost)
+            return self._simple_threshold_check(
+                np.mean(historical_costs) if historical_costs else None, current_cost
+            )
         
         # Convert to numpy array
         costs = np.array(historical_costs)
@@ -44,12 +52,57 @@ class AnomalyDetector:
         std_cost = np.std(costs)
         median_cost = np.median(costs)
         
-        # Calculate expected cost using exponential moving average
-        alpha = 0.3
-        ema_cost = costs[-1]
-        for i in range(len(costs) - 2, -1, -1):
-            ema_cost = alpha * costs[i] + (1 - alpha) * ema_cost
+        return self._score(current_cost, mean_cost, std_cost, median_cost)
+    
+    def observe(self, series_key, current_cost, cost_history=None, observation_id=None):
+        """
+        Score a new cost against a series' running statistics, then add it
+        
+        The series state (count, Welford mean/variance, EWMA, P2 median) is
+        kept in the state store, so each call is an O(1) update-and-score
+        and callers send only the new observation. Scores match detect()
+        over the same history, except that the median is an estimate once a
+        series has more than five points. An observation_id (e.g. the billing
+        period) makes the call idempotent: a repeat of a recent id returns
+        the first result, marked duplicate, and leaves the series unchanged.
+        
+        Args:
+            series_key (str): Series identifier, e.g. "<owner_id>:<software_name>"
+            current_cost (float): New cost observation
+            cost_history (list): Optional backfill used only when the series is new
+            observation_id (str): Optional id of this observation
+            
+        Returns:
+            dict: detect() results plus the series key, its observation count
+            and whether the observation was a duplicate
+        """
+        def score_and_update(stats):
+            if stats is None:
+                stats = SeriesStats(alpha=self.EWMA_ALPHA)
+                for cost in cost_history or []:
+                    stats.update(cost)
+            elif observation_id is not None:
+                previous = stats.seen(observation_id)
+                if previous is not None:
+                    return stats, {**previous, "duplicate": True}
+            
+            if stats.count < 3:
+                result = self._simple_threshold_check(stats.mean if stats.count else None, current_cost)
+            else:
+                result = self._score(current_cost, stats.mean, stats.std, stats.median.value(), stats.ewma)
+            
+            stats.update(current_cost)
+            result["series_key"] = series_key
+            result["observations"] = stats.count
+            result["duplicate"] = False
+            if observation_id is not None:
+                stats.remember(observation_id, result)
+            return stats, result
         
+        return self.state_store.update(series_key, score_and_update)
+    
+    def _score(self, current_cost, mean_cost, std_cost, median_cost, ewma_cost=None):
+        """Z-score verdict for current_cost given the history's statistics"""
         # Use statistical approach for anomaly detection
         z_score = abs((current_cost - mean_cost) / std_cost) if std_cost > 0 else 0
         
@@ -79,24 +132,28 @@ class AnomalyDetector:
         # Calculate anomaly score (0-1, higher = more anomalous)
         anomaly_score = min(z_score / 5.0, 1.0)  # Normalize to 0-1
         
+        statistics = {
+            "mean": float(mean_cost),
+            "median": float(median_cost),
+            "std_dev": float(std_cost),
+            "z_score": float(z_score)
+        }
+        if ewma_cost is not None:
+            statistics["ewma"] = float(ewma_cost)
+        
         return {
-            "is_anomaly": is_anomaly,
+            "is_anomaly": bool(is_anomaly),
             "score": float(anomaly_score),
             "expected_cost": float(mean_cost),
             "variance_percent": float(variance_percent),
             "severity": severity,
             "explanation": explanation,
-            "statistics": {
-                "mean": float(mean_cost),
-                "median": float(median_cost),
-                "std_dev": float(std_cost),
-                "z_score": float(z_score)
-            }
+            "statistics": statistics
         }
     
-    def _simple_threshold_check(self, historical_costs, current_cost):
-        """Simple threshold-based check when insufficient data"""
-        if not historical_costs:
+    def _simple_threshold_check(self, mean_cost, current_cost):
+        """Simple threshold-based check when insufficient data (mean_cost is None without history)"""
+        if mean_cost is None:
             return {
                 "is_anomaly": False,
                 "score": 0.0,
@@ -106,7 +163,6 @@ class AnomalyDetector:
                 "explanation": "Insufficient historical data for anomaly detection"
             }
         
-        mean_cost = np.mean(historical_costs)
         variance_percent = ((current_cost - mean_cost) / mean_cost * 100) if mean_cost > 0 else 0
         
         is_anomaly = abs(variance_percent) > 30
@@ -7,73 +7,170 @@ import numpy as np
 import pandas as pd
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
 from sklearn.preprocessing import StandardScaler
-import joblib
-import os
+import logging
+import threading
+import time
 from datetime import datetime, timedelta
 
+from .model_registry import ModelRegistry, ModelNotFoundError
+from .tree_inference import FlattenedTreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+
+def risk_factor_masks(X):
+    """Boolean column per ChurnPredictor.RISK_FACTORS entry, same thresholds as _identify_risk_factors"""
+    return [
+        X[:, 4] > 60,
+        X[:, 5] > 0.5,
+        X[:, 1] < X[:, 0] * 0.05,
+        X[:, 8] < 0.5,
+    ]
+
+
+class RuleBasedChurnModel:
+    """
+    Training-free stand-in served when no churn model is registered
+    Scores raw features as a weighted sum of the risk-factor masks
+    """
+    WEIGHTS = np.array([0.25, 0.25, 0.2, 0.3])
+
+    def predict_proba(self, X):
+        probability = np.column_stack(risk_factor_masks(X)).astype(float) @ self.WEIGHTS
+        return np.column_stack([1 - probability, probability])
+
+
+class IdentityScaler:
+    """Pass-through scaler paired with RuleBasedChurnModel, which expects raw features"""
+
+    def transform(self, X):
+        return np.asarray(X, dtype=float)
+
+
 class ChurnPredictor:
-    def __init__(self):
-        self.model = None
-        self.scaler = StandardScaler()
+    # (factor, description template) in the order _identify_risk_factors reports them
+    RISK_FACTORS = [
+        ({"factor": "Low engagement", "severity": "high"}, "No support tickets in {days} days"),
+        ({"factor": "High support burden", "severity": "medium"}, "Above average support ticket frequency"),
+        ({"factor": "Underutilization", "severity": "medium"}, "Monthly spend much lower than contract value"),
+        ({"factor": "Declining engagement", "severity": "high"}, "User engagement trending downward"),
+    ]
+
+    MODEL_NAME = 'churn'
+
+    # Inference backends: sklearn's predict_proba, the flattened NumPy trees,
+    # or "auto" (NumPy up to NUMPY_BACKEND_MAX_ROWS rows, where sklearn's
+    # per-call overhead dominates; sklearn's compiled traversal beyond)
+    BACKENDS = ('sklearn', 'numpy', 'auto')
+    NUMPY_BACKEND_MAX_ROWS = 256
+
+    def __init__(self, registry=None, fallback=True, backend='sklearn'):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown churn backend {backend!r}, expected one of {self.BACKENDS}")
+        self.registry = registry or ModelRegistry()
+        self.fallback = fallback
+        self.backend = backend
         self.feature_names = [
             'contract_value', 'monthly_spend', 'total_licenses', 'total_users',
             'days_since_last_ticket', 'support_ticket_frequency',
             'payment_history_score', 'contract_age_days', 'engagement_score'
         ]
+        self.manifest = None
+        self._model = None
+        self._scaler = None
+        self._flattened = None
+        self._load_lock = threading.Lock()
+        self.load_ms = None
+        self.first_prediction_ms = None
+
+    @property
+    def model(self):
+        self._initialize_model()
+        return self._model
+
+    @property
+    def scaler(self):
         self._initialize_model()
+        return self._scaler
+
+    @property
+    def version(self):
+        """Registry version in use, or None until the first prediction loads it"""
+        return self.manifest['version'] if self.manifest else None
+
+    @staticmethod
+    def new_model():
+        """Untrained estimator with the production hyperparameters"""
+        return GradientBoostingClassifier(
+            n_estimators=100,
+            learning_rate=0.1,
+            max_depth=5,
+            random_state=42
+        )
     
+    def check_available(self):
+        """Manifest of the live churn model; raises ModelNotFoundError if none is registered"""
+        return self.registry.manifest(self.MODEL_NAME)
+
     def _initialize_model(self):
-        """Initialize or load the churn prediction model"""
-        model_path = os.path.join('trained_models', 'churn_model.pkl')
-        
-        if os.path.exists(model_path):
-            self.model = joblib.load(model_path)
-        else:
-            # Initialize a new model with default parameters
-            self.model = GradientBoostingClassifier(
-                n_estimators=100,
-                learning_rate=0.1,
-                max_depth=5,
-                random_state=42
-            )
-            # Train with synthetic data for demo
-            self._train_demo_model()
-    
-    def _train_demo_model(self):
-        """Train model with synthetic data for demonstration"""
-        # Generate synthetic training data
-        np.random.seed(42)
-        n_samples = 1000
-        
-        # Create features
-        X = np.random.randn(n_samples, len(self.feature_names))
-        
-        # Create target (churn) based on some rules
-        y = np.zeros(n_samples)
-        
-        # High churn probability if:
-        # - Low engagement score
-        # - High support ticket frequency
-        # - Old contract with declining spend
-        for i in range(n_samples):
-            score = 0
-            if X[i, 8] < -0.5:  # Low engagement
-                score += 0.3
-            if X[i, 5] > 0.5:  # High ticket frequency
-                score += 0.3
-            if X[i, 7] > 1.0 and X[i, 1] < 0:  # Old contract, low spend
-                score += 0.4
+        """Load the live churn model, scaler and schema from the registry on first use"""
+        if self.manifest is not None:
+            return
+        with self._load_lock:
+            if self.manifest is not None:
+                return
+            started = time.perf_counter()
+            try:
+                artifact = self.registry.load(self.MODEL_NAME)
+            except ModelNotFoundError:
+                # Models are built offline by train_models.py, never here
+                if not self.fallback:
+                    raise
+                logger.warning("No churn model registered in %s, serving the rule-based fallback",
+                               self.registry.root)
+                artifact = self._fallback_artifact()
             
-            y[i] = 1 if score > 0.5 else 0
-        
-        # Fit scaler and model
-        X_scaled = self.scaler.fit_transform(X)
-        self.model.fit(X_scaled, y)
-        
-        # Save model
-        os.makedirs('trained_models', exist_ok=True)
-        joblib.dump(self.model, os.path.join('trained_models', 'churn_model.pkl'))
-        joblib.dump(self.scaler, os.path.join('trained_models', 'churn_scaler.pkl'))
+            if artifact['manifest']['feature_names'] != self.feature_names:
+                raise ValueError(
+                    f"Churn model {artifact['manifest']['version']} was trained on "
+                    f"{artifact['manifest']['feature_names']}, expected {self.feature_names}"
+                )
+            self._model = artifact['model']
+            self._scaler = artifact['scaler']
+            if self.backend != 'sklearn' and isinstance(self._model, GradientBoostingClassifier):
+                self._flattened = FlattenedTreeEnsemble.from_gradient_boosting(self._model)
+            self.manifest = artifact['manifest']
+            self.load_ms = (time.perf_counter() - started) * 1000
+    
+    def _fallback_artifact(self):
+        """RuleBasedChurnModel dressed as a registry artifact"""
+        return {
+            'model': RuleBasedChurnModel(),
+            'scaler': IdentityScaler(),
+            'manifest': {
+                'name': self.MODEL_NAME,
+                'version': 'fallback',
+                'estimator': RuleBasedChurnModel.__name__,
+                'feature_names': list(self.feature_names),
+                'files': {},
+                'metrics': {},
+            }
+        }
+
+    def _score(self, X):
+        """Churn probability per row of unscaled features, under the configured backend"""
+        if self._flattened is not None and (self.backend == 'numpy' or len(X) <= self.NUMPY_BACKEND_MAX_ROWS):
+            if isinstance(self._scaler, StandardScaler) and self._scaler.with_mean and self._scaler.with_std:
+                # StandardScaler.transform's arithmetic without its input validation
+                X_scaled = (X - self._scaler.mean_) / self._scaler.scale_
+            else:
+                X_scaled = self._scaler.transform(X)
+            return self._flattened.predict_proba(X_scaled)[:, 1]
+        return self._model.predict_proba(self._scaler.transform(X))[:, 1]
+
+    def _record_first_prediction(self, started):
+        if self.first_prediction_ms is None:
+            self.first_prediction_ms = (time.perf_counter() - started) * 1000
     
     def predict(self, features):
         """
@@ -85,14 +182,14 @@ class ChurnPredictor:
         Returns:
             dict: Prediction results with probability and risk factors
         """
+        self._initialize_model()
+        started = time.perf_counter()
+        
         # Extract and prepare features
         X = self._prepare_features(features)
         
-        # Scale features
-        X_scaled = self.scaler.transform(X.reshape(1, -1))
-        
-        # Get prediction probability
-        churn_probability = self.model.predict_proba(X_scaled)[0][1]
+        # Scale features and get prediction probability
+        churn_probability = self._score(X.reshape(1, -1))[0]
         
         # Determine risk level
         if churn_probability < 0.3:
@@ -108,6 +205,7 @@ class ChurnPredictor:
         # Generate recommendations
         recommendations = self._generate_recommendations(risk_level, risk_factors)
         
+        self._record_first_prediction(started)
         return {
             "probability": float(churn_probability),
             "risk_level": risk_level,
@@ -115,6 +213,92 @@ class ChurnPredictor:
             "recommendations": recommendations
         }
     
+    def predict_batch(self, clients):
+        """
+        Predict churn probability for many clients at once
+
+        Feature preparation, scaling and predict_proba run once over the
+        whole matrix and risk factors come from column masks, so scoring
+        N clients costs one sklearn call instead of N.
+
+        Args:
+            clients (list | DataFrame | ndarray): Feature dicts, a DataFrame
+                with the same keys as columns, or a 2D array already in
+                feature_names order
+
+        Returns:
+            list: One result per client, shaped like predict()
+        """
+        self._initialize_model()
+        started = time.perf_counter()
+        X = self._prepare_batch(clients)
+        if len(X) == 0:
+            return []
+
+        probabilities = self._score(X)
+        risk_levels = np.select(
+            [probabilities < 0.3, probabilities < 0.6], ["low", "medium"], default="high"
+        )
+        masks = risk_factor_masks(X)
+
+        results = []
+        for i in range(len(X)):
+            risk_factors = [
+                {**factor, "description": description.format(days=int(X[i, 4]))}
+                for (factor, description), mask in zip(self.RISK_FACTORS, masks) if mask[i]
+            ]
+            results.append({
+                "probability": float(probabilities[i]),
+                "risk_level": str(risk_levels[i]),
+                "factors": risk_factors,
+                "recommendations": self._generate_recommendations(risk_levels[i], risk_factors)
+            })
+        self._record_first_prediction(started)
+        return results
+
+    def _prepare_batch(self, clients):
+        """Build the (n, 9) feature matrix for predict_batch"""
+        if isinstance(clients, np.ndarray) or (
+            isinstance(clients, (list, tuple)) and clients and not isinstance(clients[0], dict)
+        ):
+            X = np.asarray(clients, dtype=float)
+            if X.ndim != 2 or X.shape[1] != len(self.feature_names):
+                raise ValueError(f"Expected an (n, {len(self.feature_names)}) feature matrix")
+            return X
+
+        if not isinstance(clients, pd.DataFrame):
+            # Dicts go through predict()'s own preparation; building a
+            # DataFrame costs more than it saves for the request-sized lists
+            X = np.array([self._prepare_features(client) for client in clients], dtype=float)
+            return X.reshape(-1, len(self.feature_names))
+
+        df = clients
+        n = len(df)
+        now = pd.Timestamp.now('UTC')
+
+        def column(name, default):
+            if name not in df:
+                return np.full(n, default, dtype=float)
+            return pd.to_numeric(df[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+        def days_since(name, default):
+            if name not in df:
+                return np.full(n, default, dtype=float)
+            timestamps = pd.to_datetime(df[name], utc=True, errors='coerce', format='ISO8601')
+            return (now - timestamps).dt.days.fillna(default).to_numpy(dtype=float)
+
+        return np.column_stack([
+            column('contract_value', 10000),
+            column('monthly_spend', 2000),
+            column('total_licenses', 50),
+            column('total_users', 100),
+            days_since('last_support_ticket', 365),
+            column('support_ticket_frequency', 0.1),
+            column('payment_history_score', 0.8),
+            days_since('created_at', 0),
+            column('engagement_score', 0.7),
+        ])
+
     def _prepare_features(self, features):
         """Prepare features for prediction"""
         feature_values = []
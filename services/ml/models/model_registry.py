@@ -0,0 +1,177 @@
+"""
+Model Registry
+Versioned model artifacts (model, scaler and feature schema) with checksums
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime
+
+import joblib
+
+DEFAULT_REGISTRY_DIR = os.getenv(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'trained_models')
+)
+
+LIVE_POINTER = 'LIVE'
+MANIFEST_FILE = 'manifest.json'
+
+
+class ModelNotFoundError(LookupError):
+    """Raised when a model name or version has no artifacts in the registry"""
+
+
+class ArtifactChecksumError(ValueError):
+    """Raised when an artifact file does not match the checksum in its manifest"""
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """
+    File-based registry laid out as <root>/<name>/<version>/
+
+    Each version holds model.joblib, scaler.joblib and a manifest.json with
+    the feature schema and a sha256 per file; <root>/<name>/LIVE names the
+    version served. Artifacts are written uncompressed so load() can
+    memory-map their numpy arrays, letting workers share the pages.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or DEFAULT_REGISTRY_DIR
+
+    def register(self, name, model, scaler, feature_names, version=None, metrics=None, make_live=True):
+        """
+        Store a new version of a model and (by default) make it live
+
+        Args:
+            name (str): Model name, e.g. "churn"
+            model: Fitted estimator
+            scaler: Fitted scaler applied before the estimator
+            feature_names (list): Column order the model was trained on
+            version (str): Version label; defaults to a UTC timestamp
+            metrics (dict): Optional evaluation metrics kept in the manifest
+            make_live (bool): Point LIVE at the new version
+
+        Returns:
+            dict: The version's manifest
+        """
+        version = version or datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
+        version_dir = os.path.join(self.root, name, version)
+        if os.path.exists(version_dir):
+            raise ValueError(f"Model {name} version {version} already exists")
+        os.makedirs(version_dir)
+
+        files = {}
+        for role, obj in (('model', model), ('scaler', scaler)):
+            filename = f'{role}.joblib'
+            path = os.path.join(version_dir, filename)
+            joblib.dump(obj, path)
+            files[role] = {'path': filename, 'sha256': _sha256(path)}
+
+        manifest = {
+            'name': name,
+            'version': version,
+            'created_at': datetime.utcnow().isoformat(),
+            'estimator': type(model).__name__,
+            'feature_names': list(feature_names),
+            'files': files,
+            'metrics': metrics or {},
+        }
+        with open(os.path.join(version_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        if make_live:
+            self.set_live(name, version)
+        return manifest
+
+    def set_live(self, name, version):
+        """Point LIVE at an existing version (atomic rename)"""
+        if not os.path.exists(os.path.join(self.root, name, version, MANIFEST_FILE)):
+            raise ModelNotFoundError(f"Model {name} has no version {version}")
+        pointer = os.path.join(self.root, name, LIVE_POINTER)
+        with open(pointer + '.tmp', 'w') as f:
+            f.write(version)
+        os.replace(pointer + '.tmp', pointer)
+
+    def live_version(self, name):
+        """Version LIVE points at, or None when nothing is registered"""
+        try:
+            with open(os.path.join(self.root, name, LIVE_POINTER)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def versions(self, name):
+        """Every stored version of a model, oldest first"""
+        model_dir = os.path.join(self.root, name)
+        if not os.path.isdir(model_dir):
+            return []
+        manifests = [
+            self.manifest(name, entry) for entry in os.listdir(model_dir)
+            if os.path.exists(os.path.join(model_dir, entry, MANIFEST_FILE))
+        ]
+        return [m['version'] for m in sorted(manifests, key=lambda m: m['created_at'])]
+
+    def prune(self, name, keep=0):
+        """
+        Delete stored versions other than the live one
+
+        Args:
+            name (str): Model name
+            keep (int): Most recent non-live versions to keep as rollback targets
+
+        Returns:
+            list: The versions removed, oldest first
+        """
+        live = self.live_version(name)
+        others = [version for version in self.versions(name) if version != live]
+        removed = others[:max(len(others) - keep, 0)]
+        for version in removed:
+            shutil.rmtree(os.path.join(self.root, name, version))
+        return removed
+
+    def manifest(self, name, version=None):
+        """Manifest of a version (the live one by default)"""
+        version = version or self.live_version(name)
+        if version is None:
+            raise ModelNotFoundError(f"Model {name} has no live version")
+        try:
+            with open(os.path.join(self.root, name, version, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            raise ModelNotFoundError(f"Model {name} has no version {version}")
+
+    def load(self, name, version=None, mmap_mode='r'):
+        """
+        Verify and load a version's model and scaler
+
+        Args:
+            name (str): Model name
+            version (str): Version to load; the live one by default
+            mmap_mode (str): joblib mmap mode for numpy arrays (None reads them into memory)
+
+        Returns:
+            dict: model, scaler and manifest
+        """
+        manifest = self.manifest(name, version)
+        version_dir = os.path.join(self.root, name, manifest['version'])
+
+        loaded = {'manifest': manifest}
+        for role, entry in manifest['files'].items():
+            path = os.path.join(version_dir, entry['path'])
+            if _sha256(path) != entry['sha256']:
+                raise ArtifactChecksumError(
+                    f"{name} {manifest['version']} {entry['path']} does not match its checksum"
+                )
+            loaded[role] = joblib.load(path, mmap_mode=mmap_mode)
+        return loaded
@@ -0,0 +1,323 @@
+"""
+Online Statistics
+Constant-time running statistics for cost series (Welford mean/variance,
+EWMA and a P-squared median sketch) and the stores that keep them across
+restarts: a SQLite file for single-host runs, a DynamoDB table shared by
+every Lambda container
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+from datetime import datetime
+
+# Local development default: outside the source tree, but gone after a
+# reboot. Deployments set ANOMALY_STATE_TABLE (or a durable
+# ANOMALY_STATE_PATH); see state_store_from_env()
+DEFAULT_STATE_PATH = os.path.join(tempfile.gettempdir(), 'pulseops', 'anomaly_series.db')
+
+
+class StateStoreNotConfigured(RuntimeError):
+    """Raised when durable series state is required but no store is configured"""
+
+
+class P2Quantile:
+    """
+    P-squared streaming quantile estimate (Jain & Chlamtac, 1985)
+
+    Keeps five markers whatever the number of observations; exact for the
+    first five, an estimate after that.
+    """
+
+    def __init__(self, q=0.5, heights=None, positions=None, desired=None):
+        self.q = q
+        self.heights = heights or []
+        self.positions = positions or [0, 1, 2, 3, 4]
+        self.desired = desired or [0, 2 * q, 4 * q, 2 + 2 * q, 4]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def add(self, x):
+        h = self.heights
+        if len(h) < 5:
+            h.append(x)
+            h.sort()
+            return
+
+        if x < h[0]:
+            h[0] = x
+            k = 0
+        elif x >= h[4]:
+            h[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if h[i] <= x < h[i + 1])
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = h[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (h[i + 1] - h[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (h[i] - h[i - 1]) / (n[i] - n[i - 1])
+                )
+                if h[i - 1] < parabolic < h[i + 1]:
+                    h[i] = parabolic
+                else:
+                    h[i] = h[i] + d * (h[i + d] - h[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        """Current quantile estimate (None before the first observation)"""
+        h = self.heights
+        if not h:
+            return None
+        if len(h) < 5:
+            # Exact, interpolated like numpy
+            position = self.q * (len(h) - 1)
+            lower = int(position)
+            upper = min(lower + 1, len(h) - 1)
+            return h[lower] + (h[upper] - h[lower]) * (position - lower)
+        return h[2]
+
+    def to_dict(self):
+        return {"q": self.q, "heights": self.heights, "positions": self.positions, "desired": self.desired}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["q"], data["heights"], data["positions"], data["desired"])
+
+
+class SeriesStats:
+    """
+    Running statistics of one cost series, updated in O(1) per observation
+
+    Welford's algorithm gives the mean and population variance (what np.mean
+    and np.std return over the same values), alongside an EWMA and a P2
+    median. The results of the last RECENT_OBSERVATIONS identified
+    observations are kept so a retried one can be answered without counting
+    it twice. Serialises to a small JSON-able dict.
+    """
+
+    RECENT_OBSERVATIONS = 32
+
+    def __init__(self, alpha=0.3, count=0, mean=0.0, m2=0.0, ewma=None, median=None, recent=None):
+        self.alpha = alpha
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+        self.ewma = ewma
+        self.median = median or P2Quantile(0.5)
+        # [observation id, result] pairs, oldest first
+        self.recent = recent or []
+
+    def update(self, x):
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.ewma = x if self.ewma is None else self.alpha * x + (1 - self.alpha) * self.ewma
+        self.median.add(x)
+
+    @property
+    def std(self):
+        return (self.m2 / self.count) ** 0.5 if self.count else 0.0
+
+    def seen(self, observation_id):
+        """Result recorded for an observation id, or None if it is new"""
+        for recorded_id, result in self.recent:
+            if recorded_id == observation_id:
+                return result
+        return None
+
+    def remember(self, observation_id, result):
+        self.recent.append([observation_id, result])
+        del self.recent[:-self.RECENT_OBSERVATIONS]
+
+    def to_dict(self):
+        return {
+            "alpha": self.alpha,
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "ewma": self.ewma,
+            "median": self.median.to_dict(),
+            "recent": self.recent,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["alpha"], data["count"], data["mean"], data["m2"], data["ewma"],
+                   P2Quantile.from_dict(data["median"]), data.get("recent"))
+
+
+class SeriesStateStore:
+    """
+    SeriesStats per series key in a SQLite file
+
+    Each thread keeps one connection. update() reads, changes and writes one
+    row inside BEGIN IMMEDIATE, so several workers sharing the file never
+    lose an observation.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv('ANOMALY_STATE_PATH') or DEFAULT_STATE_PATH
+        self._local = threading.local()
+
+    def _connect(self):
+        """This thread's connection, opened (and the table created) on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # WAL commits without an fsync per transaction; survives process
+            # crashes, and at worst drops the last commits on power loss
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS anomaly_series ("
+                "series_key TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at TEXT NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, series_key):
+        """SeriesStats for a key, or None if it has never been observed"""
+        row = self._connect().execute(
+            "SELECT state FROM anomaly_series WHERE series_key = ?", (series_key,)
+        ).fetchone()
+        return SeriesStats.from_dict(json.loads(row[0])) if row else None
+
+    def update(self, series_key, fn):
+        """
+        Apply fn(stats) to a series' state and save it, atomically
+
+        Args:
+            series_key (str): Series identifier
+            fn (callable): Receives the stored SeriesStats (None if new) and
+                returns (stats to save, result to hand back)
+
+        Returns:
+            The result returned by fn
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT state FROM anomaly_series WHERE series_key = ?", (series_key,)
+            ).fetchone()
+            stats, result = fn(SeriesStats.from_dict(json.loads(row[0])) if row else None)
+            conn.execute(
+                "INSERT INTO anomaly_series (series_key, state, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (series_key) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+                (series_key, json.dumps(stats.to_dict()), datetime.utcnow().isoformat())
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+
+class DynamoSeriesStateStore:
+    """
+    SeriesStats per series key in a DynamoDB table (hash key series_key)
+
+    State is shared by every container and survives cold starts. update()
+    is optimistic: each item carries a version and the write is
+    conditional on it, so a concurrent writer makes the loser re-read and
+    re-apply instead of overwriting the other's observation.
+    """
+
+    MAX_ATTEMPTS = 10
+
+    def __init__(self, table_name, client=None):
+        if client is None:
+            import boto3
+            client = boto3.client('dynamodb')
+        self.table_name = table_name
+        self.client = client
+
+    def _read(self, series_key):
+        item = self.client.get_item(
+            TableName=self.table_name, Key={'series_key': {'S': series_key}}, ConsistentRead=True
+        ).get('Item')
+        if item is None:
+            return None, 0
+        return SeriesStats.from_dict(json.loads(item['state']['S'])), int(item['version']['N'])
+
+    def get(self, series_key):
+        """SeriesStats for a key, or None if it has never been observed"""
+        return self._read(series_key)[0]
+
+    def update(self, series_key, fn):
+        """
+        Apply fn(stats) to a series' state and save it, atomically
+
+        fn may run more than once when another writer gets in first; only
+        the result of the call whose write succeeded is returned.
+
+        Args:
+            series_key (str): Series identifier
+            fn (callable): Receives the stored SeriesStats (None if new) and
+                returns (stats to save, result to hand back)
+
+        Returns:
+            The result returned by fn
+        """
+        conflict = self.client.exceptions.ConditionalCheckFailedException
+        for _ in range(self.MAX_ATTEMPTS):
+            stored, version = self._read(series_key)
+            stats, result = fn(stored)
+            if stored is None:
+                condition = {'ConditionExpression': 'attribute_not_exists(series_key)'}
+            else:
+                condition = {
+                    'ConditionExpression': 'version = :version',
+                    'ExpressionAttributeValues': {':version': {'N': str(version)}},
+                }
+            try:
+                self.client.put_item(
+                    TableName=self.table_name,
+                    Item={
+                        'series_key': {'S': series_key},
+                        'state': {'S': json.dumps(stats.to_dict())},
+                        'version': {'N': str(version + 1)},
+                        'updated_at': {'S': datetime.utcnow().isoformat()},
+                    },
+                    **condition
+                )
+            except conflict:
+                continue
+            return result
+        raise RuntimeError(f"Series {series_key!r} kept changing; gave up after {self.MAX_ATTEMPTS} attempts")
+
+
+def state_store_from_env(require_durable=False):
+    """
+    Series state store configured by the environment
+
+    ANOMALY_STATE_TABLE selects the DynamoDB store, otherwise SQLite at
+    ANOMALY_STATE_PATH (DEFAULT_STATE_PATH when unset).
+
+    Raises:
+        StateStoreNotConfigured: require_durable is set and neither is
+        configured, so state would silently vanish with the temp dir
+    """
+    table_name = os.getenv('ANOMALY_STATE_TABLE')
+    if table_name:
+        return DynamoSeriesStateStore(table_name)
+    path = os.getenv('ANOMALY_STATE_PATH')
+    if require_durable and not path:
+        raise StateStoreNotConfigured(
+            "Set ANOMALY_STATE_TABLE or ANOMALY_STATE_PATH to keep anomaly series state across restarts"
+        )
+    return SeriesStateStore(path)
@@ -0,0 +1,107 @@
+"""
+Flattened Tree Inference
+Evaluates a fitted binary GradientBoostingClassifier from contiguous NumPy
+arrays, traversing every tree for every row at once
+"""
+
+import numpy as np
+from sklearn.ensemble import GradientBoostingClassifier
+
+
+class FlattenedTreeEnsemble:
+    """
+    Gradient boosted trees as flat node arrays
+
+    All trees share one set of node arrays with global node indices: feature,
+    threshold, value, and children holding node i's left and right child at
+    2i and 2i + 1. roots holds each tree's first node. Leaves point at
+    themselves, so every row takes max_depth steps and traversal is a fixed
+    sequence of array operations. Leaf values carry the learning rate, so the
+    raw score is init_score plus one sum per row.
+    """
+
+    # Rows evaluated together; keeps the (rows, trees) node matrix in cache
+    CHUNK_ROWS = 256
+
+    def __init__(self, feature, threshold, children, value, roots, init_score, max_depth):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.init_score = init_score
+        self.max_depth = max_depth
+
+    @classmethod
+    def from_gradient_boosting(cls, model):
+        """
+        Flatten a fitted binary GradientBoostingClassifier
+
+        Raises:
+            ValueError: For other estimators, multiclass or non log-loss models,
+            or a custom init estimator
+        """
+        if not isinstance(model, GradientBoostingClassifier):
+            raise ValueError(f"Cannot flatten {type(model).__name__}")
+        if len(model.classes_) != 2 or model.loss not in ('log_loss', 'deviance'):
+            raise ValueError("Only binary log-loss gradient boosting can be flattened")
+        if model.init not in (None, 'zero'):
+            raise ValueError("A custom init estimator has no constant raw score to flatten")
+
+        trees = [estimator[0].tree_ for estimator in model.estimators_]
+        offsets = np.concatenate([[0], np.cumsum([tree.node_count for tree in trees])[:-1]])
+
+        features, thresholds, children, values = [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.column_stack([
+                np.where(is_leaf, nodes, tree.children_left),
+                np.where(is_leaf, nodes, tree.children_right)
+            ]).ravel() + offset)
+            values.append(tree.value[:, 0, 0] * model.learning_rate)
+
+        # init_ is a prior (or zero), so its raw score is one constant:
+        # whatever the decision function holds beyond the trees
+        x0 = np.zeros((1, model.n_features_in_))
+        tree_sum = sum(estimator[0].predict(x0)[0] for estimator in model.estimators_)
+        init_score = float(model.decision_function(x0)[0] - model.learning_rate * tree_sum)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds), dtype=np.float64),
+            children=np.ascontiguousarray(np.concatenate(children), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+            roots=offsets.astype(np.intp),
+            init_score=init_score,
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    def _leaf_sum(self, X):
+        """Sum of leaf values over every tree for a float32 chunk of rows"""
+        n, n_features = X.shape
+        flat = X.ravel()
+        row_offsets = (np.arange(n) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots)))
+        for _ in range(self.max_depth):
+            # sklearn sends a row left when X <= threshold
+            go_right = flat[row_offsets + self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_right]
+        return self.value[nodes].sum(axis=1)
+
+    def decision_function(self, X):
+        """Raw log-odds per row"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) <= self.CHUNK_ROWS:
+            return self.init_score + self._leaf_sum(X)
+        return self.init_score + np.concatenate([
+            self._leaf_sum(X[start:start + self.CHUNK_ROWS]) for start in range(0, len(X), self.CHUNK_ROWS)
+        ])
+
+    def predict_proba(self, X):
+        """Class probabilities, shaped like GradientBoostingClassifier.predict_proba"""
+        probability = 1.0 / (1.0 + np.exp(-self.decision_function(X)))
+        return np.column_stack([1 - probability, probability])
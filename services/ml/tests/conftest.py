@@ -35,3 +35,20 @@ def sample_usage_data():
         {"usage_date": "2024-01-04", "active_users": 78},
         {"usage_date": "2024-01-05", "active_users": 150},  # Anomaly
     ]
+
+
+@pytest.fixture
+def model_registry(tmp_path):
+    """Empty model registry in a temporary directory"""
+    from models.model_registry import ModelRegistry
+    return ModelRegistry(str(tmp_path / "registry"))
+
+
+@pytest.fixture(scope="session")
+def churn_registry(tmp_path_factory):
+    """Registry holding a churn model built by the offline training step"""
+    from models.model_registry import ModelRegistry
+    from train_models import train_churn_model
+    registry = ModelRegistry(str(tmp_path_factory.mktemp("churn_registry")))
+    train_churn_model(registry)
+    return registry
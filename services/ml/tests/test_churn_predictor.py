@@ -67,3 +67,45 @@ def test_feature_importance():
         importances = predictor.model.feature_importances_
         assert len(importances) > 0
         assert all(0 <= imp <= 1 for imp in importances)
+
+
+def test_predict_batch_matches_predict(churn_registry):
+    """Test batch scoring returns the same result as scoring each client alone"""
+    predictor = ChurnPredictor(registry=churn_registry)
+    clients = [
+        {"contract_value": 25000, "monthly_spend": 2000, "engagement_score": 0.9,
+         "last_support_ticket": "2024-10-15", "created_at": "2023-01-01"},
+        {"contract_value": 50000, "monthly_spend": 500, "support_ticket_frequency": 0.9,
+         "engagement_score": 0.2},
+        {},
+    ]
+    
+    batch = predictor.predict_batch(clients)
+    
+    assert len(batch) == len(clients)
+    for client, result in zip(clients, batch):
+        single = predictor.predict(client)
+        assert result["probability"] == pytest.approx(single["probability"])
+        assert result["risk_level"] == single["risk_level"]
+        assert result["factors"] == single["factors"]
+        assert result["recommendations"] == single["recommendations"]
+
+
+def test_predict_batch_accepts_dataframe_and_matrix(churn_registry):
+    """Test DataFrame and 2D array inputs score like the equivalent dicts"""
+    import numpy as np
+    import pandas as pd
+    
+    predictor = ChurnPredictor(registry=churn_registry)
+    clients = [{"contract_value": 10000, "monthly_spend": 100}, {"engagement_score": 0.1}]
+    expected = predictor.predict_batch(clients)
+    
+    from_frame = predictor.predict_batch(pd.DataFrame(clients))
+    matrix = np.vstack([predictor._prepare_features(client) for client in clients])
+    from_matrix = predictor.predict_batch(matrix)
+    
+    assert [r["probability"] for r in from_frame] == pytest.approx([r["probability"] for r in expected])
+    assert [r["probability"] for r in from_matrix] == pytest.approx([r["probability"] for r in expected])
+    assert predictor.predict_batch([]) == []
+    with pytest.raises(ValueError):
+        predictor.predict_batch(np.zeros((2, 3)))
@@ -0,0 +1,132 @@
+"""
+Tests for the versioned model registry and lazy churn model loading
+"""
+import os
+from datetime import datetime
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import StandardScaler
+
+from models.churn_predictor import ChurnPredictor
+from models.model_registry import ArtifactChecksumError, ModelNotFoundError
+
+
+def _fitted(n_features=3):
+    X = np.random.RandomState(0).randn(50, n_features)
+    y = (X[:, 0] > 0).astype(int)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(scaler.transform(X), y)
+    return model, scaler
+
+
+def test_register_and_load_live_version(model_registry):
+    """Test the latest registered version is live and loads with its scaler and schema"""
+    model, scaler = _fitted()
+    model_registry.register("demo", model, scaler, ["a", "b", "c"], version="v1")
+    model_registry.register("demo", model, scaler, ["a", "b", "c"], version="v2", metrics={"accuracy": 0.9})
+    
+    assert model_registry.versions("demo") == ["v1", "v2"]
+    assert model_registry.live_version("demo") == "v2"
+    
+    artifact = model_registry.load("demo")
+    assert artifact["manifest"]["version"] == "v2"
+    assert artifact["manifest"]["feature_names"] == ["a", "b", "c"]
+    assert artifact["manifest"]["metrics"] == {"accuracy": 0.9}
+    assert np.allclose(artifact["scaler"].mean_, scaler.mean_)
+    
+    model_registry.set_live("demo", "v1")
+    assert model_registry.load("demo")["manifest"]["version"] == "v1"
+
+
+def test_prune_keeps_live_version(model_registry):
+    """Test pruning deletes old versions but never the live one"""
+    model, scaler = _fitted()
+    for version in ("v1", "v2", "v3", "v4"):
+        model_registry.register("demo", model, scaler, ["a", "b", "c"], version=version)
+    model_registry.set_live("demo", "v2")
+    
+    assert model_registry.prune("demo", keep=1) == ["v1", "v3"]
+    assert model_registry.versions("demo") == ["v2", "v4"]
+    assert model_registry.prune("demo") == ["v4"]
+    assert model_registry.load("demo")["manifest"]["version"] == "v2"
+
+
+def test_load_memory_maps_arrays(model_registry):
+    """Test numpy arrays inside artifacts come back memory-mapped"""
+    model, scaler = _fitted()
+    model_registry.register("demo", model, scaler, ["a", "b", "c"])
+    
+    artifact = model_registry.load("demo")
+    
+    assert isinstance(artifact["scaler"].mean_, np.memmap)
+    assert not isinstance(model_registry.load("demo", mmap_mode=None)["scaler"].mean_, np.memmap)
+
+
+def test_load_rejects_tampered_artifact(model_registry):
+    """Test a file that no longer matches its manifest checksum is refused"""
+    model, scaler = _fitted()
+    manifest = model_registry.register("demo", model, scaler, ["a", "b", "c"])
+    path = os.path.join(model_registry.root, "demo", manifest["version"], manifest["files"]["scaler"]["path"])
+    with open(path, "ab") as f:
+        f.write(b"\0")
+    
+    with pytest.raises(ArtifactChecksumError):
+        model_registry.load("demo")
+
+
+def test_missing_model_raises(model_registry):
+    """Test unknown models and versions raise ModelNotFoundError"""
+    assert model_registry.live_version("churn") is None
+    with pytest.raises(ModelNotFoundError):
+        model_registry.load("churn")
+    with pytest.raises(ModelNotFoundError):
+        model_registry.set_live("churn", "v1")
+
+
+def test_churn_predictor_loads_lazily(churn_registry):
+    """Test the live churn model is loaded (with its fitted scaler) on first use, not construction"""
+    predictor = ChurnPredictor(registry=churn_registry, fallback=False)
+    assert predictor.version is None
+    assert predictor.load_ms is None
+    
+    result = predictor.predict({"engagement_score": 0.2})
+    assert predictor.version == churn_registry.live_version("churn")
+    assert predictor.load_ms is not None and predictor.first_prediction_ms is not None
+    
+    # A second process warm-starts from the same registered model and scaler
+    warm = ChurnPredictor(registry=churn_registry)
+    assert warm.predict({"engagement_score": 0.2}) == result
+    assert warm.version == predictor.version
+
+
+def test_churn_predictor_never_trains(model_registry):
+    """Test an empty registry serves the rule-based fallback without writing artifacts"""
+    predictor = ChurnPredictor(registry=model_registry)
+    
+    high = predictor.predict({"engagement_score": 0.1, "support_ticket_frequency": 0.9})
+    low = predictor.predict({"engagement_score": 0.9, "last_support_ticket": datetime.utcnow().isoformat()})
+    
+    assert predictor.version == "fallback"
+    assert high["probability"] > low["probability"]
+    assert model_registry.versions("churn") == []
+
+
+def test_churn_predictor_fail_fast(model_registry):
+    """Test fallback=False refuses to serve when no churn model is registered"""
+    predictor = ChurnPredictor(registry=model_registry, fallback=False)
+    
+    with pytest.raises(ModelNotFoundError):
+        predictor.check_available()
+    with pytest.raises(ModelNotFoundError):
+        predictor.predict({})
+
+
+def test_churn_predictor_rejects_schema_mismatch(model_registry):
+    """Test a live churn model trained on other features is refused"""
+    model, scaler = _fitted()
+    model_registry.register("churn", model, scaler, ["a", "b", "c"])
+    
+    with pytest.raises(ValueError):
+        ChurnPredictor(registry=model_registry).predict({})
@@ -0,0 +1,160 @@
+"""
+Tests for online series statistics and stateful anomaly detection
+"""
+import numpy as np
+import pytest
+
+from models.anomaly_detector import AnomalyDetector
+from models.online_stats import P2Quantile, SeriesStats, SeriesStateStore
+
+
+@pytest.fixture
+def state_store(tmp_path):
+    """Series state store in a temporary SQLite file"""
+    return SeriesStateStore(str(tmp_path / "anomaly_series.db"))
+
+
+def test_series_stats_match_numpy():
+    """Test Welford mean/std are exact and the P2 median is close"""
+    costs = np.random.RandomState(0).lognormal(7, 0.5, 2000)
+    stats = SeriesStats()
+    for cost in costs:
+        stats.update(cost)
+    
+    assert stats.count == len(costs)
+    assert stats.mean == pytest.approx(np.mean(costs))
+    assert stats.std == pytest.approx(np.std(costs))
+    assert stats.median.value() == pytest.approx(np.median(costs), rel=0.02)
+
+
+def test_p2_median_exact_for_small_series():
+    """Test the median is exact until the sketch has more than five points"""
+    sketch = P2Quantile(0.5)
+    assert sketch.value() is None
+    for n, value in enumerate([5.0, 1.0, 4.0, 2.0], start=1):
+        sketch.add(value)
+        assert sketch.value() == pytest.approx(np.median([5.0, 1.0, 4.0, 2.0][:n]))
+
+
+def test_series_stats_round_trip():
+    """Test serialised state keeps updating exactly like the original"""
+    original = SeriesStats()
+    for cost in range(1, 20):
+        original.update(cost)
+    restored = SeriesStats.from_dict(original.to_dict())
+    
+    original.update(100)
+    restored.update(100)
+    
+    assert restored.to_dict() == original.to_dict()
+
+
+def test_observe_matches_detect(state_store):
+    """Test the online score equals detect() over the same history"""
+    history = [2500, 2600, 2450, 2550, 2500, 2600, 2500]
+    detector = AnomalyDetector(state_store=state_store)
+    for cost in history:
+        detector.observe("1:AWS", cost)
+    
+    online = detector.observe("1:AWS", 4200)
+    batch = detector.detect(history, 4200)
+    
+    assert online["is_anomaly"] and batch["is_anomaly"]
+    assert online["score"] == pytest.approx(batch["score"])
+    assert online["expected_cost"] == pytest.approx(batch["expected_cost"])
+    assert online["severity"] == batch["severity"]
+    assert online["statistics"]["std_dev"] == pytest.approx(batch["statistics"]["std_dev"])
+    assert online["observations"] == len(history) + 1
+
+
+def test_observe_state_survives_restart(state_store):
+    """Test a new detector on the same store continues the series, and history only seeds new series"""
+    AnomalyDetector(state_store=state_store).observe("1:Slack", 100, cost_history=[100, 110, 90])
+    
+    restarted = AnomalyDetector(state_store=SeriesStateStore(state_store.path))
+    result = restarted.observe("1:Slack", 105, cost_history=[1, 2, 3])
+    
+    assert result["observations"] == 5
+    assert result["statistics"]["mean"] == pytest.approx(np.mean([100, 110, 90, 100]))
+    assert restarted.observe("2:Slack", 100)["observations"] == 1
+
+
+def test_observe_ignores_repeated_observation_id(state_store):
+    """Test a retried observation is answered from the first call and not counted twice"""
+    detector = AnomalyDetector(state_store=state_store)
+    first = detector.observe("1:Zoom", 300, cost_history=[100, 110, 90], observation_id="2024-06")
+    retry = detector.observe("1:Zoom", 300, observation_id="2024-06")
+    
+    assert (first["duplicate"], retry["duplicate"]) == (False, True)
+    assert {**retry, "duplicate": False} == first
+    assert detector.observe("1:Zoom", 100, observation_id="2024-07")["observations"] == 5
+
+
+def test_default_state_path_outside_source_tree():
+    """Test series state is not written into the service's source directory by default"""
+    import os
+    from models import online_stats
+    
+    service_dir = os.path.dirname(os.path.dirname(os.path.abspath(online_stats.__file__)))
+    assert not os.path.abspath(online_stats.DEFAULT_STATE_PATH).startswith(service_dir + os.sep)
+
+
+class FakeDynamoDB:
+    """In-memory get_item/put_item with the condition expressions the store uses"""
+    
+    class exceptions:
+        class ConditionalCheckFailedException(Exception):
+            pass
+    
+    def __init__(self):
+        self.items = {}
+        self.before_put = None
+    
+    def get_item(self, TableName, Key, ConsistentRead):
+        item = self.items.get(Key["series_key"]["S"])
+        return {"Item": dict(item)} if item else {}
+    
+    def put_item(self, TableName, Item, ConditionExpression, ExpressionAttributeValues=None):
+        if self.before_put:
+            hook, self.before_put = self.before_put, None
+            hook()
+        stored = self.items.get(Item["series_key"]["S"])
+        if ConditionExpression == "attribute_not_exists(series_key)":
+            ok = stored is None
+        else:
+            ok = stored is not None and stored["version"] == ExpressionAttributeValues[":version"]
+        if not ok:
+            raise self.exceptions.ConditionalCheckFailedException()
+        self.items[Item["series_key"]["S"]] = Item
+
+
+def test_dynamo_store_keeps_concurrent_observations():
+    """Test a write that loses the version race re-reads and keeps both observations"""
+    from models.online_stats import DynamoSeriesStateStore
+    
+    dynamo = FakeDynamoDB()
+    detector = AnomalyDetector(state_store=DynamoSeriesStateStore("series", client=dynamo))
+    detector.observe("1:AWS", 100, cost_history=[100, 110, 90])
+    
+    # Another container adds an observation between our read and our write
+    other = AnomalyDetector(state_store=DynamoSeriesStateStore("series", client=dynamo))
+    dynamo.before_put = lambda: other.observe("1:AWS", 120)
+    result = detector.observe("1:AWS", 105)
+    
+    assert result["observations"] == 6
+    assert detector.state_store.get("1:AWS").mean == pytest.approx(np.mean([100, 110, 90, 100, 120, 105]))
+    assert dynamo.items["1:AWS"]["version"] == {"N": "3"}
+
+
+def test_durable_state_required(monkeypatch, tmp_path):
+    """Test a deployment that requires durable state refuses to fall back to the temp dir"""
+    from models.online_stats import StateStoreNotConfigured, state_store_from_env
+    
+    monkeypatch.delenv("ANOMALY_STATE_TABLE", raising=False)
+    monkeypatch.delenv("ANOMALY_STATE_PATH", raising=False)
+    with pytest.raises(StateStoreNotConfigured):
+        state_store_from_env(require_durable=True)
+    assert isinstance(state_store_from_env(), SeriesStateStore)
+    
+    monkeypatch.setenv("ANOMALY_STATE_PATH", str(tmp_path / "series.db"))
+    assert state_store_from_env(require_durable=True).path == str(tmp_path / "series.db")
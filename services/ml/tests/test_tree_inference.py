@@ -0,0 +1,70 @@
+"""
+Tests for flattened-tree churn inference
+"""
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingClassifier, RandomForestClassifier
+
+from models.churn_predictor import ChurnPredictor
+from models.tree_inference import FlattenedTreeEnsemble
+
+
+@pytest.fixture(scope="module")
+def fitted_gbm():
+    rng = np.random.RandomState(0)
+    X = rng.randn(1000, 9)
+    y = (X[:, 0] + X[:, 8] ** 2 > 1).astype(int)
+    return GradientBoostingClassifier(n_estimators=50, max_depth=4, random_state=42).fit(X, y)
+
+
+def test_flattened_matches_sklearn(fitted_gbm):
+    """Test flattened trees reproduce predict_proba on random rows and across chunk boundaries"""
+    flattened = FlattenedTreeEnsemble.from_gradient_boosting(fitted_gbm)
+    X = np.random.RandomState(1).randn(FlattenedTreeEnsemble.CHUNK_ROWS * 3 + 7, 9)
+    
+    assert np.allclose(flattened.predict_proba(X), fitted_gbm.predict_proba(X), rtol=0, atol=1e-9)
+    assert np.allclose(flattened.predict_proba(X[:1]), fitted_gbm.predict_proba(X[:1]), rtol=0, atol=1e-9)
+
+
+def test_flattened_matches_sklearn_on_thresholds(fitted_gbm):
+    """Test rows sitting exactly on split thresholds go the same way as in sklearn"""
+    flattened = FlattenedTreeEnsemble.from_gradient_boosting(fitted_gbm)
+    splits = flattened.threshold[flattened.children[::2] != np.arange(len(flattened.threshold))]
+    X = np.resize(splits, (len(splits) // 9, 9))
+    
+    assert np.allclose(flattened.predict_proba(X), fitted_gbm.predict_proba(X), rtol=0, atol=1e-9)
+
+
+def test_flatten_rejects_unsupported_models():
+    """Test only binary gradient boosting is flattened"""
+    X = np.random.RandomState(0).randn(60, 3)
+    with pytest.raises(ValueError):
+        FlattenedTreeEnsemble.from_gradient_boosting(
+            RandomForestClassifier(n_estimators=2).fit(X, X[:, 0] > 0)
+        )
+    with pytest.raises(ValueError):
+        FlattenedTreeEnsemble.from_gradient_boosting(
+            GradientBoostingClassifier(n_estimators=2).fit(X, np.arange(60) % 3)
+        )
+
+
+def test_churn_predictor_backends_agree(churn_registry):
+    """Test the numpy and auto backends score like sklearn, single and batch"""
+    clients = [
+        {"contract_value": 25000, "monthly_spend": 900, "engagement_score": 0.3},
+        {"contract_value": 60000, "monthly_spend": 7000, "support_ticket_frequency": 0.8},
+        {},
+    ]
+    predictors = {backend: ChurnPredictor(registry=churn_registry, backend=backend)
+                  for backend in ChurnPredictor.BACKENDS}
+    expected = predictors['sklearn'].predict_batch(clients)
+    
+    for backend in ('numpy', 'auto'):
+        batch = predictors[backend].predict_batch(clients)
+        assert [r["probability"] for r in batch] == pytest.approx([r["probability"] for r in expected], abs=1e-9)
+        single = predictors[backend].predict(clients[0])
+        assert single["probability"] == pytest.approx(expected[0]["probability"], abs=1e-9)
+        assert single["risk_level"] == expected[0]["risk_level"]
+    
+    with pytest.raises(ValueError):
+        ChurnPredictor(backend="onnx")
@@ -1,21 +1,24 @@
 """
 Training script for ML models
-Run this to train or retrain models with actual data
+Run this to train or retrain models with actual data. This is the offline
+build step: the service only loads what it registers in trained_models/.
 """
 
+import argparse
 import sys
 import os
 import numpy as np
 import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import classification_report, accuracy_score
-import joblib
+from sklearn.preprocessing import StandardScaler
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from models.churn_predictor import ChurnPredictor
 from models.anomaly_detector import AnomalyDetector
+from models.model_registry import ModelRegistry
 
 def generate_synthetic_training_data(n_samples=1000):
     """Generate synthetic data for model training"""
@@ -70,8 +73,8 @@ def generate_synthetic_training_data(n_samples=1000):
     
     return df
 
-def train_churn_model():
-    """Train the churn prediction model"""
+def train_churn_model(registry=None):
+    """Train the churn prediction model and register it as the live version"""
     print("\n=== Training Churn Prediction Model ===")
     
     # Generate training data
@@ -89,17 +92,18 @@ def train_churn_model():
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
     # Initialize and train model
-    predictor = ChurnPredictor()
+    scaler = StandardScaler()
+    model = ChurnPredictor.new_model()
     
     # Fit scaler
-    X_train_scaled = predictor.scaler.fit_transform(X_train)
-    X_test_scaled = predictor.scaler.transform(X_test)
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
     
     # Train model
-    predictor.model.fit(X_train_scaled, y_train)
+    model.fit(X_train_scaled, y_train)
     
     # Evaluate
-    y_pred = predictor.model.predict(X_test_scaled)
+    y_pred = model.predict(X_test_scaled)
     accuracy = accuracy_score(y_test, y_pred)
     
     print(f"\nModel Performance:")
@@ -107,28 +111,32 @@ def train_churn_model():
     print("\nClassification Report:")
     print(classification_report(y_test, y_pred, target_names=['No Churn', 'Churn']))
     
-    # Save model
-    os.makedirs('trained_models', exist_ok=True)
-    joblib.dump(predictor.model, 'trained_models/churn_model.pkl')
-    joblib.dump(predictor.scaler, 'trained_models/churn_scaler.pkl')
+    # Register model, scaler and feature schema as the new live version
+    registry = registry or ModelRegistry()
+    manifest = registry.register(
+        ChurnPredictor.MODEL_NAME, model, scaler, feature_cols,
+        metrics={'accuracy': float(accuracy)}
+    )
     
-    print("\n✅ Churn model trained and saved!")
+    print(f"\n✅ Churn model {manifest['version']} trained and registered!")
     
     # Feature importance
-    if hasattr(predictor.model, 'feature_importances_'):
-        importances = predictor.model.feature_importances_
+    if hasattr(model, 'feature_importances_'):
+        importances = model.feature_importances_
         feature_importance = sorted(zip(feature_cols, importances), key=lambda x: x[1], reverse=True)
         
         print("\nFeature Importance:")
         for feature, importance in feature_importance[:5]:
             print(f"  {feature}: {importance:.4f}")
+    
+    return manifest
 
 def test_models():
     """Test the trained models with sample data"""
     print("\n=== Testing Trained Models ===")
     
-    # Test churn predictor
-    predictor = ChurnPredictor()
+    # Test churn predictor (fails rather than falling back if nothing was registered)
+    predictor = ChurnPredictor(fallback=False)
     
     test_client = {
         'contract_value': 25000,
@@ -144,7 +152,7 @@ def test_models():
     
     result = predictor.predict(test_client)
     
-    print("\nChurn Prediction Test:")
+    print(f"\nChurn Prediction Test (model {predictor.version}):")
     print(f"  Churn Probability: {result['probability']:.3f}")
     print(f"  Risk Level: {result['risk_level']}")
     print(f"  Risk Factors: {len(result['factors'])}")
@@ -166,11 +174,20 @@ def test_models():
     print("\n✅ Model testing complete!")
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Train the ML models into the model registry")
+    parser.add_argument('--prune', action='store_true',
+                        help="Delete every churn model version except the new live one (for packaging)")
+    args = parser.parse_args()
+    
     print("PulseOps AI - Model Training Script")
     print("=" * 50)
     
     # Train models
-    train_churn_model()
+    registry = ModelRegistry()
+    train_churn_model(registry)
+    if args.prune:
+        removed = registry.prune(ChurnPredictor.MODEL_NAME)
+        print(f"\n🧹 Pruned {len(removed)} old churn model version(s)")
     
     # Test models
     test_models()